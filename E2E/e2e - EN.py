@@ -1,7 +1,3 @@
-from openpyxl import load_workbook
-import openpyxl
-from openpyxl.utils import get_column_letter
-from collections import defaultdict
 from docx import Document
 from docx.shared import Pt, RGBColor
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
@@ -12,99 +8,178 @@ from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
 from docx.enum.section import WD_ORIENTATION
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-import re
-import pandas as pd
-
-def regexfixv3(x):
-    x = re.sub("_x000D_", "", x)
-    def split_long_word(word):
-        if '<<<' in word or '>>>' in word:
-            parts = re.split(r'(<<<|>>>)', word)
-            new_parts = []
-            for part in parts:
-                if len(part) > 19:
-                    chunk_size = 19
-                    new_parts.extend([part[i:i+chunk_size] for i in range(0, len(part), chunk_size)])
-                else:
-                    new_parts.append(part)
-            return ' '.join(new_parts)
-        elif len(word) > 19:
-            return ' '.join([word[i:i+19] for i in range(0, len(word), 19)])
-        else:
-            return word
+import gc
+import sys
+import time
+from contextlib import nullcontext
+from itertools import chain
+from urllib.parse import quote
+
+# Make the shared helpers in the repository root importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from common.docbuild import add_step_table, new_document
+from common.ingest import INPUT_EXTENSIONS, iter_input_rows
+from common.instrumentation import Progress, get_metrics
+from common.locales import SOURCE_LOCALE, get_labels, locale_directory, localised_copy, translate_for_locales
+from common.manifest import (complete_digest, content_digest, file_digest, generator_version, is_current, load_manifest,
+                             manifest_path, record_key, update_manifest, workbook_is_current)
+from common.ooxml_writer import FragmentTemplate, StreamingDocxWriter, deflate_fragment, write_stitched_docx
+from common.parallel import iter_in_processes, process_pool, run_workbooks
+from common.pipeline import IOThread, TRANSLATION_CHUNK, chunked, prefetch
+from common.sharding import in_shard, merge_shard_manifests
+from common.text import clean_columns, clean_text
+from common.translation_cache import format_report, get_translation_cache
+from common.workbook_cache import DEFAULT_CACHE_DIR, cached_rows
+
+# Test details translated for every locale but the workbook's own, shown in the heading and description.
+# IDs and scenarios are left as the workbook has them, so rows are grouped the same in every locale.
+LOCALISED_FIELDS = ('TestName', 'TestDescription')
+
+class Step:
+    """What changes from one step of a test to the next. The details the steps share are kept once on their Test.
 
-    processed_text = ''
-    last_end = 0
-    for match in re.finditer(r'\S+', x):
-        start, end = match.span()
-        processed_text += x[last_end:start]
-        processed_text += split_long_word(match.group())
-        last_end = end
-    processed_text += x[last_end:]
-    return processed_text
+    Steps are only built from a cleaned row, with from_cleaned.
+    """
+    __slots__ = ('StepName', 'StepDescription', 'ExpectedResults', 'Role')
 
-import re
-import pandas as pd
+    @staticmethod
+    def regexfixv3(text):
+        # Only escapes that end a line are removed from the step text
+        return clean_text(text, carriage_return="_x000D_\n")
 
-class Step:
-    def __init__(self, Scenario, TestID, Test_Name, Test_Description, Step_Name,
-                 Step_Description, Expected_Results, Role, Workstream):
-        self.Scenario = re.sub("_x000D_", "", str(Scenario))
-        self.TestID = re.sub("_x000D_", "", str(TestID))
-        self.TestName = re.sub("_x000D_", "", str(Test_Name))
-        self.TestDescription = re.sub("_x000D_", "", str(Test_Description))
-        self.StepName = self.regexfixv3(str(Step_Name))
-        self.StepDescription = self.regexfixv3(str(Step_Description))
-        self.ExpectedResults = self.regexfixv3(str(Expected_Results))
-        self.Role = re.sub("_x000D_", "", str(Role))
-        self.Workstream = re.sub("_x000D_", "", str(Workstream))
-    
-    def regexfixv3(self, text):
-        return re.sub(r"_x000D_\n", "", text)
+    @classmethod
+    def from_cleaned(cls, values):
+        """Build a step from a row's nine values, already cleaned with STEP_CLEANERS."""
+        step = cls()
+        _, _, _, _, step.StepName, step.StepDescription, step.ExpectedResults, step.Role, _ = values
+        return step
+
+# How each column is cleaned, in sheet order
+STEP_CLEANERS = (clean_text, clean_text, clean_text, clean_text, Step.regexfixv3, Step.regexfixv3, Step.regexfixv3,
+                 clean_text, clean_text)
 
 class Test:
-    def __init__(self, Scenario, TestID, Test_Name, Test_Description):
-        self.Scenario = Scenario  # Assign scenario directly to the Test
-        self.TestID = TestID
-        self.TestName = Test_Name
-        self.TestDescription = Test_Description
-        self.steps = []
+    """A test's details, taken from its first row, and its steps in sheet order.
+
+    Tests are only started from a cleaned row, with from_cleaned.
+    """
+    __slots__ = ('Scenario', 'TestID', 'TestName', 'TestDescription', 'Workstream', 'steps')
+
+    @classmethod
+    def from_cleaned(cls, values):
+        """Start a test from its first row's nine values, already cleaned with STEP_CLEANERS."""
+        test = cls()
+        test.Scenario, test.TestID, test.TestName, test.TestDescription, _, _, _, _, test.Workstream = values
+        test.steps = []
+        return test
     
     def add_step(self, step):
         self.steps.append(step)
 
-def read_excel_to_tests(file_path):
-    df = pd.read_excel(file_path)
-    tests = []
-
-    for _, row in df.iterrows():
-        scenario_name = row['Scenario']
-        TestID = row['TEST ID']
-        Test_Name = row['TEST NAME']
-        Test_Description = row['DESCRIPTION']
-        Step_Name = row['Step Name']
-        Step_Description = row['STEP DESCRIPTION']
-        Expected_Results = row['Expected Results']
-        Role = row['Role']
-        Workstream = row['Workstream']
-
+def read_rows(file_path):
+    """Read every row as the raw Scenario and TEST ID values the tests are keyed on, followed by its nine cleaned values."""
+    # Rows are streamed from the first sheet (or the CSV or Parquet export), columns found by their header names, and
+    # cleaned column by column a chunk of rows at a time
+    return [(row.Scenario, row.TestID) + values
+            for row, values in clean_columns(iter_input_rows(file_path, first_sheet_only=True, use_header=True), STEP_CLEANERS)]
+
+def read_excel_to_tests(file_path, cache_dir=None):
+    """Read a workbook's tests. Given cache_dir, its rows are kept there and only parsed again once the workbook or this script changes."""
+    if cache_dir is None:
+        rows = read_rows(file_path)
+    else:
+        rows = cached_rows(file_path, 'e2e', read_rows, generator_version(__file__), 2 + len(STEP_CLEANERS), cache_dir)
+
+    # Tests keyed on the raw (Scenario, TEST ID) values from the sheet, in first-seen order
+    tests = {}
+    for row in rows:
         # Find the test by its TestID and Scenario, or create a new one
-        test = next((t for t in tests if t.TestID == TestID and t.Scenario == scenario_name), None)
+        values = row[2:]
+        test = tests.get(row[:2])
         if test is None:
-            test = Test(scenario_name, TestID, Test_Name, Test_Description)
-            tests.append(test)
+            test = Test.from_cleaned(values)
+            tests[row[:2]] = test
         
         # Create a step and add it to the test
-        step = Step(scenario_name, TestID, Test_Name, Test_Description, Step_Name, Step_Description, Expected_Results, Role, Workstream)
-        test.add_step(step)
+        test.add_step(Step.from_cleaned(values))
+
+    return list(tests.values())
+
+def test_values(test):
+    """Yield what a test's part of the document is built from: its details, then the fields of each step."""
+    yield (test.Scenario, test.TestID, test.TestName, test.TestDescription, test.Workstream)
+    for step in test.steps:
+        yield (step.StepName, step.StepDescription, step.ExpectedResults, step.Role)
+
+def translate_tests(tests, locales=('es',)):
+    """Translate every test's details into all of locales in one concurrent pass.
+
+    Returns {locale: {source text: translation}} and {locale: texts that could not be translated},
+    the tests are left as they were read.
+    """
+    texts = [getattr(test, field) for test in tests for field in LOCALISED_FIELDS]
+    return translate_for_locales({locale: texts for locale in locales})
+
+def localise_tests(tests, locale, translations=None):
+    """Copy the tests with their details in locale, the tests read from the workbook are shared by every locale."""
+    if locale == SOURCE_LOCALE:
+        return tests
+    return [localised_copy(test, LOCALISED_FIELDS, translations.__getitem__) for test in tests]
+
+def localised_chunks(tests, locale, translations, failed, locales=None, chunk_size=TRANSLATION_CHUNK):
+    """Yield the tests with their details in locale, in lists of about chunk_size texts each translated in one pass.
+
+    Each chunk is translated into all of locales at once, by default just locale, and the results
+    are added to translations, {locale: {source text: translation}}, so the documents of the other
+    locales are built from them without translating again: for those pass locales=(). Texts that
+    could not be translated are added to failed, {locale: set of texts}. Run through prefetch,
+    the next chunks are translated while this one is added to the document.
+    """
+    locales = [locale] if locales is None else locales
+    # Each test's details are translated once per locale other than the workbook's own
+    weight = len(LOCALISED_FIELDS) * max(sum(other != SOURCE_LOCALE for other in locales), 1)
+    for chunk in chunked(tests, chunk_size, lambda test: weight):
+        translated, not_translated = translate_tests(chunk, locales)
+        for other, texts in translated.items():
+            translations.setdefault(other, {}).update(texts)
+        for other, texts in not_translated.items():
+            failed.setdefault(other, set()).update(texts)
+        yield localise_tests(chunk, locale, translations.get(locale))
+
+
+def add_hyperlink(p, url, text):
+    """Add text to the paragraph p as a blue, underlined link to url."""
+    hyperlink = p.part.relate_to(url, 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink', is_external=True)
 
-    return tests
+    # Create the hyperlink element
+    hyperlink_element = OxmlElement('w:hyperlink')
+    hyperlink_element.set(qn('r:id'), hyperlink)
 
+    # Create the run for the hyperlink text
+    r = OxmlElement('w:r')
+    rPr = OxmlElement('w:rPr')
 
-def create_word_documents_standalone(tests, folder_path="C:/Users/olive/Desktop/UAT_Test_Evidence", baseName=""):
-    os.makedirs(folder_path, exist_ok=True)
+    # Set underline and color to blue
+    underline = OxmlElement('w:u')
+    underline.set(qn('w:val'), 'single')
+    rPr.append(underline)
 
-    doc = Document()
+    color = OxmlElement('w:color')
+    color.set(qn('w:val'), '0000FF')  # Blue color
+    rPr.append(color)
+
+    r.append(rPr)
+    t = OxmlElement('w:t')
+    t.text = text
+    r.append(t)
+    hyperlink_element.append(r)
+
+    p._element.append(hyperlink_element)
+
+
+def add_preamble(doc, locale=SOURCE_LOCALE):
+    """Add the page setup, table of contents, test instructions and business area table the document starts with."""
+    labels = get_labels(locale)
     doc.styles['Normal'].font.name = 'Calibri (Body)'
     doc.styles['Normal'].font.size = Pt(12)
 
@@ -124,46 +199,21 @@ def create_word_documents_standalone(tests, folder_path="C:/Users/olive/Desktop/
 
     # Test instructions
     p = doc.add_paragraph()
-    run = p.add_run("Test Instructions\nPlease click ")
+    run = p.add_run(f"{labels['instructions_title']}\n{labels['instructions_click']} ")
     run.bold = True
     run.font.size = Pt(14)
 
     # Adding the hyperlink
     hyperlink_url = 'https://myiglo.sharepoint.com/:w:/s/PhoenixProgramme2021-2024/EQ7d0Uhfs85Pit2Gk8DDnKsBP4Z25YQGJS34ULGxc39yew?e=KQHY5u'
-    hyperlink = doc.part.relate_to(hyperlink_url, 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink', is_external=True)
-
-    # Create the hyperlink element
-    hyperlink_element = OxmlElement('w:hyperlink')
-    hyperlink_element.set(qn('r:id'), hyperlink)
-
-    # Create the run for the hyperlink text
-    r = OxmlElement('w:r')
-    rPr = OxmlElement('w:rPr')
-
-    # Set underline and color to blue
-    underline = OxmlElement('w:u')
-    underline.set(qn('w:val'), 'single')
-    rPr.append(underline)
-
-    color = OxmlElement('w:color')
-    color.set(qn('w:val'), '0000FF')  # Blue color
-    rPr.append(color)
-
-    r.append(rPr)
-    t = OxmlElement('w:t')
-    t.text = "UAT Test Instructions.docx"
-    r.append(t)
-    hyperlink_element.append(r)
-
-    p._element.append(hyperlink_element)
+    add_hyperlink(p, hyperlink_url, labels['instructions_link'])
 
     # Continue the sentence after the hyperlink
-    run = p.add_run(" and read the instructions before you start testing!")
+    run = p.add_run(f" {labels['instructions_read']}")
     run.bold = True
     run.font.size = Pt(14)
 
     p = doc.add_paragraph()
-    run = p.add_run("UAT Test Script Execution")
+    run = p.add_run(labels['execution_title'])
     run.bold = True
     run.font.size = Pt(14)
     p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
@@ -178,14 +228,14 @@ def create_word_documents_standalone(tests, folder_path="C:/Users/olive/Desktop/
 
     # Define header cells text
     hdr_cells = table1.rows[0].cells
-    hdr_text = ['Business Area', 'Responsible Tester', 'Status', 'Date', 'Country']
+    hdr_text = labels['tester_table']
     for i, text in enumerate(hdr_text):
         hdr_cells[i].text = text
         hdr_cells[i].paragraphs[0].runs[0].font.color.rgb = RGBColor(255, 255, 255)
         hdr_cells[i].paragraphs[0].runs[0].bold = True
 
     # Define areas
-    areas = ['Demand Planning', 'Supply Planning', 'Procurement', 'Warehousing', 'Quality Management', 'Production Planning', 'Plant maintenance', 'Commercial Finance', 'Order to Cash', 'FP&A-S4', 'R2R', 'MDG']
+    areas = labels['business_areas']
 
     # Add rows for each area and fill the first column with area names
     for area in areas:
@@ -193,111 +243,468 @@ def create_word_documents_standalone(tests, folder_path="C:/Users/olive/Desktop/
         row = table1.add_row()
         # Set the text for the first cell in the row to the area name
         row.cells[0].text = area
-            
-    i = 0
-    imax = len(tests)
+
+def build_step_table(doc, locale=SOURCE_LOCALE):
+    """Add a step table with its labels, merges and alignment in place.
+
+    Returns the table and the cells filled in per step: step number, role, description
+    and expected result. Only called once per locale, add_step_table copies the result for every step.
+    """
+    labels = get_labels(locale)
+
+    # Create the table with 5 rows and 6 columns
+    table2 = doc.add_table(rows=5, cols=6)
+    table2.style = 'Table Grid'
+
+    # First row (Header Row)
+    hdr_cells = table2.rows[0].cells
+
+    # Apply bold formatting to specific headers
+    hdr_cells[0].text = labels['test_step']
+    hdr_cells[0].paragraphs[0].runs[0].bold = True
+
+    hdr_cells[1].text = ''  # The test step number
+
+    hdr_cells[2].text = labels['role']
+    hdr_cells[2].paragraphs[0].runs[0].bold = True
+
+    hdr_cells[3].text = ''  # Empty cell for Role data
+
+    hdr_cells[4].text = labels['test_status']
+    hdr_cells[4].paragraphs[0].runs[0].bold = True
+
+    hdr_cells[5].text = ''  # Empty cell for Test Status data
+
+    # Second row
+    row2_cells = table2.rows[1].cells
+    row2_cells[0].text = labels['description']
+    row2_cells[0].paragraphs[0].runs[0].bold = True
+    row2_cells[1].merge(row2_cells[5])  # Merge the remaining cells to form a single cell
+    row2_cells[1].text = ''
+
+    # Third row
+    row3_cells = table2.rows[2].cells
+    row3_cells[0].text = labels['expected']
+    row3_cells[0].paragraphs[0].runs[0].bold = True
+    row3_cells[1].merge(row3_cells[5])  # Merge the remaining cells to form a single cell
+    row3_cells[1].text = ''
+    expected_cell = row3_cells[1]
+
+    # Fourth row
+    row3_cells = table2.rows[3].cells
+    row3_cells[0].text = labels['actual_result']
+    row3_cells[0].paragraphs[0].runs[0].bold = True
+    row3_cells[1].merge(row3_cells[5])  # Merge the remaining cells to form a single cell
+    row3_cells[1].text = ''
+
+    # Fith row
+    row4_cells = table2.rows[4].cells
+    row4_cells[0].text = labels['tester_comments']
+    row4_cells[0].paragraphs[0].runs[0].bold = True
+    row4_cells[1].merge(row4_cells[5])  # Merge the remaining cells to form a single cell
+    row4_cells[1].text = ''
+
+    # Adjust alignment for all cells
+    for row in table2.rows:
+        for cell in row.cells:
+            for paragraph in cell.paragraphs:
+                paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
+
+    return table2, [hdr_cells[1], hdr_cells[3], row2_cells[1], expected_cell]
+
+def add_test_heading(doc, test, locale=SOURCE_LOCALE):
+    """Add the page break, heading and description that open each test."""
+    labels = get_labels(locale)
+    doc.add_page_break()
+    doc.add_heading(f"{test.TestName}", level=1)
+    p = doc.add_paragraph()
+    run = p.add_run(f"{labels['test_id']}: {test.TestID} - {test.Workstream}\n\n")
+    run.bold = True
+    run.font.size = Pt(14)
+    p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+    run = p.add_run(f"{labels['test_description']}:\n")
+    run.bold = True
+    run.font.size = Pt(14)
+    p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+    run = p.add_run(f"{test.TestDescription}\n\n")
+    run.font.size = Pt(12)
+    p.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
+
+def add_step(doc, StepNumber, step, locale=SOURCE_LOCALE):
+    """Add one step's table with space for the screenshot underneath."""
+    # Copy of a prebuilt table with only the step details filled in
+    add_step_table(doc, build_step_table, str(StepNumber), step.Role, step.StepDescription, step.ExpectedResults, args=(locale,))
+
+    doc.add_paragraph(f"\n{get_labels(locale)['screenshot']}\n\n\n\n\n", style='Normal')
+
+# Rough bytes of document XML a test heading and a step table take besides their text, for volume_limits' megabytes
+HEADING_XML_BYTES = 400
+STEP_XML_BYTES = 2700
+
+def active_limits(volume_limits):
+    """The limits of volume_limits that are set, e.g. {'steps': 2000}."""
+    return {name: limit for name, limit in (volume_limits or {}).items() if limit}
+
+def estimated_megabytes(test):
+    """Roughly how much document XML a test adds, its text plus the markup around it."""
+    size = HEADING_XML_BYTES + len(test.TestName) + len(test.TestID) + len(test.Workstream) + len(test.TestDescription)
+    size += sum(STEP_XML_BYTES + len(step.Role) + len(step.StepDescription) + len(step.ExpectedResults) for step in test.steps)
+    return size / 1e6
+
+def split_volumes(tests, volume_limits=None):
+    """Yield (tests, more) for each volume of consecutive tests within volume_limits, more being True if another volume follows.
+
+    volume_limits is {'tests': ..., 'steps': ..., 'megabytes': ...}, limits left as None don't
+    apply. A volume is closed before the test that would take it over a limit, so a test is
+    only split from the others, never across volumes. Without limits every test goes in one
+    volume, handed on as they come. Tests without steps add nothing to a document and are left out.
+    """
+    limits = active_limits(volume_limits)
+    if not limits:
+        yield tests, False
+        return
+
+    volume = []
+    totals = dict.fromkeys(limits, 0)
+    for test in tests:
+        if not test.steps:
+            continue
+        sizes = {'tests': 1, 'steps': len(test.steps)}
+        if 'megabytes' in limits:
+            sizes['megabytes'] = estimated_megabytes(test)
+        if volume and any(totals[name] + sizes[name] > limit for name, limit in limits.items()):
+            yield volume, True
+            volume = []
+            totals = dict.fromkeys(limits, 0)
+        volume.append(test)
+        for name in totals:
+            totals[name] += sizes[name]
+    yield volume, False
+
+def counted(tests, progress):
+    """Pass the tests on, counting each one on progress as it is taken."""
+    for test in tests:
+        progress.update()
+        yield test
+
+def create_word_documents_standalone(tests, folder_path="C:/Users/olive/Desktop/UAT_Test_Evidence", baseName="", streaming=False, locale=SOURCE_LOCALE,
+                                     io_thread=None, volume_limits=None, build_workers=1, pool=None, translations=None, failed=None,
+                                     locales=None):
+    """Save the document of the tests, as read from the workbook, in locale and return the paths saved.
+
+    The details of the next tests are translated on a background thread while earlier ones are
+    added to the document. Given an IOThread the document is saved on it, so the caller can
+    build the next locale's document meanwhile, otherwise it is saved before returning.
+    If the tests go over volume_limits (see split_volumes) they are saved in numbered volumes,
+    each as soon as it fills, and the document named after the workbook becomes an index
+    linking them. The index then comes first in the returned paths, followed by the volumes.
+    With build_workers over 1 the documents are streamed, rendered by that many processes at once:
+    pool, from process_pool, if given. The tests are translated into all of locales as they are added,
+    see localised_chunks for translations, failed and locales. Texts that could not be translated
+    are left in the workbook's language.
+    """
+    os.makedirs(folder_path, exist_ok=True)
+    file_name_safe = f"{baseName[:100]}.docx"  # Truncate to ensure the filename is safe
+    file_path = os.path.join(folder_path, file_name_safe)
+
+    translations = {} if translations is None else translations
+    failed = {} if failed is None else failed
+    volumes = []
+    # The workers are started before the translation thread, so none is forked while it holds a lock
+    with nullcontext(pool) if pool is not None else process_pool(build_workers) as pool:
+        tests = counted(chain.from_iterable(prefetch(localised_chunks(tests, locale, translations, failed, locales))),
+                        Progress(len(tests), "tests"))
+        for number, (volume, more) in enumerate(split_volumes(tests, volume_limits), 1):
+            # Everything fitting in one volume is the usual single document
+            path = file_path if number == 1 and not more else os.path.join(folder_path, f"{baseName[:100]} - {number:03d}.docx")
+            if build_workers > 1:
+                write_parallel_document(volume, path, locale, build_workers, pool)
+            elif streaming:
+                write_streaming_document(volume, path, locale)
+            else:
+                # The document is let go once saved, so only the volumes waiting on the I/O thread are held in memory
+                doc = build_document(volume, locale)
+                if io_thread is not None:
+                    io_thread.submit(save_document, doc, path)
+                else:
+                    save_document(doc, path)
+                del doc
+                if more:
+                    # A document's parts refer to each other, so only the cycle collector frees the volumes saved so far
+                    gc.collect()
+            if path != file_path:
+                volumes.append((path, volume[0].TestID, volume[-1].TestID, len(volume), sum(len(test.steps) for test in volume)))
+
+    if not volumes:
+        return [file_path]
+    write_volume_index(volumes, file_path, baseName, locale)
+    return [file_path] + [path for path, *_ in volumes]
+
+def build_document(tests, locale=SOURCE_LOCALE):
+    """Build the document of tests in memory: the preamble, then each test's heading and steps."""
+    # The preamble is the same for every workbook in a locale, so it is built once and copied
+    doc = new_document(add_preamble, (locale,))
 
     for test in tests:
-        i += 1
-        print(f"{i}/{imax}")
-    
-        doc.add_page_break()
-    
         # Loop through the list of tests in the scenario
         if test.steps:
-            first_step = test.steps[0]
-            doc.add_heading(f"{first_step.TestName}", level=1)
-            p = doc.add_paragraph()
-            run = p.add_run(f"Test ID: {first_step.TestID} - {first_step.Workstream}\n\n")
-            run.bold = True
-            run.font.size = Pt(14)
-            p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-            run = p.add_run("Test Description:\n")
-            run.bold = True
-            run.font.size = Pt(14)
-            p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-            run = p.add_run(f"{first_step.TestDescription}\n\n")
-            run.font.size = Pt(12)
-            p.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
+            add_test_heading(doc, test, locale)
             StepNumber = 0
             for step in test.steps:
                 StepNumber += 1
-                # Create the table with 5 rows and 6 columns
-                table2 = doc.add_table(rows=5, cols=6)
-                table2.style = 'Table Grid'
-
-                # First row (Header Row)
-                hdr_cells = table2.rows[0].cells
-
-                # Apply bold formatting to specific headers
-                hdr_cells[0].text = 'Test Step'
-                hdr_cells[0].paragraphs[0].runs[0].bold = True
-
-                hdr_cells[1].text = str(StepNumber)  # The test step number
-
-                hdr_cells[2].text = 'Role'
-                hdr_cells[2].paragraphs[0].runs[0].bold = True
-
-                hdr_cells[3].text = step.Role  # Empty cell for Role data
-
-                hdr_cells[4].text = 'Test Status <Pass/Fail>'
-                hdr_cells[4].paragraphs[0].runs[0].bold = True
-
-                hdr_cells[5].text = ''  # Empty cell for Test Status data
-
-                # Second row
-                row2_cells = table2.rows[1].cells
-                row2_cells[0].text = 'Description'
-                row2_cells[0].paragraphs[0].runs[0].bold = True
-                row2_cells[1].merge(row2_cells[5])  # Merge the remaining cells to form a single cell
-                row2_cells[1].text = step.StepDescription
-
-                # Third row
-                row3_cells = table2.rows[2].cells
-                row3_cells[0].text = 'Expected'
-                row3_cells[0].paragraphs[0].runs[0].bold = True
-                row3_cells[1].merge(row3_cells[5])  # Merge the remaining cells to form a single cell
-                row3_cells[1].text = step.ExpectedResults
-
-                # Fourth row
-                row3_cells = table2.rows[3].cells
-                row3_cells[0].text = 'Actual Result'
-                row3_cells[0].paragraphs[0].runs[0].bold = True
-                row3_cells[1].merge(row3_cells[5])  # Merge the remaining cells to form a single cell
-                row3_cells[1].text = ''
-
-                # Fith row
-                row4_cells = table2.rows[4].cells
-                row4_cells[0].text = 'Tester Comments'
-                row4_cells[0].paragraphs[0].runs[0].bold = True
-                row4_cells[1].merge(row4_cells[5])  # Merge the remaining cells to form a single cell
-                row4_cells[1].text = ''
-
-                # Adjust alignment for all cells
-                for row in table2.rows:
-                    for cell in row.cells:
-                        for paragraph in cell.paragraphs:
-                            paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
-           
-                doc.add_paragraph("\nPlease attach the test Screenshot Below, make sure to include the system date and time:\n\n\n\n\n", style='Normal')
-        
-    # Save document
-    file_name_safe = f"{baseName[:100]}.docx"  # Truncate to ensure the filename is safe
-    file_path = os.path.join(folder_path, file_name_safe)
-    doc.save(file_path)
-
-def process_all_files(excel_files_directory, word_files_directory):
-    for filename in os.listdir(excel_files_directory):
-        file_path = os.path.join(excel_files_directory, filename)
-        if os.path.isfile(file_path) and filename.endswith(('.xlsx', '.xlsm', '.xltx', '.xltm')):
-            base_name = os.path.splitext(filename)[0]
-            create_word_documents_standalone(read_excel_to_tests(file_path), word_files_directory, base_name)
-
-# Get the current directory for Excel files
-current_directory = os.getcwd()
+                add_step(doc, StepNumber, step, locale)
+    return doc
 
-# Get the parent directory for Word files
-parent_directory = os.path.abspath(os.path.join(current_directory, os.pardir))
+def save_document(doc, file_path):
+    with get_metrics().stage('document_save'):
+        doc.save(file_path)
 
-process_all_files(current_directory, parent_directory)
-print("\n\n\t\tComplete")
+def write_volume_index(volumes, file_path, baseName, locale=SOURCE_LOCALE):
+    """Save a short document linking each (path, first test ID, last test ID, tests, steps) volume, next to the volumes."""
+    labels = get_labels(locale)
+    doc = Document()
+    doc.add_heading(baseName, level=1)
+    doc.add_paragraph(labels['volume_index'])
+    for number, (path, first, last, tests, steps) in enumerate(volumes, 1):
+        p = doc.add_paragraph()
+        # Linked by file name, so the links keep working wherever the folder is moved
+        add_hyperlink(p, quote(os.path.basename(path)), f"{labels['volume']} {number}")
+        p.add_run(f": {first} - {last} ({tests} {labels['tests']}, {steps} {labels['steps']})")
+    save_document(doc, file_path)
+
+# Steps of the tests rendered together by one process when build_workers is over 1
+RENDER_CHUNK_STEPS = 500
+
+# Compiled heading and step templates, keyed on locale, built once in each process
+_fragment_templates = {}
+
+def fragment_templates(locale=SOURCE_LOCALE):
+    """Return the heading and step templates of locale, compiled from add_test_heading and add_step."""
+    templates = _fragment_templates.get(locale)
+    if templates is None:
+        templates = _fragment_templates[locale] = (
+            FragmentTemplate(lambda doc, test: add_test_heading(doc, test, locale),
+                             ('TestName', 'TestID', 'Workstream', 'TestDescription'), add_preamble, (locale,)),
+            FragmentTemplate(lambda doc, step: add_step(doc, step.StepNumber, step, locale),
+                             ('StepNumber', 'Role', 'StepDescription', 'ExpectedResults'), add_preamble, (locale,)))
+    return templates
+
+def render_tests(tests, locale=SOURCE_LOCALE):
+    """Yield the document XML of each test's heading and steps, as build_document adds them."""
+    heading, step_xml = fragment_templates(locale)
+    for test in tests:
+        if test.steps:
+            yield heading.render(TestName=test.TestName, TestID=test.TestID,
+                                 Workstream=test.Workstream, TestDescription=test.TestDescription)
+            StepNumber = 0
+            for step in test.steps:
+                StepNumber += 1
+                yield step_xml.render(StepNumber=str(StepNumber), Role=step.Role,
+                                      StepDescription=step.StepDescription, ExpectedResults=step.ExpectedResults)
+
+def render_piece(tests, locale=SOURCE_LOCALE):
+    """Render and compress the XML of some tests in a worker process, ready for write_stitched_docx."""
+    return deflate_fragment(''.join(render_tests(tests, locale)))
+
+def write_streaming_document(tests, file_path, locale=SOURCE_LOCALE):
+    """Write the same document as build_document without holding it in memory.
+
+    The heading and step XML are compiled once from add_test_heading and add_step, then each
+    test is rendered and streamed straight into word/document.xml inside the .docx. tests may
+    be a generator.
+    """
+    # Rendering and saving are one and the same when streaming, so all of it counts as saving
+    with get_metrics().stage('document_save'), StreamingDocxWriter(file_path, add_preamble, args=(locale,)) as writer:
+        for xml in render_tests(tests, locale):
+            writer.write(xml)
+
+def write_parallel_document(tests, file_path, locale=SOURCE_LOCALE, workers=2, pool=None):
+    """Write the same document as write_streaming_document, rendered by workers processes at once.
+
+    The tests are handed out in chunks of about RENDER_CHUNK_STEPS steps, each rendered and
+    compressed by a worker, and the compressed chunks are joined in order after the preamble.
+    Only a few chunks are in flight at a time, so tests may be a generator. The workers are pool,
+    from process_pool, if given, where the templates stay compiled from one document to the next.
+    """
+    chunks = chunked(tests, RENDER_CHUNK_STEPS, lambda test: len(test.steps))
+    with get_metrics().stage('document_save'):
+        write_stitched_docx(file_path, add_preamble, iter_in_processes(render_piece, ((chunk, locale) for chunk in chunks), workers, pool=pool),
+                            args=(locale,))
+
+def volume_key(locale, number):
+    """Identify a volume of a locale's document in the manifest. The document itself, or the index of its volumes, is keyed on the locale."""
+    return record_key(locale, number)
+
+def locale_outputs(entry, locale):
+    """The outputs recorded in a manifest entry for locale's document and its volumes."""
+    keys = {locale} | {volume_key(locale, number) for number in range(1, len(entry['outputs']) + 1)}
+    return {key: output for key, output in entry['outputs'].items() if key in keys}
+
+def process_file(file_path, word_files_directory, streaming=False, previous=None, locales=(SOURCE_LOCALE,), cache_dir=None,
+                 volume_limits=None, build_workers=1, pool=None):
+    """Generate the document in every one of locales for one workbook, which is read only once.
+
+    Runs in a worker process when process_all_files is given workbook_workers. previous is the
+    workbook's entry in the last run's manifest, a locale's document is only translated and rebuilt
+    if the workbook's rows changed since then. Given cache_dir, the parsed rows are cached there.
+    Documents over volume_limits are split into volumes, and build_workers processes render each
+    one, see create_word_documents_standalone: pool, the run's process_pool, if given.
+    Otherwise one is started for the workbook's documents.
+    Returns the workbook's new manifest entry and its cache hits and misses.
+    """
+    source_digest = file_digest(file_path)
+    if workbook_is_current(previous, source_digest, locales):
+        print(f"{os.path.basename(file_path)} is unchanged since the last run")
+        return previous, 0, 0
+
+    cache = get_translation_cache()
+    hits, misses = cache.hits, cache.misses
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    tests = read_excel_to_tests(file_path, cache_dir)
+    # The workbook may have been saved again without any change to its rows
+    digest = content_digest(values for test in tests for values in test_values(test))
+    outputs = {}
+    stale = []
+    for locale in locales:
+        recorded = locale_outputs(previous, locale) if previous else {}
+        if locale in recorded and all(is_current(previous, key, digest) for key in recorded):
+            outputs.update(recorded)
+        else:
+            stale.append(locale)
+    # The tests are translated into every stale locale while the first one's document is built,
+    # the other documents are built from those translations
+    translations = {}
+    failed = {}
+    # Each locale's document is saved on the I/O thread while the next one is built. The render
+    # workers are started first, so none is forked while the I/O thread holds a lock.
+    with nullcontext(pool) if pool is not None else process_pool(build_workers) as pool, IOThread() as io_thread:
+        for position, locale in enumerate(stale):
+            document, *volumes = create_word_documents_standalone(tests, locale_directory(word_files_directory, locale, locales),
+                                                                  base_name, streaming, locale, io_thread, volume_limits,
+                                                                  build_workers, pool, translations, failed,
+                                                                  stale if position == 0 else ())
+            # A document left partly untranslated is recorded without a digest, so the next run builds it again
+            built_from = None if failed.get(locale) else digest
+            outputs[locale] = [built_from, document]
+            for number, volume in enumerate(volumes, 1):
+                outputs[volume_key(locale, number)] = [built_from, volume]
+
+    # Report this workbook's cache lookups, the run total is added up by process_all_files
+    entry = {'file': complete_digest(source_digest, outputs), 'locales': list(locales), 'outputs': outputs,
+             'expected': len(outputs)}
+    return entry, cache.hits - hits, cache.misses - misses
+
+def process_all_files(excel_files_directory, word_files_directory, workbook_workers=1, streaming=False, incremental=True, metrics_file=None,
+                      locales=(SOURCE_LOCALE,), shard_index=0, shard_count=1, parse_cache=True, volume_limits=None,
+                      build_workers=1, script_path=__file__):
+    started = time.perf_counter()
+    shard = (shard_index, shard_count)
+    cache_dir = DEFAULT_CACHE_DIR if parse_cache else None
+
+    # Labels of a locale without a bundle are translated here once, before any worker needs them
+    for locale in locales:
+        get_labels(locale)
+
+    # The manifest from the last run says which documents are still up to date
+    # Named after the script run, so the EN and SP scripts keep separate manifests
+    manifest_file = manifest_path(word_files_directory, script_path, shard)
+    version = generator_version(__file__)
+    if active_limits(volume_limits):
+        # Documents split at other limits are other documents, so the limits count as part of the generator
+        version = content_digest([(version,) + tuple(sorted(active_limits(volume_limits).items()))])
+    recorded_version, recorded = load_manifest(manifest_file)
+    # After a change to the generator, or when asked to, everything is rebuilt
+    previous = recorded if incremental and recorded_version == version else {}
+
+    # Workbooks processed here share one pool of render workers for the whole run. One in a workbook
+    # worker starts its own, a pool can't be handed to another process.
+    with process_pool(build_workers if workbook_workers <= 1 else 1) as pool:
+        jobs = []
+        for filename in os.listdir(excel_files_directory):
+            file_path = os.path.join(excel_files_directory, filename)
+            # Each workbook is one document, so a sharded run splits the workbooks between the shards
+            if (os.path.isfile(file_path) and filename.endswith(INPUT_EXTENSIONS)
+                    and in_shard(shard, filename)):
+                jobs.append((file_path, word_files_directory, streaming, previous.get(filename), locales, cache_dir, volume_limits,
+                             build_workers, pool))
+
+        # A workbook that fails is reported without stopping the others
+        results, failures = run_workbooks(process_file, jobs, workbook_workers)
+
+    # Record what was built and remove documents of workbooks that are gone
+    update_manifest(manifest_file, version, recorded, {path: entry for path, (entry, _, _) in results.items()}, failures)
+
+    # Workbooks may have been translated in other processes, so total up what each one reported
+    if any(locale != SOURCE_LOCALE for locale in locales):
+        print(format_report(sum(hits for _, hits, _ in results.values()), sum(misses for _, _, misses in results.values())))
+
+    # Where the time went, across every process that took part
+    metrics = get_metrics()
+    elapsed = time.perf_counter() - started
+    print(metrics.report(elapsed))
+    if metrics_file:
+        metrics.write(metrics_file, elapsed)
+    return failures
+
+def main(locales=None, script_path=__file__):
+    """Run the script with the settings below, from the folder holding the workbooks.
+
+    The SP script runs this with locales=['es'] and its own path, which names its manifest.
+    """
+    # Get the current directory for Excel files
+    current_directory = os.getcwd()
+
+    # Get the parent directory for Word files
+    parent_directory = os.path.abspath(os.path.join(current_directory, os.pardir))
+
+    # Number of workbooks processed at the same time, each in its own process
+    workbook_workers = 1
+
+    # Stream each document's XML straight into the .docx instead of building it with python-docx,
+    # keeps memory flat for the biggest workbooks
+    streaming_writer = False
+
+    # Only rebuild documents whose rows changed since the last run, False rebuilds everything
+    incremental = True
+
+    # Also save the run's timings and counts to this file: JSON, or a Prometheus textfile if it ends in .prom
+    metrics_file = None
+
+    # Languages to produce documents in, all from one read of each workbook, e.g. ['en', 'es'].
+    # With more than one, each language's document goes in a subfolder named after it.
+    locales = locales or ['en']
+
+    # Split a full run over several machines that see one output folder at the same path: each runs
+    # the same workbooks with its own shard_index, from 0 to shard_count - 1, and builds a separate part of them
+    shard_index = 0
+    shard_count = 1
+
+    # Once every shard has finished, run once more with this set to check nothing is missing and
+    # combine the shards' manifests into the one later runs use
+    merge_shards = False
+
+    # Keep each workbook's parsed rows in ~/.test_document_generator/workbooks, so a workbook that
+    # hasn't changed is loaded from there instead of being parsed again. False always parses it.
+    parse_cache = True
+
+    # Split a workbook's document into numbered volumes of at most this many tests, steps or megabytes of
+    # document XML (estimated), and save an index document under the workbook's name linking them.
+    # Each volume is saved as soon as it fills and opens quickly in Word. None leaves that limit off.
+    volume_limits = dict(tests=None, steps=None, megabytes=None)
+
+    # Number of processes rendering each document at the same time, for the biggest workbooks. Over 1
+    # the documents are streamed as with streaming_writer, each process compressing its own part.
+    build_workers = 1
+
+    if merge_shards:
+        merge_shard_manifests(current_directory, parent_directory, script_path, shard_count)
+    else:
+        process_all_files(current_directory, parent_directory, workbook_workers, streaming_writer, incremental, metrics_file, locales,
+                          shard_index, shard_count, parse_cache, volume_limits, build_workers,
+                          script_path)
+    get_translation_cache().close()
+    print("\n\n\t\tComplete")
+
+# Worker processes re-import this script, only start a run from the main process
+if __name__ == "__main__":
+    main()
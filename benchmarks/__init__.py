@@ -0,0 +1 @@
+"""Benchmarks of the document generators, run benchmark.py as a script or as python -m benchmarks.benchmark."""
@@ -0,0 +1,259 @@
+import asyncio
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+# Make the shared helpers in the repository root importable
+REPOSITORY_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, REPOSITORY_ROOT)
+import common.translation
+from common.ingest import iter_workbook_rows
+from common.parallel import process_pool
+from common.text import clean_columns
+from common.translation_cache import TranslationCache
+from benchmarks.workload import write_workload
+
+# The four generators, keyed on the name used in the results. The SP scripts run the EN ones in
+# Spanish, so those are loaded and the names ending in SP build Spanish documents.
+SCRIPTS = {
+    'e2e-EN': os.path.join('E2E', 'e2e - EN.py'),
+    'e2e-SP': os.path.join('E2E', 'e2e - EN.py'),
+    'standalone-EN': os.path.join('standalone', 'standalone - EN.py'),
+    'standalone-SP': os.path.join('standalone', 'standalone - EN.py'),
+}
+
+
+class StubTranslator:
+    """Stands in for googletrans.Translator, tagging each text with the target language after a fixed delay per request."""
+
+    latency = 0.0
+    requests = 0
+    characters = 0
+
+    def __init__(self, **options):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def translate(self, text, dest='es'):
+        StubTranslator.requests += 1
+        StubTranslator.characters += len(text)
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(text=f"[{dest}] {text}")
+
+
+def use_stub_translator(cache_path, latency):
+    """Send translations to StubTranslator and cache them in a fresh file instead of the user's cache."""
+    StubTranslator.latency = latency
+    StubTranslator.requests = StubTranslator.characters = 0
+    cache = TranslationCache(cache_path)
+    common.translation.Translator = StubTranslator
+    common.translation.get_translation_cache = lambda: cache
+    return cache
+
+
+def load_script(name, relative_path):
+    """Import one of the generator scripts as a module, its __main__ block does not run."""
+    spec = importlib.util.spec_from_file_location(name.replace('-', '_'), os.path.join(REPOSITORY_ROOT, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    # Registered so its functions can be pickled by name for worker processes
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def time_stage(func, repeat, setup=None):
+    """Run func repeat times and return the timings, the generators' progress output is discarded.
+
+    setup runs untimed before each call and its result is passed to func.
+    """
+    samples = []
+    for _ in range(repeat):
+        argument = setup() if setup is not None else None
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            started = time.perf_counter()
+            result = func(argument) if setup is not None else func()
+            samples.append(time.perf_counter() - started)
+    return summarise(samples), result
+
+
+def summarise(samples):
+    """Best and median of a stage's timings, best is the one compared between runs."""
+    return {'best_seconds': min(samples), 'median_seconds': statistics.median(samples), 'samples': samples}
+
+
+def remove_cache(cache_path):
+    """Delete a translation cache file along with its WAL files."""
+    for suffix in ('', '-wal', '-shm'):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(cache_path + suffix)
+
+
+def benchmark_script(name, module, workbook_path, rows, work_dir, repeat, latency, build_workers=2):
+    """Time each stage of one generator on the workbook at workbook_path, the E2E parallel build with build_workers processes."""
+    e2e = name.startswith('e2e')
+    spanish = name.endswith('SP')
+    locale = 'es' if spanish else 'en'
+    stages = {}
+
+    stages['load'], raw_rows = time_stage(
+        lambda: list(iter_workbook_rows(workbook_path, first_sheet_only=e2e, use_header=e2e)), repeat)
+    stages['clean'], _ = time_stage(
+        lambda: [module.Step.from_cleaned(values) for _, values in clean_columns(raw_rows, module.STEP_CLEANERS)], repeat)
+    stages['read_excel_to_tests'], parsed = time_stage(lambda: module.read_excel_to_tests(workbook_path), repeat)
+    # Fill a fresh parsed-workbook cache, then time loading from it
+    cache_dir = os.path.join(work_dir, f"{name}-workbooks")
+    module.read_excel_to_tests(workbook_path, cache_dir)
+    stages['read_excel_to_tests_cached'], _ = time_stage(lambda: module.read_excel_to_tests(workbook_path, cache_dir), repeat)
+    for stage in ('load', 'clean', 'read_excel_to_tests', 'read_excel_to_tests_cached'):
+        stages[stage]['rows_per_second'] = rows / stages[stage]['best_seconds']
+
+    if spanish:
+        if e2e:
+            translate = lambda tests: module.translate_tests(tests, [locale])
+        else:
+            translate = lambda scenarios: module.translate_step_text(
+                {locale: [test for scenario in scenarios for test in scenario.tests.values()]})
+        cache_path = os.path.join(work_dir, f"{name}-translations.sqlite3")
+        # Cold passes start from an empty cache, warm passes from the one the last cold pass filled
+        for stage in ('translate_cold', 'translate_warm'):
+            samples = []
+            for _ in range(repeat):
+                if stage == 'translate_cold':
+                    remove_cache(cache_path)
+                cache = use_stub_translator(cache_path, latency)
+                timing, _ = time_stage(translate, 1, lambda: module.read_excel_to_tests(workbook_path))
+                samples.extend(timing['samples'])
+                cache.close()
+            stages[stage] = dict(summarise(samples), requests=StubTranslator.requests, characters=StubTranslator.characters)
+
+    # Documents are translated as they are built, from the cache the warm pass left behind
+    output_dir = os.path.join(work_dir, name)
+    if e2e:
+        documents = 1
+        variants = (('create_word_documents_standalone', False), ('create_word_documents_standalone_streaming', True))
+        for stage, streaming in variants:
+            stages[stage], _ = time_stage(
+                lambda: module.create_word_documents_standalone(parsed, output_dir, 'benchmark', streaming, locale), repeat)
+        # The pool is started once, as a run does, and its workers keep their compiled templates between repeats
+        with process_pool(build_workers) as pool:
+            stages['create_word_documents_standalone_parallel'], _ = time_stage(
+                lambda: module.create_word_documents_standalone(parsed, output_dir, 'benchmark', True, locale,
+                                                                build_workers=build_workers, pool=pool), repeat)
+    else:
+        documents = sum(len(scenario.tests) for scenario in parsed)
+        stages['create_word_documents_standalone'], _ = time_stage(
+            lambda: module.create_word_documents_standalone(parsed, output_dir, 1, None, None, [locale]), repeat)
+    for stage in stages:
+        if stage.startswith('create_word_documents_standalone'):
+            stages[stage]['documents'] = documents
+            stages[stage]['documents_per_second'] = documents / stages[stage]['best_seconds']
+            stages[stage]['rows_per_second'] = rows / stages[stage]['best_seconds']
+    return stages
+
+
+def git_commit():
+    """Return the commit the benchmark ran against, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPOSITORY_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print how each stage's best time moved against an earlier results file."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {os.path.basename(baseline_path)} ({baseline.get('commit') or 'unknown commit'}):")
+    for script, stages in results['scripts'].items():
+        for stage, timing in stages.items():
+            before = baseline.get('scripts', {}).get(script, {}).get(stage)
+            if before is None:
+                continue
+            change = 100.0 * (timing['best_seconds'] - before['best_seconds']) / before['best_seconds']
+            print(f"  {script:<14} {stage:<44} {before['best_seconds']:9.3f}s -> {timing['best_seconds']:9.3f}s ({change:+.1f}%)")
+
+
+def run_benchmarks(scale, standalone_sheets=3, repeat=3, latency=0.0, scripts=tuple(SCRIPTS), results_directory=None, baseline=None,
+                   build_workers=2):
+    """Benchmark the selected scripts on a fresh synthetic workload and save the results as JSON."""
+    work_dir = tempfile.mkdtemp(prefix='generator-benchmark-')
+    try:
+        # One sheet for the E2E layout, several for the standalone layout
+        workbooks = {
+            'e2e': os.path.join(work_dir, 'e2e.xlsx'),
+            'standalone': os.path.join(work_dir, 'standalone.xlsx'),
+        }
+        rows = write_workload(workbooks['e2e'], 1, **scale)
+        write_workload(workbooks['standalone'], standalone_sheets, **scale)
+
+        results = {
+            'started': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'workload': dict(scale, rows=rows, standalone_sheets=standalone_sheets),
+            'build_workers': build_workers,
+            'cpus': os.cpu_count(),
+            'repeat': repeat,
+            'translator_latency': latency,
+            'scripts': {},
+        }
+        for name in scripts:
+            module = load_script(name, SCRIPTS[name])
+            layout = 'e2e' if name.startswith('e2e') else 'standalone'
+            print(f"Benchmarking {name}")
+            results['scripts'][name] = benchmark_script(name, module, workbooks[layout], rows, work_dir, repeat, latency,
+                                                         build_workers)
+            for stage, timing in results['scripts'][name].items():
+                print(f"  {stage:<44} {timing['best_seconds']:9.3f}s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if results_directory is not None:
+        os.makedirs(results_directory, exist_ok=True)
+        results_path = os.path.join(results_directory, f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json")
+        with open(results_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+        print(f"Results saved to {results_path}")
+    if baseline is not None:
+        compare(results, baseline)
+    return results
+
+
+if __name__ == "__main__":
+    # Size and shape of the synthetic workload, see workload.iter_workload_rows
+    scale = dict(scenarios=10, tests=10, steps=8, words=20, url_density=0.2, long_word_density=0.02, seed=0)
+
+    # Sheets the standalone workbook is spread over, the E2E scripts only read one
+    standalone_sheets = 3
+
+    # Times each stage runs, the best and median are reported
+    repeat = 3
+
+    # Seconds the stub translator waits per request, 0 measures our own overhead only
+    translator_latency = 0.0
+
+    # Where result files are written, and an earlier result file to compare against (or None)
+    results_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+    baseline = None
+
+    # Processes rendering the E2E document at once in the parallel build, see build_workers in the E2E scripts
+    build_workers = 2
+
+    run_benchmarks(scale, standalone_sheets, repeat, translator_latency, tuple(SCRIPTS), results_directory, baseline, build_workers)
@@ -0,0 +1,94 @@
+import os
+import random
+import sys
+from openpyxl import Workbook
+
+# Make the shared helpers in the repository root importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from common.ingest import COLUMNS
+
+# Ordinary words the generated text is made of
+WORDS = ('open', 'the', 'order', 'screen', 'and', 'check', 'that', 'every', 'line', 'shows', 'correct',
+         'price', 'for', 'customer', 'material', 'plant', 'posting', 'date', 'is', 'saved', 'with', 'status')
+
+ROLES = ('Planner', 'Buyer', 'Warehouse Clerk', 'Finance Controller', 'Quality Inspector')
+WORKSTREAMS = ('Supply', 'Procurement', 'Warehousing', 'Finance', 'Quality')
+
+
+def _sentence(rng, words, url_density, long_word_density):
+    """Make a line of text with roughly the requested share of URLs and over-long words."""
+    parts = []
+    for _ in range(words):
+        if rng.random() < long_word_density:
+            parts.append(''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(20, 45))))
+        else:
+            parts.append(rng.choice(WORDS))
+    if rng.random() < url_density:
+        parts.insert(rng.randrange(len(parts) + 1), f"https://example.com/docs/{rng.randrange(1000)}?page={rng.randrange(10)}&lang=en")
+    # Multi-line cells come out of Excel with _x000D_ before each line break
+    if words > 12:
+        parts.insert(words // 2, '_x000D_\n')
+    return ' '.join(parts)
+
+
+def iter_workload_rows(scenarios=10, tests=10, steps=8, words=20, url_density=0.2, long_word_density=0.02, seed=0):
+    """Yield one tuple of the nine columns per step of a synthetic test suite."""
+    rng = random.Random(seed)
+    for scenario in range(scenarios):
+        scenario_name = f"Scenario {scenario + 1}: {_sentence(rng, 4, 0, 0)}"
+        for test in range(tests):
+            test_id = f"TC-{scenario + 1:03d}-{test + 1:03d}"
+            test_name = f"Test {test + 1} {_sentence(rng, 5, 0, long_word_density)}"
+            description = _sentence(rng, words, url_density, long_word_density)
+            role = rng.choice(ROLES)
+            workstream = rng.choice(WORKSTREAMS)
+            for step in range(steps):
+                yield (scenario_name, test_id, test_name, description, f"Step {step + 1}",
+                       _sentence(rng, words, url_density, long_word_density),
+                       _sentence(rng, words // 2 + 1, url_density, long_word_density), role, workstream)
+
+
+def write_workload(file_path, sheets=1, **scale):
+    """Write a synthetic workbook with the nine expected columns and return its row count.
+
+    Rows are spread over sheets by scenario, one sheet suits the E2E scripts (which only read
+    the first) and several the standalone scripts. scale is passed to iter_workload_rows.
+    """
+    workbook = Workbook(write_only=True)
+    worksheets = [workbook.create_sheet(f"Sheet{i + 1}") for i in range(sheets)]
+    for worksheet in worksheets:
+        worksheet.append(COLUMNS)
+
+    rows = 0
+    scenario_names = {}
+    for row in iter_workload_rows(**scale):
+        # Keep every scenario on one sheet, handing them out to the sheets in turn
+        sheet = scenario_names.setdefault(row[0], len(scenario_names) % sheets)
+        worksheets[sheet].append(row)
+        rows += 1
+
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    workbook.save(file_path)
+    return rows
+
+
+if __name__ == "__main__":
+    # Where to write the workbook
+    output_path = os.path.join(os.getcwd(), "synthetic_tests.xlsx")
+
+    # Size of the suite: scenarios x tests per scenario x steps per test rows
+    scenarios = 10
+    tests = 10
+    steps = 8
+
+    # Words per description, share of texts with a URL and share of words longer than 19 characters
+    words = 20
+    url_density = 0.2
+    long_word_density = 0.02
+
+    # Number of sheets the scenarios are spread over
+    sheets = 1
+
+    rows = write_workload(output_path, sheets, scenarios=scenarios, tests=tests, steps=steps, words=words,
+                          url_density=url_density, long_word_density=long_word_density)
+    print(f"Wrote {rows} rows to {output_path}")
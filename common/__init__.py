@@ -0,0 +1 @@
+"""Helpers shared by the E2E and standalone document generator scripts."""
@@ -0,0 +1,87 @@
+import copy
+import io
+import time
+import weakref
+from docx import Document
+from docx.oxml.ns import qn
+
+from common.instrumentation import get_metrics
+
+# Saved preamble documents, keyed on the function that built them and its arguments
+_preambles = {}
+
+# What every part of a document held when new_document loaded it, keyed on the document's package
+_loaded_parts = weakref.WeakKeyDictionary()
+
+# Step table prototypes and the positions of their fill-in runs, keyed on the function that built them and its arguments
+_step_tables = {}
+
+
+def preamble_package(add_preamble, args=()):
+    """Return the saved .docx bytes of a document holding only the preamble add_preamble(doc, *args) adds."""
+    preamble = _preambles.get((add_preamble, args))
+    if preamble is None:
+        doc = Document()
+        add_preamble(doc, *args)
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        preamble = _preambles[(add_preamble, args)] = buffer.getvalue()
+    return preamble
+
+
+def new_document(add_preamble, args=()):
+    """Return a new Document that already contains the preamble add_preamble(doc, *args) adds.
+
+    The preamble is built once per process and saved to bytes. Every later document is
+    loaded from those bytes, which brings the section setup, styles and hyperlink
+    relationship along with it, instead of rebuilding it object by object. args, such as
+    the locale, must be hashable; each combination gets its own saved preamble.
+    What its parts hold is recorded for loaded_parts.
+    """
+    doc = Document(io.BytesIO(preamble_package(add_preamble, args)))
+    _loaded_parts[doc.part.package] = part_contents(doc.part.package)
+    return doc
+
+
+def part_contents(package):
+    """Return {part name: (part, its XML element or bytes, number of relationships)} for every part of package.
+
+    Meant to be compared by identity: a part that is replaced, or whose element or bytes are,
+    compares unequal without anything being serialised.
+    """
+    return {str(part.partname)[1:]: (part, getattr(part, '_element', part._blob), len(part.rels))
+            for part in package.iter_parts()}
+
+
+def loaded_parts(doc):
+    """Return part_contents of doc as new_document loaded it, or None for a document it didn't load."""
+    return _loaded_parts.get(doc.part.package)
+
+
+def add_step_table(doc, build_step_table, *values, args=()):
+    """Append a copy of the step table build_step_table(doc, *args) creates, filled in with values.
+
+    build_step_table adds the table with its labels, merges, bold runs and alignment in
+    place and returns it along with the cells that change per step. That table is built
+    once per process and kept as a prototype; every step deep-copies it and only sets the
+    text of the changing cells, in the order build_step_table returned them.
+    """
+    started = time.perf_counter()
+    prototype = _step_tables.get((build_step_table, args))
+    if prototype is None:
+        table, cells = build_step_table(doc, *args)
+        tbl = table._tbl
+        tbl.getparent().remove(tbl)
+        runs = list(tbl.iter(qn('w:r')))
+        positions = [runs.index(cell._tc.xpath('./w:p/w:r')[0]) for cell in cells]
+        prototype = _step_tables[(build_step_table, args)] = (tbl, positions)
+
+    tbl, positions = prototype
+    tbl = copy.deepcopy(tbl)
+    runs = list(tbl.iter(qn('w:r')))
+    for position, value in zip(positions, values):
+        # The run's text setter turns newlines and tabs into breaks and tabs, as cell.text does
+        runs[position].text = value
+    doc.element.body._insert_tbl(tbl)
+    get_metrics().add('table_building', time.perf_counter() - started)
+    return tbl
@@ -0,0 +1,18 @@
+import os
+
+
+def atomic_write(path, data):
+    """Write data, text as UTF-8 or bytes, to path so others see either the old file or the new one.
+
+    The data goes to a file next to path, named after this process so writers in other processes
+    don't collide, which is then swapped in. An interrupted write leaves the old file in place.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data.encode('utf-8') if isinstance(data, str) else data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,167 @@
+import csv
+import os
+from collections import namedtuple
+from openpyxl import load_workbook
+
+from common.instrumentation import get_metrics
+
+# Header names of the nine columns the generators read, in sheet order
+COLUMNS = ('Scenario', 'TEST ID', 'TEST NAME', 'DESCRIPTION', 'Step Name',
+           'STEP DESCRIPTION', 'Expected Results', 'Role', 'Workstream')
+
+# One spreadsheet row, fields in the same order as the Step constructor arguments
+Row = namedtuple('Row', ['Scenario', 'TestID', 'TestName', 'TestDescription', 'StepName',
+                         'StepDescription', 'ExpectedResults', 'Role', 'Workstream'])
+
+
+# Rows read from a Parquet file at a time
+PARQUET_BATCH_ROWS = 10000
+
+# (file, workbook) a worker process reads sheets from, see iter_workbook_sheet
+_sheet_workbook = None
+
+
+def _header_positions(header, source):
+    """Find where each of the nine columns sits in a header row."""
+    positions = {name: i for i, name in enumerate(header) if name is not None}
+    missing = [name for name in COLUMNS if name not in positions]
+    if missing:
+        raise ValueError(f"{source} is missing columns: {', '.join(missing)}")
+    return [positions[name] for name in COLUMNS]
+
+
+def _iter_rows(rows, positions):
+    """Yield a Row of the values at positions for every row of values that isn't blank."""
+    width = max(positions) + 1
+    for values in rows:
+        if len(values) < width:
+            values = tuple(values) + (None,) * (width - len(values))
+        row = Row._make(values[i] for i in positions)
+        if all(value is None for value in row):
+            continue
+        yield row
+
+
+def iter_sheet_rows(sheet, file_path, use_header=False):
+    """Yield a Row for every non-blank data row of one worksheet."""
+    if use_header:
+        header = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        positions = _header_positions(header, f"{file_path} [{sheet.title}]")
+    else:
+        positions = list(range(len(COLUMNS)))
+    yield from _iter_rows(sheet.iter_rows(min_row=2, max_col=max(positions) + 1, values_only=True), positions)
+
+
+def iter_workbook_rows(file_path, first_sheet_only=False, use_header=False):
+    """Stream the nine test columns of a workbook as Row records.
+
+    The workbook is opened read-only so rows are parsed as they are consumed and only
+    the columns we use are materialised. With use_header the columns are found by name,
+    otherwise the first nine columns are taken in order.
+    """
+    metrics = get_metrics()
+    with metrics.stage('workbook_load'):
+        workbook = load_workbook(filename=file_path, read_only=True, data_only=True)
+    try:
+        sheets = workbook.worksheets[:1] if first_sheet_only else workbook.worksheets
+        for sheet in sheets:
+            yield from metrics.timed(iter_sheet_rows(sheet, file_path, use_header), 'row_parsing')
+    finally:
+        workbook.close()
+
+
+def iter_workbook_sheet(file_path, sheet, use_header=False):
+    """Stream the Rows of one worksheet, by position, keeping the workbook open for this process's next sheet.
+
+    For worker processes that parse a workbook's sheets in parallel: each opens the workbook
+    once however many of its sheets it is handed. It stays open until the process reads
+    another workbook or exits.
+    """
+    global _sheet_workbook
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    if _sheet_workbook is None or _sheet_workbook[0] != key:
+        if _sheet_workbook is not None:
+            _sheet_workbook[1].close()
+        with get_metrics().stage('workbook_load'):
+            _sheet_workbook = (key, load_workbook(filename=file_path, read_only=True, data_only=True))
+    worksheet = _sheet_workbook[1].worksheets[sheet]
+    yield from get_metrics().timed(iter_sheet_rows(worksheet, file_path, use_header), 'row_parsing')
+
+
+def count_sheets(file_path):
+    """How many sheets iter_input_rows reads from file_path, CSV and Parquet exports count as one."""
+    if READERS.get(os.path.splitext(file_path)[1].lower()) is not iter_workbook_rows:
+        return 1
+    workbook = load_workbook(filename=file_path, read_only=True, data_only=True)
+    try:
+        return len(workbook.worksheets)
+    finally:
+        workbook.close()
+
+
+def iter_csv_rows(file_path, first_sheet_only=False, use_header=False):
+    """Stream the nine test columns of a CSV export as Row records, the same way as one worksheet.
+
+    The file is read a buffer at a time, so memory stays flat however many rows there are.
+    Empty fields are read as blank cells, everything else stays text as the export wrote it.
+    """
+    metrics = get_metrics()
+    # utf-8-sig drops the byte order mark Excel puts at the start of its CSV files
+    with open(file_path, encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        positions = _header_positions(header, file_path) if use_header else list(range(len(COLUMNS)))
+        rows = ([value if value != '' else None for value in values] for values in reader)
+        yield from metrics.timed(_iter_rows(rows, positions), 'row_parsing')
+
+
+def iter_parquet_rows(file_path, first_sheet_only=False, use_header=False):
+    """Stream the nine test columns of a Parquet export as Row records, the same way as one worksheet.
+
+    Only the nine columns are read from the file, a batch of rows at a time. With use_header
+    they are found by name, otherwise the first nine columns are taken in order. Needs pyarrow.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ImportError(f"Reading {file_path} needs pyarrow, install it with pip install pyarrow") from error
+
+    metrics = get_metrics()
+    with metrics.stage('workbook_load'):
+        parquet = pq.ParquetFile(file_path)
+    try:
+        names = parquet.schema_arrow.names
+        if use_header:
+            columns = [names[i] for i in _header_positions(names, file_path)]
+        else:
+            columns = names[:len(COLUMNS)]
+        positions = list(range(len(COLUMNS)))
+        batches = parquet.iter_batches(batch_size=PARQUET_BATCH_ROWS, columns=columns)
+        rows = (values for batch in batches for values in zip(*(column.to_pylist() for column in batch.columns)))
+        yield from metrics.timed(_iter_rows(rows, positions), 'row_parsing')
+    finally:
+        parquet.close()
+
+
+# How each kind of input file is read, keyed on its extension. Every reader takes
+# (file_path, first_sheet_only, use_header) and yields Row records.
+READERS = {
+    '.xlsx': iter_workbook_rows,
+    '.xlsm': iter_workbook_rows,
+    '.xltx': iter_workbook_rows,
+    '.xltm': iter_workbook_rows,
+    '.csv': iter_csv_rows,
+    '.parquet': iter_parquet_rows,
+}
+
+# Extensions of the files the generators pick up from their input folder
+INPUT_EXTENSIONS = tuple(READERS)
+
+
+def iter_input_rows(file_path, first_sheet_only=False, use_header=False):
+    """Stream the nine test columns of any input file the generators read, picking the reader by extension."""
+    reader = READERS.get(os.path.splitext(file_path)[1].lower())
+    if reader is None:
+        raise ValueError(f"{file_path} is not a file the generators read ({', '.join(INPUT_EXTENSIONS)})")
+    return reader(file_path, first_sheet_only, use_header)
@@ -0,0 +1,177 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from common.fileio import atomic_write
+
+# Seconds between progress lines of a long loop
+PROGRESS_INTERVAL = 5.0
+
+# Prefix of every metric name in the Prometheus textfile
+METRIC_PREFIX = 'test_document_generator'
+
+# Stages whose item counts are the rows read and the documents saved
+ROWS_STAGE = 'row_parsing'
+DOCUMENTS_STAGE = 'document_save'
+
+
+class Metrics:
+    """Wall time and item counts per stage of a run, plus free-standing counters.
+
+    Stages are things like workbook_load or document_save. Worker processes record into their
+    own Metrics and hand a snapshot back, which the parent merges into its own. Pipeline
+    threads record into the same Metrics as the thread that started them.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds, count=1):
+        """Record count items of stage that took seconds between them."""
+        with self._lock:
+            totals = self.stages.setdefault(stage, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += count
+
+    @contextmanager
+    def stage(self, stage, count=1):
+        """Time the body of a with block as count items of stage."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started, count)
+
+    def timed(self, iterable, stage):
+        """Yield the items of iterable, recording the time spent producing each one under stage."""
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(stage, time.perf_counter() - started, 0)
+                return
+            self.add(stage, time.perf_counter() - started)
+            yield item
+
+    def count(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def reset(self):
+        self.stages.clear()
+        self.counters.clear()
+
+    def snapshot(self):
+        """Everything recorded so far as plain data, picklable and JSON serialisable."""
+        return {'stages': {stage: list(totals) for stage, totals in self.stages.items()},
+                'counters': dict(self.counters)}
+
+    def merge(self, snapshot):
+        """Add a snapshot taken in another process to these totals."""
+        for stage, (seconds, count) in snapshot['stages'].items():
+            self.add(stage, seconds, count)
+        for counter, amount in snapshot['counters'].items():
+            self.count(counter, amount)
+
+    def summary(self, elapsed):
+        """The totals along with the run's wall time and its row and document throughput."""
+        rows = self.stages.get(ROWS_STAGE, (0.0, 0))[1]
+        documents = self.stages.get(DOCUMENTS_STAGE, (0.0, 0))[1]
+        return {
+            'elapsed_seconds': elapsed,
+            'rows': rows,
+            'documents': documents,
+            'rows_per_second': rows / elapsed if elapsed else 0.0,
+            'documents_per_second': documents / elapsed if elapsed else 0.0,
+            'stages': {stage: {'seconds': seconds, 'count': count} for stage, (seconds, count) in self.stages.items()},
+            'counters': dict(self.counters),
+        }
+
+    def report(self, elapsed):
+        """Describe where the run's time went for the end-of-run output."""
+        summary = self.summary(elapsed)
+        lines = [f"Run took {elapsed:.1f}s: {summary['rows']} rows ({summary['rows_per_second']:.1f}/s), "
+                 f"{summary['documents']} documents ({summary['documents_per_second']:.2f}/s)"]
+        for stage, totals in sorted(summary['stages'].items(), key=lambda item: -item[1]['seconds']):
+            lines.append(f"  {stage:<22} {totals['seconds']:9.2f}s  {totals['count']:>8} items")
+        for counter, amount in sorted(summary['counters'].items()):
+            lines.append(f"  {counter:<22} {amount:>10}")
+        return "\n".join(lines)
+
+    def write(self, path, elapsed):
+        """Save the summary as JSON, or as a Prometheus textfile when path ends in .prom."""
+        summary = self.summary(elapsed)
+        if path.endswith('.prom'):
+            text = _prometheus_text(summary)
+        else:
+            text = json.dumps(summary, indent=1, sort_keys=True) + "\n"
+        # A collector never reads half a file
+        atomic_write(path, text)
+
+
+def _prometheus_text(summary):
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{METRIC_PREFIX}_{name}{labels} {value}")
+
+    stages = sorted(summary['stages'].items())
+    metric('run_seconds', 'gauge', 'Wall time of the last run.', [('', summary['elapsed_seconds'])])
+    metric('rows_per_second', 'gauge', 'Rows read per second of the last run.', [('', summary['rows_per_second'])])
+    metric('documents_per_second', 'gauge', 'Documents saved per second of the last run.',
+           [('', summary['documents_per_second'])])
+    metric('stage_seconds', 'gauge', 'Time spent in each stage of the last run.',
+           [(f'{{stage="{stage}"}}', totals['seconds']) for stage, totals in stages])
+    metric('stage_items', 'gauge', 'Items handled by each stage of the last run.',
+           [(f'{{stage="{stage}"}}', totals['count']) for stage, totals in stages])
+    for counter, amount in sorted(summary['counters'].items()):
+        metric(counter, 'gauge', f"{counter.replace('_', ' ').capitalize()} in the last run.", [('', amount)])
+    return "\n".join(lines) + "\n"
+
+
+class Progress:
+    """Prints how far a long loop has got, its rate and an ETA, at most once per interval."""
+
+    def __init__(self, total, unit, interval=PROGRESS_INTERVAL):
+        self.total = total
+        self.unit = unit
+        self.interval = interval
+        self.done = 0
+        self.started = self.last_printed = time.perf_counter()
+
+    def update(self, done=1):
+        self.done += done
+        now = time.perf_counter()
+        if self.done < self.total and now - self.last_printed < self.interval:
+            return
+        self.last_printed = now
+        rate = self.done / (now - self.started) if now > self.started else 0.0
+        eta = (self.total - self.done) / rate if rate else 0.0
+        print(f"{self.done}/{self.total} {self.unit} ({rate:.1f}/s, ETA {eta:.0f}s)")
+
+
+_default_metrics = None
+
+
+def get_metrics():
+    """Return the process-wide metrics, creating them on first use."""
+    global _default_metrics
+    if _default_metrics is None:
+        _default_metrics = Metrics()
+    return _default_metrics
+
+
+def call_measured(func, *args):
+    """Run func(*args) in a worker process, returning its result with the metrics it recorded."""
+    metrics = get_metrics()
+    metrics.reset()
+    result = func(*args)
+    return result, metrics.snapshot()
@@ -0,0 +1,112 @@
+import copy
+import os
+
+# Language the workbooks are written in, its documents need no translation
+SOURCE_LOCALE = 'en'
+
+# The fixed text of every document, per locale. A locale without a bundle here gets the
+# English bundle machine translated on first use, see get_labels.
+LABELS = {
+    'en': {
+        'instructions_title': "Test Instructions",
+        'instructions_click': "Please click",
+        'instructions_link': "UAT Test Instructions.docx",
+        'instructions_read': "and read the instructions before you start testing!",
+        'execution_title': "UAT Test Script Execution",
+        'tester_table': ['Business Area', 'Responsible Tester', 'Status', 'Date', 'Country'],
+        'business_areas': ['Demand Planning', 'Supply Planning', 'Procurement', 'Warehousing', 'Quality Management',
+                           'Production Planning', 'Plant maintenance', 'Commercial Finance', 'Order to Cash', 'FP&A-S4',
+                           'R2R', 'MDG'],
+        'test_step': 'Test Step',
+        'role': 'Role',
+        'test_status': 'Test Status <Pass/Fail>',
+        'description': 'Description',
+        'expected': 'Expected',
+        # The standalone step table's wording, which differs from the E2E one in Spanish
+        'expected_results': 'Expected',
+        'actual_result': 'Actual Result',
+        'tester_comments': 'Tester Comments',
+        'test_name': "Test Name",
+        'test_id': "Test ID",
+        'test_description': "Test Description",
+        'screenshot': "Please attach the test Screenshot Below, make sure to include the system date and time:",
+        'volume_index': "The tests of this workbook are split into volumes, open each one from the links below:",
+        'volume': "Volume",
+        'tests': "tests",
+        'steps': "steps",
+    },
+    'es': {
+        'instructions_title': "Instrucciones de prueba",
+        'instructions_click': "Por favor haga clic",
+        'instructions_link': "¡Instrucciones del examen UAT.docx",
+        'instructions_read': "Y lea las instrucciones antes de comenzar a probar!",
+        'execution_title': "Ejecución del script de prueba UAT",
+        'tester_table': ['Área de negocio', 'Probador responsable', 'Estado', 'Fecha', 'País'],
+        'business_areas': ['Planificación de la demanda', 'Planificación del suministro', 'Adquisiciones',
+                           'Almacenamiento', 'Gestión de la calidad', 'Planificación de la producción',
+                           'Mantenimiento de la planta', 'Finanzas comerciales', 'Pedido a efectivo', 'FP&A-S4', 'R2R',
+                           'MDG'],
+        'test_step': 'Paso de prueba',
+        'role': 'Role',
+        'test_status': 'Estado de la prueba <Aprobado/Reprobado>',
+        'description': 'Descripción',
+        'expected': 'Resultado esperado',
+        'expected_results': 'Resultados esperados',
+        'actual_result': 'Resultado real',
+        'tester_comments': 'Comentarios del probador',
+        'test_name': "Nombre de la prueba",
+        'test_id': "Identificación de la prueba",
+        'test_description': "Descripción de la prueba",
+        'screenshot': "Adjunte la captura de pantalla de prueba a continuación, asegúrese de incluir la fecha y la hora del sistema:",
+        'volume_index': "Las pruebas de este libro están divididas en volúmenes, abra cada uno desde los enlaces a continuación:",
+        'volume': "Volumen",
+        'tests': "pruebas",
+        'steps': "pasos",
+    },
+}
+
+
+def get_labels(locale):
+    """Return the label bundle for locale, machine translating the English one if there is none.
+
+    Translated bundles go through the translation cache, so only the first run for a new
+    locale sends anything. Add a bundle to LABELS to replace them with checked wording.
+    """
+    labels = LABELS.get(locale)
+    if labels is None:
+        source = LABELS[SOURCE_LOCALE]
+        texts = [text for value in source.values() for text in (value if isinstance(value, list) else [value])]
+        # A label that could not be translated stays in English for the rest of the run
+        translations = translate_for_locales({locale: texts})[0][locale]
+        labels = LABELS[locale] = {
+            name: [translations[text] for text in value] if isinstance(value, list) else translations[value]
+            for name, value in source.items()}
+    return labels
+
+
+def translate_for_locales(texts_by_locale):
+    """Translate texts into every locale at once, {locale: texts} in, {locale: {text: translation}} out.
+
+    All locales share one translation pass and the translation cache. The source locale
+    needs no translation and is left out, as are locales with nothing to translate. Also
+    returns {locale: texts that could not be translated}, see translate_to_locales.
+    """
+    wanted = {locale: texts for locale, texts in texts_by_locale.items() if locale != SOURCE_LOCALE and texts}
+    if not wanted:
+        return {}, {}
+    # Imported here so runs that only produce the source locale don't load the translator
+    from common.translation import translate_to_locales
+    return translate_to_locales(wanted)
+
+
+def localised_copy(obj, fields, translate):
+    """Return a shallow copy of obj with each of fields passed through translate, obj is left as it is."""
+    result = copy.copy(obj)
+    for field in fields:
+        setattr(result, field, translate(getattr(obj, field)))
+    return result
+
+
+def locale_directory(directory, locale, locales):
+    """Where a locale's documents are saved: directory itself when only one locale is produced, else a subfolder per locale."""
+    return directory if len(locales) == 1 else os.path.join(directory, locale)
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+
+from common.fileio import atomic_write
+
+# Bytes read at a time when hashing a workbook
+CHUNK_SIZE = 1024 * 1024
+
+
+def generator_version(script_path):
+    """Hash a script together with the shared helpers, so editing either rebuilds every document.
+
+    The script's settings at the bottom, in main, are left out: they don't change what a document holds
+    (the locales are recorded in the manifest), and the machines of a sharded run each set
+    their own shard_index.
+    """
+    common_dir = os.path.dirname(os.path.abspath(__file__))
+    paths = sorted(os.path.join(common_dir, name) for name in os.listdir(common_dir) if name.endswith('.py'))
+    digest = hashlib.sha256()
+    with open(script_path, 'rb') as f:
+        digest.update(f.read().split(b'\ndef main(')[0])
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def manifest_path(word_files_directory, script_path, shard=(0, 1)):
+    """Where a script keeps its manifest, one per script so EN and SP runs don't mix, and one per shard of a sharded run."""
+    name = os.path.splitext(os.path.basename(script_path))[0]
+    index, count = shard
+    if count > 1:
+        name = f"{name}.shard-{index + 1}-of-{count}"
+    return os.path.join(word_files_directory, f"{name}.manifest.json")
+
+
+def file_digest(path):
+    """Hash a workbook's bytes, a quick check before its rows are parsed."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_digest(rows):
+    """Hash tuples of values in order, e.g. a test's details followed by the fields of each step."""
+    digest = hashlib.sha256()
+    for values in rows:
+        digest.update(repr(tuple(values)).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def record_key(*values):
+    """Turn the values identifying a test into a string usable as a JSON key."""
+    return json.dumps([str(value) for value in values], ensure_ascii=False)
+
+
+def load_manifest(path):
+    """Return the generator version and workbook entries saved at path, or (None, {}) if there are none.
+
+    Each workbook entry, keyed on the workbook's file name, is a dict with the 'file' digest
+    of the workbook, the 'locales' it was built for, its 'outputs': {key: [content digest, output path]}
+    and the number of outputs 'expected' from the whole workbook, more than a shard's outputs
+    when the run was sharded.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None, {}
+    return data.get('version'), data.get('workbooks', {})
+
+
+def is_current(entry, key, digest):
+    """True if the output recorded under key was built from content with this digest and is still on disk."""
+    output = entry['outputs'].get(key) if entry else None
+    return digest is not None and output is not None and output[0] == digest and os.path.isfile(output[1])
+
+
+def workbook_is_current(entry, digest, locales):
+    """True if the workbook is byte for byte the one last built for the same locales and all its outputs are still on disk."""
+    return (entry is not None and entry['file'] == digest and entry.get('locales') == list(locales)
+            and all(os.path.isfile(path) for _, path in entry['outputs'].values()))
+
+
+def complete_digest(digest, outputs):
+    """The 'file' digest to record for a workbook: digest, unless an output has no digest and must be built again."""
+    return digest if all(content is not None for content, _ in outputs.values()) else None
+
+
+def update_manifest(path, version, recorded, entries, failures):
+    """Save this run's workbook entries and delete outputs that are no longer produced.
+
+    entries are keyed on workbook path. A workbook that failed keeps its recorded outputs,
+    marked so they are rebuilt next time. Outputs of deleted workbooks and tests are removed.
+    """
+    workbooks = {os.path.basename(file_path): entry for file_path, entry in entries.items()}
+    for file_path in failures:
+        entry = recorded.get(os.path.basename(file_path))
+        if entry is not None:
+            workbooks[os.path.basename(file_path)] = {
+                'file': None, 'outputs': {key: [None, output] for key, (_, output) in entry['outputs'].items()}}
+
+    produced = {output for entry in workbooks.values() for _, output in entry['outputs'].values()}
+    for entry in recorded.values():
+        for _, output in entry['outputs'].values():
+            if output not in produced and os.path.isfile(output):
+                os.remove(output)
+                print(f"Removed {os.path.basename(output)}, nothing in the workbooks produces it any more")
+
+    atomic_write(path, json.dumps({'version': version, 'workbooks': workbooks}, ensure_ascii=False, indent=1, sort_keys=True))
@@ -0,0 +1,403 @@
+import io
+import re
+import struct
+import zipfile
+import zlib
+from itertools import chain
+from types import SimpleNamespace
+from xml.sax.saxutils import escape
+from docx.oxml.ns import qn
+from lxml import etree
+
+from common.docbuild import loaded_parts, new_document, part_contents, preamble_package
+
+# Characters lxml refuses to write, python-docx raises on them so we do too
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# Placeholder standing in for a field value while a fragment template is compiled
+_FIELD = re.compile(r'@@(\w+)@@')
+
+# Marker left in the compiled XML where a run's content is rendered
+_RUN_MARKER = re.compile(r'<w:t>@@RUN(\d+)@@</w:t>')
+
+# Opening tag of a run, as opposed to its <w:rPr> properties
+_RUN_START = re.compile(r'<w:r[ >]')
+
+# Namespace declarations lxml repeats on a serialised fragment, document.xml declares them already
+_XMLNS = re.compile(r' xmlns:\w+="[^"]*"')
+
+# References to the package's relationships, which would point into the scratch document a fragment is compiled in
+_RELATIONSHIP_REF = re.compile(r' r:(?:id|embed|link)=')
+
+# Deflate level save_docx uses unless told otherwise: 0 stores parts uncompressed, 1 is fastest, 9 smallest
+DEFAULT_COMPRESSLEVEL = 6
+
+# Zip records written by save_docx, see the .ZIP File Format Specification
+_LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+_CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+_END_RECORD = struct.Struct('<IHHHHIIH')
+
+# Every entry is dated 1980-01-01 00:00, the earliest a zip allows, so a rebuilt document is byte for byte the same
+_DOS_TIME = 0
+_DOS_DATE = (1 << 5) | 1
+
+# Compressed entries of each preamble package's parts, keyed on its add_preamble, args and deflate level
+_static_entries = {}
+
+# Uncompressed parts of each preamble package, keyed on its add_preamble and args
+_preamble_bytes = {}
+
+# Reversed CRC-32 polynomial, and the matrices _crc32_combine moves a CRC past 2**k zero bytes with, by k
+_CRC32_POLYNOMIAL = 0xEDB88320
+_crc32_zeros = []
+
+
+def run_content_xml(text):
+    """Return the <w:t>, <w:br/> and <w:tab/> elements python-docx writes for a run's text."""
+    if _INVALID_XML_CHARS.search(text):
+        raise ValueError("All strings must be XML compatible: Unicode or ASCII, no NULL bytes or control characters")
+    parts = []
+    for piece in re.split(r'([\t\r\n])', text):
+        if piece == '\t':
+            parts.append('<w:tab/>')
+        elif piece in ('\r', '\n'):
+            parts.append('<w:br/>')
+        elif piece:
+            if len(piece.strip()) < len(piece):
+                parts.append(f'<w:t xml:space="preserve">{escape(piece)}</w:t>')
+            else:
+                parts.append(f'<w:t>{escape(piece)}</w:t>')
+    return ''.join(parts)
+
+
+def _fragment_xml(element):
+    """Serialise one body element without the namespace declarations inherited from the document."""
+    xml = etree.tostring(element, encoding='unicode')
+    tag_end = xml.index('>')
+    return _XMLNS.sub('', xml[:tag_end]) + xml[tag_end:]
+
+
+class _Unset(str):
+    """A placeholder that tests false, standing in for an empty value."""
+
+    def __bool__(self):
+        return False
+
+    def __format__(self, format_spec):
+        # f"{value}" on its own is still unset
+        return self if not format_spec else super().__format__(format_spec)
+
+
+def _built_elements(build, fields, add_preamble, args, placeholder):
+    """Return the body elements build adds to a scratch document, every field set to placeholder('@@field@@')."""
+    doc = new_document(add_preamble, args)
+    body = doc.element.body
+    start = len(body) - 1  # everything the builder adds goes in before the final sectPr
+    build(doc, SimpleNamespace(**{field: placeholder(f'@@{field}@@') for field in fields}))
+    return list(body)[start:-1]
+
+
+class FragmentTemplate:
+    """Body XML added by a python-docx builder, compiled once into a string template.
+
+    build(doc, values) is run a single time against a scratch document with every field
+    in values set to a placeholder. The body elements it adds are serialised, and each run
+    whose text contains a placeholder is remembered so render only has to format strings.
+    build is run once more with placeholders that test false, as an empty value would, so
+    runs python-docx only adds for a non-empty text (add_paragraph, add_heading) are left
+    out when their text renders empty.
+    """
+
+    def __init__(self, build, fields, add_preamble, args=()):
+        added = _built_elements(build, fields, add_preamble, args, str)
+        unset_texts = [r.text for element in _built_elements(build, fields, add_preamble, args, _Unset)
+                       for r in element.iter(qn('w:r')) if _FIELD.search(r.text)]
+
+        self._runs = []
+        optional = []
+        for element in added:
+            for r in element.iter(qn('w:r')):
+                text = r.text
+                if _FIELD.search(text):
+                    # Runs missing from the build with unset values are only there when their text isn't empty
+                    if unset_texts and unset_texts[0] == text:
+                        unset_texts.pop(0)
+                        optional.append(False)
+                    else:
+                        optional.append(True)
+                    # Keep the run properties, swap the content for a marker filled in by render
+                    for child in list(r):
+                        if child.tag != qn('w:rPr'):
+                            r.remove(child)
+                    r.add_t(f'@@RUN{len(self._runs)}@@')
+                    self._runs.append((_FIELD.split(text), None))
+
+        xml = ''.join(_fragment_xml(element) for element in added)
+        if _RELATIONSHIP_REF.search(xml):
+            raise ValueError("A fragment can't hold hyperlinks, images or anything else kept in the document's relationships")
+        self._parts = _RUN_MARKER.split(xml)
+        for i in range(1, len(self._parts), 2):
+            run = int(self._parts[i])
+            if optional[run]:
+                # Move the run's opening tag, properties and closing tag in with its content
+                before = self._parts[i - 1]
+                start = list(_RUN_START.finditer(before))[-1].start()
+                self._parts[i - 1] = before[:start]
+                self._parts[i + 1] = self._parts[i + 1][len('</w:r>'):]
+                self._runs[run] = (self._runs[run][0], before[start:])
+
+    def render(self, **values):
+        """Return the fragment's XML with every field filled in from values."""
+        out = []
+        for i, part in enumerate(self._parts):
+            if i % 2 == 0:
+                out.append(part)
+                continue
+            # Odd entries in a run's split text are field names, even ones literal text
+            pieces, opening = self._runs[int(part)]
+            text = ''.join(values[piece] if j % 2 else piece for j, piece in enumerate(pieces))
+            if opening is None:
+                out.append(run_content_xml(text))
+            elif text:
+                out.append(f'{opening}{run_content_xml(text)}</w:r>')
+        return ''.join(out)
+
+
+class StreamingDocxWriter:
+    """Writes a .docx whose body is streamed into the zip instead of held as a python-docx tree.
+
+    Every part of the preamble package except word/document.xml is copied over unchanged.
+    document.xml is written as the preamble's body, then whatever fragments are passed to
+    write, then the preamble's section properties, so only one fragment is in memory at a time.
+    """
+
+    def __init__(self, path, add_preamble, compression=zipfile.ZIP_DEFLATED, args=()):
+        template = zipfile.ZipFile(io.BytesIO(preamble_package(add_preamble, args)))
+        document_xml = template.read('word/document.xml').decode('utf-8')
+        body_end = document_xml.rindex('<w:sectPr')
+        self._tail = document_xml[body_end:]
+
+        self._zip = zipfile.ZipFile(path, 'w', compression)
+        for info in template.infolist():
+            if info.filename != 'word/document.xml':
+                self._zip.writestr(info.filename, template.read(info.filename))
+        self._document = self._zip.open('word/document.xml', 'w', force_zip64=True)
+        self.write(document_xml[:body_end])
+
+    def write(self, xml):
+        self._document.write(xml.encode('utf-8'))
+
+    def close(self):
+        if self._document is not None:
+            self.write(self._tail)
+            self._document.close()
+            self._document = None
+            self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _zip_entry(name, data, compresslevel):
+    """Compress one part, returning what save_docx writes for it: name, method, CRC, stored bytes and size."""
+    if compresslevel == 0:
+        method, stored = zipfile.ZIP_STORED, data
+    else:
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+        method, stored = zipfile.ZIP_DEFLATED, compressor.compress(data) + compressor.flush()
+    return name.encode('utf-8'), method, zlib.crc32(data), stored, len(data)
+
+
+def _write_entry(f, central, name, method, crc, stored, size):
+    """Write one _zip_entry at the end of the open file f and add its central directory record to central."""
+    offset = f.tell()
+    f.write(_LOCAL_HEADER.pack(0x04034b50, 20, 0, method, _DOS_TIME, _DOS_DATE, crc, len(stored), size, len(name), 0))
+    f.write(name)
+    f.write(stored)
+    central.append(_CENTRAL_HEADER.pack(0x02014b50, 20, 20, 0, method, _DOS_TIME, _DOS_DATE, crc, len(stored), size,
+                                        len(name), 0, 0, 0, 0, 0, offset) + name)
+
+
+def _write_directory(f, central):
+    directory = b''.join(central)
+    start = f.tell()
+    f.write(directory)
+    f.write(_END_RECORD.pack(0x06054b50, 0, 0, len(central), len(central), len(directory), start, 0))
+
+
+def _write_zip(path, entries):
+    """Write entries from _zip_entry to path as a zip file, their stored bytes as they are."""
+    central = []
+    with open(path, 'wb') as f:
+        for entry in entries:
+            _write_entry(f, central, *entry)
+        _write_directory(f, central)
+
+
+def static_entries(add_preamble, args=(), compresslevel=DEFAULT_COMPRESSLEVEL):
+    """Return the parts of the preamble package, each compressed once per run at compresslevel, in package order."""
+    key = (add_preamble, args, compresslevel)
+    entries = _static_entries.get(key)
+    if entries is None:
+        template = zipfile.ZipFile(io.BytesIO(preamble_package(add_preamble, args)))
+        entries = _static_entries[key] = {
+            info.filename: _zip_entry(info.filename, template.read(info.filename), compresslevel) for info in template.infolist()}
+    return entries
+
+
+def _preamble_parts(add_preamble, args=()):
+    """Return the uncompressed bytes of every part of the preamble package, keyed on part name."""
+    key = (add_preamble, args)
+    parts = _preamble_bytes.get(key)
+    if parts is None:
+        template = zipfile.ZipFile(io.BytesIO(preamble_package(add_preamble, args)))
+        parts = _preamble_bytes[key] = {name: template.read(name) for name in template.namelist()}
+    return parts
+
+
+def _keeps_preamble_parts(doc, add_preamble, args=()):
+    """True if every part of doc but the document and its relationships is the preamble's, as doc.save would write it.
+
+    The parts are compared by identity with what new_document loaded, so a document that only
+    had its body built serialises none of them. A part that was replaced, or given another
+    element, bytes or relationship, is serialised and compared with the preamble's bytes.
+    """
+    loaded = loaded_parts(doc)
+    contents = part_contents(doc.part.package)
+    if loaded is None or contents.keys() != loaded.keys():
+        return False
+    preamble = _preamble_parts(add_preamble, args)
+    for name, (part, _, relationships) in contents.items():
+        if part is doc.part or contents[name] == loaded[name]:
+            continue
+        if part.blob != preamble.get(name):
+            return False
+        if relationships and part.rels.xml != preamble.get(part.partname.rels_uri[1:]):
+            return False
+    return True
+
+
+def save_docx(doc, path, add_preamble, args=(), compresslevel=DEFAULT_COMPRESSLEVEL):
+    """Save a document started with new_document(add_preamble, args), compressing only what it changed.
+
+    The styles, theme, settings, numbering, content types and other parts are the preamble's,
+    so their compressed bytes are made once per run and copied into every document. Only
+    word/document.xml and its relationships are compressed again. A document with any other
+    part added, removed or replaced, e.g. an image, is saved the ordinary way with doc.save.
+    The parts are checked by identity, so a change made in place, such as restyling Normal,
+    isn't seen: make it in add_preamble, or save with doc.save. compresslevel 0 stores the
+    parts uncompressed.
+    """
+    if not _keeps_preamble_parts(doc, add_preamble, args):
+        doc.save(path)
+        return
+    entries = static_entries(add_preamble, args, compresslevel)
+    part = doc.part
+    document_name = part.partname[1:]
+    rels_name = part.partname.rels_uri[1:]
+    fresh = {document_name: _zip_entry(document_name, part.blob, compresslevel),
+             rels_name: _zip_entry(rels_name, part.rels.xml, compresslevel)}
+    _write_zip(path, [fresh.get(name, entry) for name, entry in entries.items()])
+
+
+def deflate_fragment(xml, compresslevel=DEFAULT_COMPRESSLEVEL, final=False):
+    """Encode and compress body XML as one piece of a document.xml joined by write_stitched_docx.
+
+    Each piece is deflated on its own and ends on a sync flush, so pieces compressed in
+    different processes join, in order, into one deflate stream; only the final piece
+    closes it. Returns (stored bytes, CRC-32, size) of the piece.
+    """
+    data = xml.encode('utf-8')
+    if compresslevel == 0:
+        return data, zlib.crc32(data), len(data)
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+    stored = compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+    return stored, zlib.crc32(data), len(data)
+
+
+def _gf2_times(operator, vector):
+    """Apply a 32x32 bit matrix, given as its 32 columns, to a 32-bit vector."""
+    total = 0
+    column = 0
+    while vector:
+        if vector & 1:
+            total ^= operator[column]
+        vector >>= 1
+        column += 1
+    return total
+
+
+def _crc32_zeros_operator(power):
+    """Return the matrix that moves a CRC-32 past 2**power zero bytes, squared up from one zero bit once per run."""
+    while len(_crc32_zeros) <= power:
+        if _crc32_zeros:
+            operator = _crc32_zeros[-1]
+            operator = [_gf2_times(operator, column) for column in operator]
+        else:
+            operator = [_CRC32_POLYNOMIAL] + [1 << bit for bit in range(31)]
+            for _ in range(3):
+                operator = [_gf2_times(operator, column) for column in operator]
+        _crc32_zeros.append(operator)
+    return _crc32_zeros[power]
+
+
+def _crc32_combine(crc, next_crc, next_size):
+    """CRC-32 of two byte strings joined, from the CRC-32 of each and the size of the second.
+
+    The first CRC is moved past next_size zero bytes one set bit of the size at a time, as
+    zlib's crc32_combine does, so it costs O(log next_size) and reads no data.
+    """
+    power = 0
+    while next_size:
+        if next_size & 1:
+            crc = _gf2_times(_crc32_zeros_operator(power), crc)
+        next_size >>= 1
+        power += 1
+    return crc ^ next_crc
+
+
+def write_stitched_docx(path, add_preamble, pieces, args=(), compresslevel=DEFAULT_COMPRESSLEVEL):
+    """Write a .docx whose body is the preamble's followed by pieces from deflate_fragment, in order.
+
+    Lets worker processes render and compress parts of one document at the same time, this
+    only copies their bytes into the file as they arrive and works out the part's CRC from
+    theirs. pieces may be a generator, one piece is held at a time. Every other part is the
+    preamble's, compressed once per run. The pieces must not refer to relationships, which
+    FragmentTemplate makes sure of.
+    """
+    template = zipfile.ZipFile(io.BytesIO(preamble_package(add_preamble, args)))
+    document_xml = template.read('word/document.xml').decode('utf-8')
+    body_end = document_xml.rindex('<w:sectPr')
+    method = zipfile.ZIP_STORED if compresslevel == 0 else zipfile.ZIP_DEFLATED
+
+    central = []
+    with open(path, 'wb') as f:
+        for name, entry in static_entries(add_preamble, args, compresslevel).items():
+            if name != 'word/document.xml':
+                _write_entry(f, central, *entry)
+                continue
+
+            # Sizes and CRC are only known at the end, so the local header is written again once they are
+            offset = f.tell()
+            header_size = _LOCAL_HEADER.size + len(entry[0])
+            f.seek(header_size, io.SEEK_CUR)
+            crc, stored_size, size = 0, 0, 0
+            parts = chain([deflate_fragment(document_xml[:body_end], compresslevel)], pieces,
+                          [deflate_fragment(document_xml[body_end:], compresslevel, final=True)])
+            for stored, piece_crc, piece_size in parts:
+                f.write(stored)
+                crc = _crc32_combine(crc, piece_crc, piece_size)
+                stored_size += len(stored)
+                size += piece_size
+            if size > 0xFFFFFFFF:
+                raise ValueError(f"{path} is too big for one document, split it into volumes")
+            f.seek(offset)
+            f.write(_LOCAL_HEADER.pack(0x04034b50, 20, 0, method, _DOS_TIME, _DOS_DATE, crc, stored_size, size, len(entry[0]), 0))
+            f.write(entry[0])
+            f.seek(0, io.SEEK_END)
+            central.append(_CENTRAL_HEADER.pack(0x02014b50, 20, 20, 0, method, _DOS_TIME, _DOS_DATE, crc, stored_size, size,
+                                                len(entry[0]), 0, 0, 0, 0, 0, offset) + entry[0])
+        _write_directory(f, central)
@@ -0,0 +1,103 @@
+import os
+import traceback
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+from itertools import islice
+
+from common.instrumentation import call_measured, get_metrics
+from common.pipeline import chunked
+
+# What a worker reports back about one saved document
+DocumentResult = namedtuple('DocumentResult', ['path', 'steps', 'build_seconds', 'save_seconds'])
+
+@contextmanager
+def process_pool(workers=1):
+    """Start a pool of workers processes for iter_in_processes to share, or give None for 1 worker.
+
+    Every process is started before this returns, so enter it before starting any thread (prefetch,
+    IOThread): a process forked while another thread holds a lock, such as the metrics' or the
+    translation cache's, would wait on that lock forever.
+    """
+    if workers is None or workers <= 1:
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # A forking pool starts all its processes on the first task, the others only use fresh processes
+        executor.submit(os.getpid).result()
+        yield executor
+
+
+def iter_in_processes(func, tasks, workers=1, chunksize=None, pool=None):
+    """Yield func(*task) for every task, in task order, using a pool of worker processes.
+
+    With workers set to 1 (or a single task) everything runs in this process. func and
+    the task arguments must be picklable, so func has to be a module-level function.
+    tasks may be a generator, e.g. prefetch's, which the pool draws from as workers free
+    up so the first results come back while later tasks are still being produced.
+    Metrics recorded in the workers are merged into this process's metrics. Given a pool from
+    process_pool, of workers processes, the tasks run there and the pool is left open for more.
+    """
+    sized = hasattr(tasks, '__len__')
+    if workers is None or workers <= 1 or (sized and len(tasks) <= 1):
+        for task in tasks:
+            yield func(*task)
+        return
+
+    if sized:
+        workers = min(workers, len(tasks))
+        # Hand out several tasks per round trip so small documents don't drown in pickling overhead
+        chunksize = chunksize or max(1, len(tasks) // (workers * 4))
+    chunks = chunked(tasks, chunksize or 1)
+    with nullcontext(pool) if pool is not None else ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep a couple of chunks queued per worker, enough to stay busy without draining the producer
+        pending = deque(executor.submit(call_measured, _run_chunk, func, chunk)
+                        for chunk in islice(chunks, workers * 2))
+        while pending:
+            results, snapshot = pending.popleft().result()
+            get_metrics().merge(snapshot)
+            yield from results
+            for chunk in islice(chunks, 1):
+                pending.append(executor.submit(call_measured, _run_chunk, func, chunk))
+
+
+def _run_chunk(func, chunk):
+    return [func(*task) for task in chunk]
+
+
+def run_workbooks(func, jobs, workers=1):
+    """Run func(file_path, *args) for every (file_path, *args) job, largest workbook first.
+
+    A workbook that raises is reported and the others carry on. Returns two dicts keyed
+    on file path: what func returned for each workbook that finished, and the exception
+    for each one that failed. Metrics recorded in the workers are merged into this process's.
+    """
+    # Start the biggest workbooks first so one large file isn't left running alone at the end
+    jobs = sorted(jobs, key=lambda job: os.path.getsize(job[0]), reverse=True)
+    results = {}
+    failures = {}
+
+    def report_failure(file_path, error):
+        failures[file_path] = error
+        print(f"Failed to process {os.path.basename(file_path)}:")
+        print("".join(traceback.format_exception(error)))
+
+    if workers is None or workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            try:
+                results[job[0]] = func(*job)
+            except Exception as error:
+                report_failure(job[0], error)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            futures = {executor.submit(call_measured, func, *job): job[0] for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]], snapshot = future.result()
+                    get_metrics().merge(snapshot)
+                except Exception as error:
+                    report_failure(futures[future], error)
+
+    if failures:
+        print(f"{len(failures)} of {len(jobs)} workbooks failed: {', '.join(os.path.basename(path) for path in failures)}")
+    return results, failures
@@ -0,0 +1,136 @@
+import queue
+import threading
+
+# Texts translated in one go while the documents before them are built, enough to keep the
+# translator's CONCURRENCY requests (common.translation) busy for a while
+TRANSLATION_CHUNK = 200
+
+# Items a stage may run ahead of the next one, e.g. translated chunks or documents waiting to be saved
+QUEUE_DEPTH = 2
+
+# Seconds a blocked producer waits before checking whether its consumer has gone
+POLL_INTERVAL = 0.1
+
+_DONE = object()
+
+
+class _Failure:
+    """Carries an exception raised on a pipeline thread over to the thread that consumes its results."""
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+
+def chunked(iterable, size, weight=None):
+    """Yield lists of consecutive items of iterable, each closed at size items or, given weight, once weight(item) of them adds up to size."""
+    chunk = []
+    total = 0
+    for item in iterable:
+        chunk.append(item)
+        total += weight(item) if weight is not None else 1
+        if total >= size:
+            yield chunk
+            chunk = []
+            total = 0
+    if chunk:
+        yield chunk
+
+
+def prefetch(iterable, depth=QUEUE_DEPTH):
+    """Yield the items of iterable, produced on a background thread at most depth items ahead.
+
+    Used to translate the next tests while this thread builds documents from the previous ones.
+    An exception in the producer is raised here in place of the item it failed to produce, and
+    closing the generator early stops the producer once it finishes its current item.
+    """
+    items = queue.Queue(depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as error:
+            put(_Failure(error))
+
+    thread = threading.Thread(target=produce, name='prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+class IOThread:
+    """Runs calls one at a time on a background thread, in the order they were submitted.
+
+    Saving a document here lets the next one be built meanwhile, zip compression and disk
+    writes release the GIL. At most depth calls wait, so submit blocks instead of letting
+    built documents pile up in memory. The first exception raised by a call is raised again
+    from submit or close, and the calls after it are skipped.
+    """
+
+    def __init__(self, depth=QUEUE_DEPTH):
+        self._calls = queue.Queue(depth)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='io', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            call = self._calls.get()
+            if call is _DONE:
+                return
+            if self._error is None:
+                func, args = call
+                try:
+                    func(*args)
+                except BaseException as error:
+                    self._error = error
+
+    def _raise(self):
+        # The error stays set once raised, so the calls still queued behind it are skipped too
+        if self._error is not None:
+            raise self._error
+
+    def submit(self, func, *args):
+        self._raise()
+        self._calls.put((func, args))
+
+    def close(self):
+        """Wait for every submitted call to finish."""
+        if self._thread.is_alive():
+            self._calls.put(_DONE)
+            self._thread.join()
+        self._raise()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # Already failing: finish what was submitted but keep the original exception
+            self._calls.put(_DONE)
+            self._thread.join()
+        return False
@@ -0,0 +1,85 @@
+import hashlib
+import os
+
+from common.ingest import INPUT_EXTENSIONS
+from common.manifest import file_digest, load_manifest, manifest_path, record_key, update_manifest
+
+
+def shard_of(values, shard_count):
+    """Which of shard_count shards the values identifying a test or workbook belong to.
+
+    Hashed with SHA-256 rather than hash(), so every machine and Python version agrees.
+    """
+    digest = hashlib.sha256(record_key(*values).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+
+def in_shard(shard, *values):
+    """True if the values belong to shard, an (index, count) pair. Everything is in the only shard of an unsharded run."""
+    index, count = shard
+    return count <= 1 or shard_of(values, count) == index
+
+
+def merge_shard_manifests(excel_files_directory, word_files_directory, script_path, shard_count):
+    """Check that the shards of a sharded run produced everything, and if so write the combined manifest.
+
+    Every shard's manifest must exist and come from the same generator version, every workbook
+    must have been built from its current bytes by the shards holding it, their outputs must
+    add up to what the workbook produces, all of them must be on disk and no two shards may
+    have written the same file. The combined manifest is the one a single machine's run would
+    have left, so the next run, sharded or not, only rebuilds what changed. Returns the problems found.
+    """
+    problems = []
+    versions = set()
+    shards = []
+    for index in range(shard_count):
+        path = manifest_path(word_files_directory, script_path, (index, shard_count))
+        if not os.path.isfile(path):
+            problems.append(f"Shard {index + 1} of {shard_count} has not finished, {os.path.basename(path)} is missing")
+            continue
+        version, workbooks = load_manifest(path)
+        versions.add(version)
+        shards.append((index, workbooks))
+    if len(versions) > 1:
+        problems.append("The shards ran different versions of the generator, run them again with the same one")
+
+    merged = {}
+    for filename in sorted(os.listdir(excel_files_directory)):
+        file_path = os.path.join(excel_files_directory, filename)
+        if not (os.path.isfile(file_path) and filename.endswith(INPUT_EXTENSIONS)):
+            continue
+        entries = [(index, workbooks[filename]) for index, workbooks in shards if filename in workbooks]
+        if not entries:
+            problems.append(f"{filename} was not built by any shard")
+            continue
+
+        digest = file_digest(file_path)
+        outputs = {}
+        owners = {}
+        for index, entry in entries:
+            if entry['file'] != digest:
+                problems.append(f"Shard {index + 1} failed on {filename} or built it before it last changed")
+            for key, (content, output) in entry['outputs'].items():
+                if owners.get(output, index) != index:
+                    problems.append(f"Shards {owners[output] + 1} and {index + 1} both wrote {output}")
+                owners[output] = index
+                outputs[key] = [content, output]
+        missing = [output for _, output in outputs.values() if not os.path.isfile(output)]
+        if missing:
+            problems.append(f"{len(missing)} documents of {filename} are missing, e.g. {missing[0]}")
+        expected = max(entry.get('expected', 0) for _, entry in entries)
+        if len(outputs) != expected:
+            problems.append(f"{filename} should have {expected} outputs but the shards recorded {len(outputs)}")
+        # A shard that failed on the workbook recorded no locales, any shard that built it did
+        locales = next((entry['locales'] for _, entry in entries if 'locales' in entry), None)
+        merged[file_path] = {'file': digest, 'locales': locales, 'outputs': outputs, 'expected': expected}
+
+    if problems:
+        print("The sharded run is incomplete:\n  " + "\n  ".join(problems))
+        return problems
+
+    # Nothing is removed here, each shard already removed the documents it no longer produces
+    update_manifest(manifest_path(word_files_directory, script_path), versions.pop(), {}, merged, [])
+    documents = {output for entry in merged.values() for _, output in entry['outputs'].values()}
+    print(f"All {shard_count} shards are complete: {len(documents)} documents from {len(merged)} workbooks")
+    return problems
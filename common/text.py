@@ -0,0 +1,90 @@
+import math
+import re
+from itertools import islice
+
+from common.instrumentation import get_metrics
+
+# Excel writes the carriage return of a CRLF line break in a cell as this escape
+CARRIAGE_RETURN = '_x000D_'
+
+# Words longer than this are broken into pieces of this length so table cells can wrap them
+MAX_WORD_LENGTH = 19
+
+# Words that have to be split: ones that are too long, and when the text has markers also any
+# word containing <<< or >>>. Only tried where a word starts.
+_LONG_WORD = re.compile(r'(?<!\S)\S{%d,}' % (MAX_WORD_LENGTH + 1))
+_LONG_OR_MARKED_WORD = re.compile(r'(?<!\S)(?:\S{%d,}|\S*(?:<<<|>>>)\S*)' % (MAX_WORD_LENGTH + 1))
+_MARKER = re.compile(r'(<<<|>>>)')
+
+# Rows cleaned together, column by column
+CLEAN_CHUNK_ROWS = 2048
+
+
+def _chunks(part):
+    return ' '.join([part[i:i + MAX_WORD_LENGTH] for i in range(0, len(part), MAX_WORD_LENGTH)])
+
+
+def split_long_word(word):
+    """Split a long word into spaced pieces, setting any <<< and >>> markers apart first."""
+    if '<<<' in word or '>>>' in word:
+        return ' '.join([_chunks(part) if len(part) > MAX_WORD_LENGTH else part for part in _MARKER.split(word)])
+    return _chunks(word)
+
+
+def clean_text(value, carriage_return=CARRIAGE_RETURN):
+    """Turn a cell value into document text.
+
+    A blank cell (None from a workbook, CSV or Parquet export, or NaN from a float column)
+    is empty text, any other value is converted with str(). Excel's carriage_return escapes
+    are removed, long words are left for break_long_words. Whitespace between words is kept as it is.
+    """
+    if value is None or (type(value) is float and math.isnan(value)):
+        return ''
+    text = str(value)
+    if carriage_return in text:
+        text = text.replace(carriage_return, '')
+    return text
+
+
+def break_long_words(text):
+    """Break up every word of text over MAX_WORD_LENGTH characters or containing a <<< or >>> marker."""
+    if '<<<' in text or '>>>' in text:
+        pattern = _LONG_OR_MARKED_WORD
+    elif len(text) > MAX_WORD_LENGTH:
+        pattern = _LONG_WORD
+    else:
+        # Too short to hold a long word
+        return text
+    return pattern.sub(lambda match: split_long_word(match.group()), text)
+
+
+def clean_columns(rows, cleaners, chunk_size=CLEAN_CHUNK_ROWS):
+    """Yield (row, cleaned values) for every row, cleaning a chunk of rows column by column.
+
+    cleaners holds one function per column, such as clean_text. Most columns repeat the same
+    few values down the sheet (every step of a test repeats its scenario, name, description,
+    role and workstream), so each column remembers what its text values cleaned to and only
+    cleans the values it hasn't seen; the rest of the column is one map over the remembered
+    results. Columns that are mostly new values, like step descriptions, are mapped through
+    their cleaner directly.
+    """
+    metrics = get_metrics()
+    memos = [{} for _ in cleaners]
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        with metrics.stage('text_cleaning', len(chunk)):
+            columns = []
+            for cleaner, memo, column in zip(cleaners, memos, zip(*chunk)):
+                new = set(column).difference(memo)
+                # Only text is remembered, 1 and 1.0 are equal keys but clean to different strings
+                if len(new) * 2 > len(column) or not all(value is None or type(value) is str for value in new):
+                    columns.append(map(cleaner, column))
+                else:
+                    for value in new:
+                        memo[value] = cleaner(value)
+                    columns.append(map(memo.__getitem__, column))
+            cleaned = list(zip(*columns))
+        yield from zip(chunk, cleaned)
@@ -0,0 +1,160 @@
+import asyncio
+import atexit
+import os
+import re
+import threading
+import time
+from googletrans import Translator
+
+from common.instrumentation import get_metrics
+from common.translation_cache import get_translation_cache
+
+# Improved regex to detect URLs with query parameters, special characters, and parentheses
+URL_PATTERN = re.compile(r'https?:\/\/(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+
+# Name of the translation service, part of the cache key
+BACKEND = 'googletrans'
+
+# Requests in flight at once. googletrans sends one request per string, so this is also the
+# number of strings being translated at a time.
+CONCURRENCY = 8
+
+# Event loop and translator client of this process, shared by every translate_to_locales call
+_loop = None
+_translator = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def protect_urls(text):
+    """Swap URLs for placeholders so the translator leaves them alone."""
+    urls = URL_PATTERN.findall(text)
+
+    temp_text = text
+    url_placeholders = {}
+    for i, url in enumerate(urls):
+        placeholder = f"__URL{i}__"
+        url_placeholders[placeholder] = url
+        temp_text = temp_text.replace(url, placeholder, 1)  # Replace only the first occurrence
+    return temp_text, url_placeholders
+
+
+def restore_urls(text, url_placeholders):
+    """Put the original URLs back in place of their placeholders."""
+    for placeholder, url in url_placeholders.items():
+        text = text.replace(placeholder, url)
+    return text
+
+
+def _client():
+    """Return this process's event loop and translator client, opening them on first use.
+
+    Every chunk of a run is translated over the same client and loop, so its connections are
+    kept open between chunks. A forked process opens its own, as does a run that swaps in
+    another Translator, e.g. a test's stand-in. Call with _client_lock held.
+    """
+    global _loop, _translator, _client_pid
+    if _client_pid != os.getpid():
+        # The parent's loop and connections aren't ours to use or close
+        _loop = _translator = None
+        _client_pid = os.getpid()
+    if _translator is not None and type(_translator) is not Translator:
+        _close_client()
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+    if _translator is None:
+        # Without raise_exception a rate-limited or failed request comes back as the untranslated text
+        _translator = _loop.run_until_complete(Translator(raise_exception=True).__aenter__())
+    return _loop, _translator
+
+
+def _close_client():
+    """Close this process's translator client and event loop, a later translation opens new ones."""
+    global _loop, _translator
+    if _client_pid == os.getpid():
+        if _translator is not None:
+            _loop.run_until_complete(_translator.__aexit__(None, None, None))
+        if _loop is not None:
+            _loop.close()
+    _loop = _translator = None
+
+
+@atexit.register
+def close_client():
+    """Close the translator client and event loop of this process, if it opened them."""
+    with _client_lock:
+        _close_client()
+
+
+async def _translate_missing(translator, missing, concurrency, cache):
+    semaphore = asyncio.Semaphore(concurrency)
+    metrics = get_metrics()
+    results = {dest: {} for dest in missing}
+    failed = {}
+    errors = []
+
+    async def translate_one(text, dest):
+        temp_text, url_placeholders = protect_urls(text)
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await translator.translate(temp_text, dest=dest)
+            except Exception as error:
+                # Left out of the cache, so the next run asks again
+                metrics.count('translation_failures')
+                failed.setdefault(dest, []).append(text)
+                errors.append(error)
+                results[dest][text] = text
+                return
+            finally:
+                metrics.add('translation_request', time.perf_counter() - started)
+        metrics.count('translation_characters', len(temp_text))
+        results[dest][text] = restore_urls(result.text, url_placeholders)
+        cache.put(text, dest, BACKEND, results[dest][text])
+
+    # Strings of every language are in flight together, sharing the client and the limit
+    await asyncio.gather(*(translate_one(text, dest) for dest, texts in missing.items() for text in texts))
+
+    if failed:
+        print(f"{sum(len(texts) for texts in failed.values())} texts could not be translated ({errors[0]}), "
+              f"they are left untranslated for now and translated again on the next run")
+    return results, failed
+
+
+def translate_to_locales(texts_by_dest, concurrency=CONCURRENCY):
+    """Translate several languages at once, {dest: texts} in, {dest: {source text: translation}} out.
+
+    Duplicates are sent once per language and cached strings are not sent at all. The rest of
+    every language go out one request per string, at most concurrency at a time, over the
+    process's one client and event loop, which stay open from one call to the next. Texts
+    whose request fails are returned as they are and not cached. Returns the translations
+    and {dest: texts that could not be translated}, empty when every request succeeded.
+    """
+    cache = get_translation_cache()
+    results = {}
+    missing = {}
+    failed = {}
+
+    for dest, texts in texts_by_dest.items():
+        results[dest] = {}
+        for text in dict.fromkeys(texts):
+            if not isinstance(text, str) or not text.strip():
+                results[dest][text] = text
+                continue
+            cached = cache.get(text, dest, BACKEND)
+            if cached is None:
+                missing.setdefault(dest, []).append(text)
+            else:
+                results[dest][text] = cached
+
+    if missing:
+        with get_metrics().stage('translation', sum(len(texts) for texts in missing.values())):
+            with _client_lock:
+                loop, translator = _client()
+                translated, failed = loop.run_until_complete(_translate_missing(translator, missing, concurrency, cache))
+        for dest, translations in translated.items():
+            results[dest].update(translations)
+        # Commit now, this may be a worker process that never gets to close the cache
+        cache.flush()
+    return results, failed
+
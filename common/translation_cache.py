@@ -0,0 +1,191 @@
+import os
+import sqlite3
+import threading
+import time
+
+# Default location of the cache, shared by every script run on this machine
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".test_document_generator", "translations.sqlite3")
+
+# Evict least recently used translations once the stored text exceeds this many bytes
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# How many writes to buffer before committing and checking the size limit
+COMMIT_EVERY = 200
+
+
+class TranslationCache:
+    """Persistent SQLite cache of translations keyed by source text, target language and backend.
+
+    Several processes can share one cache file. Lookups only read, and new translations
+    and last-used times are buffered and written in one short transaction per flush.
+    Threads of one process share the cache, e.g. a pipeline translating on a background thread.
+    A process forked from one using the cache opens a connection of its own.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._puts = {}
+        self._used = set()
+        self._conn = None
+        self._pid = os.getpid()
+        self._forked_conns = []
+        self._lock = threading.RLock()
+
+    def _connect(self):
+        if self._pid != os.getpid():
+            # SQLite connections can't be used across a fork. The parent's is kept, not closed, as closing
+            # its file handles here would drop this process's own locks on the file
+            if self._conn is not None:
+                self._forked_conns.append(self._conn)
+            self._conn = None
+            self._pid = os.getpid()
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # Autocommit, transactions are opened explicitly in flush
+            self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            # Switching to WAL ignores the busy timeout, so retry while another process sets the file up
+            for attempt in range(100):
+                try:
+                    self._create_schema()
+                    break
+                except sqlite3.OperationalError as error:
+                    if "locked" not in str(error) or attempt == 99:
+                        raise
+                    time.sleep(0.1)
+        return self._conn
+
+    def _create_schema(self):
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " backend TEXT NOT NULL,"
+            " target TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " translated TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (backend, target, source))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+        # Running total of the stored text, kept by triggers so the size limit is checked without a scan
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)")
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS translations_inserted AFTER INSERT ON translations"
+            " BEGIN UPDATE cache_size SET total = total + NEW.size; END")
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS translations_resized AFTER UPDATE OF size ON translations"
+            " BEGIN UPDATE cache_size SET total = total - OLD.size + NEW.size; END")
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS translations_deleted AFTER DELETE ON translations"
+            " BEGIN UPDATE cache_size SET total = total - OLD.size; END")
+        if self._conn.execute("SELECT 1 FROM cache_size").fetchone() is None:
+            # A cache from before the running total is summed once
+            self._conn.execute("INSERT OR IGNORE INTO cache_size (id, total) SELECT 0, COALESCE(SUM(size), 0) FROM translations")
+
+    def get(self, text, target, backend):
+        """Return the cached translation of text, or None on a miss."""
+        with self._lock:
+            key = (backend, target, text)
+            translated = self._puts.get(key)
+            if translated is None:
+                row = self._connect().execute(
+                    "SELECT translated FROM translations WHERE backend = ? AND target = ? AND source = ?", key
+                ).fetchone()
+                translated = row[0] if row is not None else None
+            if translated is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._used.add(key)
+            self._written()
+            return translated
+
+    def put(self, text, target, backend, translated):
+        """Store a translation, evicting old entries if the cache grows past max_bytes."""
+        with self._lock:
+            self._puts[(backend, target, text)] = translated
+            self._written()
+
+    def _written(self):
+        if len(self._puts) + len(self._used) >= COMMIT_EVERY:
+            self.flush()
+
+    def flush(self):
+        """Write buffered translations and last-used times, then enforce the size limit."""
+        with self._lock:
+            if not self._puts and not self._used:
+                return
+            conn = self._connect()
+            now = time.time()
+            # Take the write lock up front so concurrent writers queue on the busy timeout
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # An upsert rather than INSERT OR REPLACE, whose implicit delete would not update the running total
+                conn.executemany(
+                    "INSERT INTO translations (backend, target, source, translated, size, last_used)"
+                    " VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (backend, target, source) DO UPDATE SET"
+                    " translated = excluded.translated, size = excluded.size, last_used = excluded.last_used",
+                    [(backend, target, source, translated,
+                      len(source.encode("utf-8")) + len(translated.encode("utf-8")), now)
+                     for (backend, target, source), translated in self._puts.items()],
+                )
+                conn.executemany(
+                    "UPDATE translations SET last_used = ? WHERE backend = ? AND target = ? AND source = ?",
+                    [(now,) + key for key in self._used],
+                )
+                # Only new translations grow the cache, a flush of cache hits leaves the limit alone
+                if self._puts:
+                    self._evict()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._puts.clear()
+            self._used.clear()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT total FROM cache_size").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% of the limit so we don't evict again on the very next write
+        excess = total - int(self.max_bytes * 0.9)
+        freed = 0
+        stale = []
+        for backend, target, source, size in self._conn.execute(
+                "SELECT backend, target, source, size FROM translations ORDER BY last_used"):
+            stale.append((backend, target, source))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany(
+            "DELETE FROM translations WHERE backend = ? AND target = ? AND source = ?", stale
+        )
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+def format_report(hits, misses):
+    """Describe hit/miss counts, also used to total up counts from worker processes."""
+    total = hits + misses
+    rate = (100.0 * hits / total) if total else 0.0
+    return f"Translation cache: {hits} hits, {misses} misses ({rate:.1f}% hit rate)"
+
+
+_default_cache = None
+
+
+def get_translation_cache():
+    """Return the process-wide cache, opening it on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = TranslationCache()
+    return _default_cache
@@ -0,0 +1,148 @@
+import glob
+import hashlib
+import json
+import os
+import struct
+import zlib
+from array import array
+
+from common.fileio import atomic_write
+from common.instrumentation import get_metrics
+from common.manifest import file_digest
+
+# Where parsed workbooks are kept, next to the translation cache
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".test_document_generator", "workbooks")
+
+# Cache files kept, the least recently used are removed beyond this
+MAX_FILES = 256
+
+# Start of every cache file, and the layout version after it. Bump FORMAT_VERSION when the layout changes.
+MAGIC = b'TDGROWS\0'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<8sII')
+
+# Types a cached value may have, anything else (e.g. a date in a key column) leaves the workbook uncached
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+
+
+def cache_path(file_path, reader, cache_dir=DEFAULT_CACHE_DIR):
+    """Where the rows read from file_path by reader (e.g. 'standalone') are cached, one file per workbook path and reader."""
+    key = json.dumps([reader, os.path.abspath(file_path)], ensure_ascii=False)
+    return os.path.join(cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest()[:32] + '.rows')
+
+
+def encode_rows(rows, width):
+    """Pack rows of width values column by column, each column as its distinct values and one index per row.
+
+    Most columns repeat a few values down the sheet, so each is stored once. Returns None if
+    a value can't be stored, so the workbook is parsed every time instead.
+    """
+    lengths = []
+    parts = []
+    for column in zip(*rows) if rows else [()] * width:
+        positions = {}
+        values = []
+        indexes = array('I')
+        for value in column:
+            if type(value) not in _PLAIN_TYPES:
+                return None
+            # Keyed on the type too, 1, 1.0 and True are equal but are different cells
+            index = positions.get((type(value), value))
+            if index is None:
+                index = positions[(type(value), value)] = len(values)
+                values.append(value)
+            indexes.append(index)
+        encoded = json.dumps(values, ensure_ascii=False).encode('utf-8')
+        parts += [encoded, indexes.tobytes()]
+        lengths += [len(encoded), len(indexes) * indexes.itemsize]
+    return lengths, zlib.compress(b''.join(parts), 1)
+
+
+def decode_rows(lengths, body):
+    """Undo encode_rows, returning the rows as tuples."""
+    data = zlib.decompress(body)
+    columns = []
+    offset = 0
+    for values_length, indexes_length in zip(lengths[::2], lengths[1::2]):
+        values = json.loads(data[offset:offset + values_length].decode('utf-8'))
+        offset += values_length
+        indexes = array('I')
+        indexes.frombytes(data[offset:offset + indexes_length])
+        offset += indexes_length
+        columns.append(map(values.__getitem__, indexes))
+    return list(zip(*columns))
+
+
+def _read(path):
+    """Return a cache file's header and compressed body, or (None, None) if it is missing or not one of ours."""
+    try:
+        with open(path, 'rb') as f:
+            magic, format_version, header_length = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC or format_version != FORMAT_VERSION:
+                return None, None
+            header = json.loads(f.read(header_length).decode('utf-8'))
+            return header, f.read()
+    except (OSError, ValueError, struct.error):
+        return None, None
+
+
+def _write(path, header, body):
+    encoded = json.dumps(header).encode('utf-8')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    atomic_write(path, _HEADER.pack(MAGIC, FORMAT_VERSION, len(encoded)) + encoded + body)
+
+
+def _prune(cache_dir, max_files=MAX_FILES):
+    """Remove the least recently used cache files beyond max_files."""
+    paths = glob.glob(os.path.join(cache_dir, '*.rows'))
+    if len(paths) <= max_files:
+        return
+    for path in sorted(paths, key=os.path.getmtime)[:len(paths) - max_files]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def cached_rows(file_path, reader, read_rows, version, width, cache_dir=DEFAULT_CACHE_DIR):
+    """Return read_rows(file_path), from the cache if the workbook was read the same way before.
+
+    A cached copy is used when it was written by the same parser version (e.g. the script's
+    generator_version) for a workbook of the same size and modification time. If only the
+    time differs, e.g. the workbook was copied or saved again unchanged, its bytes are hashed
+    and compared instead. Otherwise the workbook is parsed and the cache rewritten.
+    read_rows must return a list of tuples of width values.
+    """
+    metrics = get_metrics()
+    path = cache_path(file_path, reader, cache_dir)
+    stat = os.stat(file_path)
+    key = {'version': version, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    with metrics.stage('workbook_cache_load'):
+        header, body = _read(path)
+        digest = None
+        if header is not None and header['version'] == version and header['size'] == stat.st_size:
+            if header['mtime_ns'] != stat.st_mtime_ns:
+                digest = file_digest(file_path)
+            if digest is None or digest == header['digest']:
+                rows = decode_rows(header['lengths'], body)
+                if digest is not None:
+                    # Same bytes under a new time, remember the time so the next run skips the hash
+                    _write(path, dict(header, **key), body)
+                else:
+                    # Mark it recently used so pruning keeps it
+                    os.utime(path)
+                metrics.count('workbook_cache_hits')
+                return rows
+
+    metrics.count('workbook_cache_misses')
+    # Hashed before parsing, a workbook saved while it is read won't match next time
+    digest = digest or file_digest(file_path)
+    rows = read_rows(file_path)
+    encoded = encode_rows(rows, width)
+    if encoded is not None:
+        lengths, body = encoded
+        _write(path, dict(key, digest=digest, rows=len(rows), lengths=lengths), body)
+        _prune(cache_dir)
+    return rows
@@ -0,0 +1,262 @@
+import importlib
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Make the shared helpers in the repository root importable
+REPOSITORY_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, REPOSITORY_ROOT)
+from common.docbuild import new_document
+from common.ingest import INPUT_EXTENSIONS
+from common.instrumentation import call_measured
+from common.locales import SOURCE_LOCALE
+from common.translation_cache import get_translation_cache
+
+# The generator behind each layout. Only the EN scripts are loaded: the SP scripts differ from them
+# only in their default locales, and jobs always name theirs, so locales=es gives the SP documents
+SCRIPTS = {
+    'e2e': os.path.join('E2E', 'e2e - EN.py'),
+    'standalone': os.path.join('standalone', 'standalone - EN.py'),
+}
+
+# Finished jobs whose documents are kept for download, older ones are removed
+KEEP_JOBS = 50
+
+# Largest upload accepted, the body is read into memory before the job is queued
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+
+# Generator scripts imported in this process, keyed on layout
+_scripts = {}
+
+
+def load_script(layout):
+    """Import the generator script for layout once per process, its __main__ block does not run."""
+    module = _scripts.get(layout)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(f"{layout}_generator", os.path.join(REPOSITORY_ROOT, SCRIPTS[layout]))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _scripts[layout] = module
+    return module
+
+
+def warm_worker(locales):
+    """Runs once in each worker process: import the generators and build the preambles and labels of locales.
+
+    What is built here stays in the worker for every job it runs after, as do the step table
+    prototypes and the open translation cache once the first job has used them.
+    """
+    for layout in SCRIPTS:
+        module = load_script(layout)
+        for locale in locales:
+            new_document(module.add_preamble, (locale,))
+    if any(locale != SOURCE_LOCALE for locale in locales):
+        # Importing the translator is slow, pay for it before the first job arrives
+        importlib.import_module('common.translation')
+    get_translation_cache()
+
+
+def run_job(job_dir, layout, file_name, locales, streaming=False):
+    """Generate the documents of one uploaded workbook in a worker process, zip them and return how many there are."""
+    module = load_script(layout)
+    file_path = os.path.join(job_dir, 'in', file_name)
+    output_dir = os.path.join(job_dir, 'out')
+    if layout == 'e2e':
+        module.process_file(file_path, output_dir, streaming, None, locales)
+    else:
+        module.process_file(file_path, output_dir, 1, None, locales)
+    # Write this job's translations now so the other workers find them in the cache
+    get_translation_cache().flush()
+
+    documents = 0
+    # The documents are compressed already, so they are stored as they are
+    with zipfile.ZipFile(os.path.join(job_dir, 'documents.zip'), 'w', zipfile.ZIP_STORED) as archive:
+        for directory, _, names in sorted(os.walk(output_dir)):
+            for name in sorted(names):
+                if name.endswith('.docx'):
+                    path = os.path.join(directory, name)
+                    archive.write(path, os.path.relpath(path, output_dir))
+                    documents += 1
+    shutil.rmtree(output_dir)
+    return documents
+
+
+class GenerationService:
+    """Runs uploaded workbooks on a pool of warm worker processes and keeps track of the jobs.
+
+    Each job gets a folder under work_dir holding the upload and, once done, documents.zip.
+    Only the last KEEP_JOBS jobs are kept.
+    """
+
+    def __init__(self, work_dir, workers=2, locales=(SOURCE_LOCALE,)):
+        self.work_dir = work_dir
+        os.makedirs(work_dir, exist_ok=True)
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=warm_worker, initargs=(tuple(locales),))
+        # Start the workers now rather than on the first upload
+        for _ in range(workers):
+            self._executor.submit(time.sleep, 0)
+
+    def submit(self, data, file_name, layout, locales, streaming=False):
+        """Queue a workbook's bytes for generation and return the new job's status."""
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = os.path.join(self.work_dir, job_id)
+        os.makedirs(os.path.join(job_dir, 'in'))
+        with open(os.path.join(job_dir, 'in', file_name), 'wb') as f:
+            f.write(data)
+
+        job = {'id': job_id, 'file': file_name, 'layout': layout, 'locales': list(locales), 'streaming': streaming,
+               'submitted': datetime.now().isoformat(timespec='seconds'), 'started': time.perf_counter(),
+               'seconds': None, 'documents': None, 'error': None, 'metrics': None}
+        job['future'] = self._executor.submit(call_measured, run_job, job_dir, layout, file_name, list(locales), streaming)
+        job['future'].add_done_callback(lambda future: self._finished(job, future))
+        with self._lock:
+            self.jobs[job_id] = job
+            self._prune()
+        return self.status(job_id)
+
+    def _finished(self, job, future):
+        try:
+            job['documents'], job['metrics'] = future.result()
+        except Exception as error:
+            job['error'] = f"{type(error).__name__}: {error}"
+        # Set last, a job only counts as finished once its outcome is recorded
+        job['seconds'] = time.perf_counter() - job['started']
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job['seconds'] is not None]
+        for job_id in finished[:max(0, len(self.jobs) - KEEP_JOBS)]:
+            del self.jobs[job_id]
+            shutil.rmtree(os.path.join(self.work_dir, job_id), ignore_errors=True)
+
+    def status(self, job_id):
+        """Return a job's status as plain data, or None for an unknown job."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if job['seconds'] is not None:
+            state = 'failed' if job['error'] else 'done'
+        elif job['future'].running() or job['future'].done():
+            state = 'running'
+        else:
+            state = 'queued'
+        return dict({key: value for key, value in job.items() if key not in ('future', 'started')}, status=state)
+
+    def result_path(self, job_id):
+        """Where a finished job's documents.zip is, or None if the job has not finished successfully."""
+        status = self.status(job_id)
+        if status is None or status['status'] != 'done':
+            return None
+        return os.path.join(self.work_dir, job_id, 'documents.zip')
+
+    def close(self):
+        self._executor.shutdown(cancel_futures=True)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+class JobHandler(BaseHTTPRequestHandler):
+    """POST /jobs uploads a workbook, GET /jobs/<id> reports on it and GET /jobs/<id>/documents.zip downloads the result."""
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip('/') != '/jobs':
+            return self.send_json(404, {'error': f"No such endpoint {url.path}"})
+        options = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        layout = options.get('layout', 'standalone')
+        locales = [locale.strip() for locale in options.get('locales', SOURCE_LOCALE).split(',') if locale.strip()]
+        file_name = os.path.basename(options.get('file', 'workbook.xlsx'))
+        length = int(self.headers.get('Content-Length') or 0)
+        if layout not in SCRIPTS:
+            return self.send_json(400, {'error': f"layout must be one of {', '.join(SCRIPTS)}"})
+        if not locales:
+            return self.send_json(400, {'error': "locales must name at least one language, e.g. en,es"})
+        if not file_name.endswith(INPUT_EXTENSIONS):
+            return self.send_json(400, {'error': f"file must be a workbook or a CSV or Parquet export ({', '.join(INPUT_EXTENSIONS)})"})
+        if not length:
+            return self.send_json(400, {'error': "Send the workbook as the request body"})
+        if length > MAX_UPLOAD_BYTES:
+            return self.send_json(413, {'error': f"Uploads are limited to {MAX_UPLOAD_BYTES // (1024 * 1024)} MB"})
+
+        job = self.server.service.submit(self.rfile.read(length), file_name, layout, locales,
+                                         options.get('streaming', '0').lower() in ('1', 'true', 'yes'))
+        self.send_json(202, job)
+
+    def do_GET(self):
+        parts = [part for part in urlsplit(self.path).path.split('/') if part]
+        service = self.server.service
+        if parts == ['jobs']:
+            return self.send_json(200, [service.status(job_id) for job_id in list(service.jobs)])
+        if len(parts) == 2 and parts[0] == 'jobs':
+            status = service.status(parts[1])
+            return self.send_json(200, status) if status else self.send_json(404, {'error': f"No job {parts[1]}"})
+        if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'documents.zip':
+            status = service.status(parts[1])
+            if status is None:
+                return self.send_json(404, {'error': f"No job {parts[1]}"})
+            path = service.result_path(parts[1])
+            if path is None:
+                return self.send_json(409, {'error': f"Job {parts[1]} is {status['status']}", 'job': status})
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/zip')
+            self.send_header('Content-Length', str(os.path.getsize(path)))
+            self.send_header('Content-Disposition', f'attachment; filename="{os.path.splitext(status["file"])[0]}.zip"')
+            self.end_headers()
+            with open(path, 'rb') as f:
+                shutil.copyfileobj(f, self.wfile)
+            return
+        self.send_json(404, {'error': f"No such endpoint {self.path}"})
+
+    def send_json(self, code, body):
+        data = json.dumps(body, indent=1, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(host, port, workers, locales, work_dir):
+    """Run the service until interrupted."""
+    server = ThreadingHTTPServer((host, port), JobHandler)
+    server.service = GenerationService(work_dir, workers, locales)
+    print(f"Serving on http://{host}:{port} with {workers} workers, e.g.\n"
+          f"  curl --data-binary @tests.xlsx 'http://{host}:{port}/jobs?layout=standalone&locales=en,es&file=tests.xlsx'\n"
+          f"  curl http://{host}:{port}/jobs/<id>\n"
+          f"  curl -o documents.zip http://{host}:{port}/jobs/<id>/documents.zip")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+
+
+# Worker processes re-import this script, only start the service from the main process
+if __name__ == "__main__":
+    # Address to listen on, keep it on localhost unless the machine is trusted
+    host = '127.0.0.1'
+    port = 8765
+
+    # Number of worker processes, each runs one job at a time
+    workers = 2
+
+    # Languages whose preambles and labels every worker prepares before the first job
+    warm_locales = ['en', 'es']
+
+    # Where uploads and finished jobs' documents are kept while the service runs
+    work_directory = os.path.join(tempfile.gettempdir(), "test-document-generator-service")
+
+    serve(host, port, workers, warm_locales, work_directory)
@@ -1,8 +1,3 @@
-from openpyxl import load_workbook
-import openpyxl
-from openpyxl.utils import get_column_letter
-from collections import defaultdict
-from docx import Document
 from docx.shared import Pt, RGBColor
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 import os
@@ -13,277 +8,627 @@ from docx.oxml import OxmlElement
 from docx.enum.section import WD_ORIENTATION
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 import re
-
-def regexfixv3(x):
-    x = re.sub("_x000D_", "", x)
-    def split_long_word(word):
-        if '<<<' in word or '>>>' in word:
-            parts = re.split(r'(<<<|>>>)', word)
-            new_parts = []
-            for part in parts:
-                if len(part) > 19:
-                    chunk_size = 19
-                    new_parts.extend([part[i:i+chunk_size] for i in range(0, len(part), chunk_size)])
-                else:
-                    new_parts.append(part)
-            return ' '.join(new_parts)
-        elif len(word) > 19:
-            return ' '.join([word[i:i+19] for i in range(0, len(word), 19)])
-        else:
-            return word
-
-    processed_text = ''
-    last_end = 0
-    for match in re.finditer(r'\S+', x):
-        start, end = match.span()
-        processed_text += x[last_end:start]
-        processed_text += split_long_word(match.group())
-        last_end = end
-    processed_text += x[last_end:]
-    return processed_text
+import sys
+import time
+from contextlib import nullcontext
+from functools import partial
+from itertools import chain
+
+# Make the shared helpers in the repository root importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from common.docbuild import add_step_table, new_document
+from common.ingest import INPUT_EXTENSIONS, count_sheets, iter_input_rows, iter_workbook_sheet
+from common.instrumentation import Progress, get_metrics
+from common.locales import SOURCE_LOCALE, get_labels, locale_directory, localised_copy, translate_for_locales
+from common.manifest import (complete_digest, content_digest, file_digest, generator_version, is_current, load_manifest,
+                             manifest_path, record_key, update_manifest, workbook_is_current)
+from common.ooxml_writer import DEFAULT_COMPRESSLEVEL, save_docx
+from common.parallel import DocumentResult, iter_in_processes, process_pool, run_workbooks
+from common.pipeline import IOThread, TRANSLATION_CHUNK, chunked, prefetch
+from common.sharding import in_shard, merge_shard_manifests
+from common.text import break_long_words, clean_columns, clean_text
+from common.translation_cache import format_report, get_translation_cache
+from common.workbook_cache import DEFAULT_CACHE_DIR, cached_rows
+
+# Step text that differs between locales: translated, or with long words broken up in the workbook's own language
+LOCALISED_FIELDS = ('StepName', 'StepDescription', 'ExpectedResults')
 
 class Step:
-    def __init__(self, Scenario, TestID, Test_Name, Test_Description, Step_Name,
-                 Step_Description, Expected_Results, Role, Workstream):
-        self.Scenario = re.sub("_x000D_", "", str(Scenario))
-        self.TestID = re.sub("_x000D_", "", str(TestID))
-        self.TestName = re.sub("_x000D_", "", str(Test_Name))
-        self.TestDescription = re.sub("_x000D_", "", str(Test_Description))
-        self.StepName = regexfixv3(str(Step_Name))
-        self.StepDescription = regexfixv3(str(Step_Description))
-        self.ExpectedResults = regexfixv3(str(Expected_Results))
-        self.Role = re.sub("_x000D_", "", str(Role))
-        self.Workstream = re.sub("_x000D_", "", str(Workstream))
+    """What changes from one step of a test to the next. The details the steps share are kept once on their Test.
+
+    Steps are only built from a cleaned row, with from_cleaned.
+    """
+    __slots__ = ('StepName', 'StepDescription', 'ExpectedResults', 'Role')
+
+    @classmethod
+    def from_cleaned(cls, values):
+        """Build a step from a row's nine values, already cleaned with STEP_CLEANERS."""
+        step = cls()
+        _, _, _, _, step.StepName, step.StepDescription, step.ExpectedResults, step.Role, _ = values
+        return step
+
+# How each column is cleaned, in sheet order. Steps are read once for every locale,
+# so anything locale specific happens later in localise_test.
+STEP_CLEANERS = (clean_text,) * 9
 
 class Test:
-    def __init__(self, TestID):
-        self.TestID = TestID
-        self.steps = []
+    """A test's details, taken from its first row, and its steps in sheet order.
+
+    Tests are only started from a cleaned row, with from_cleaned.
+    """
+    __slots__ = ('Scenario', 'TestID', 'TestName', 'TestDescription', 'Workstream', 'steps')
+
+    @classmethod
+    def from_cleaned(cls, values):
+        """Start a test from its first row's nine values, already cleaned with STEP_CLEANERS."""
+        test = cls()
+        test.Scenario, test.TestID, test.TestName, test.TestDescription, _, _, _, _, test.Workstream = values
+        test.steps = []
+        return test
     
     def add_step(self, step):
         self.steps.append(step)
 
 class Scenario:
+    __slots__ = ('ScenarioName', 'tests')
+
     def __init__(self, ScenarioName):
         self.ScenarioName = ScenarioName
-        self.tests = defaultdict(lambda: None)
+        self.tests = {}
     
-    def add_test(self, test):
-        if test.TestID not in self.tests:
-            self.tests[test.TestID] = Test(test.TestID)
-        self.tests[test.TestID].add_step(test)
-
-def read_excel_to_tests(file_path):
-    workbook = load_workbook(filename=file_path)
-    scenarios = defaultdict(lambda: None)
-    
-    for sheet_name in workbook.sheetnames:
-        sheet = workbook[sheet_name]
-        
-        for row in sheet.iter_rows(min_row=2, values_only=True):
-            scenario_name, TestID, Test_Name, Test_Description, Step_Name, Step_Description, Expected_Results, Role, Workstream = row[:9]
-            if scenarios[scenario_name] is None:
-                scenarios[scenario_name] = Scenario(scenario_name)
-            
-            step = Step(scenario_name, TestID, Test_Name, Test_Description, Step_Name, Step_Description, Expected_Results, Role, Workstream)
-
-            scenario = scenarios[scenario_name]
-            if scenario.tests.get(TestID) is None:
-                scenario.tests[TestID] = Test(TestID)
-            scenario.tests[TestID].add_step(step)
-    print("Excel")
-    return [scenario for scenario in scenarios.values()]
-
-def create_word_documents_standalone(scenarios, folder_path="C:/Users/olive/Desktop/UAT_Test_Evidence"):
-    os.makedirs(folder_path, exist_ok=True)
-
+    def add_test(self, test_id, test):
+        self.tests[test_id] = test
+
+def read_sheet_rows(file_path, sheet):
+    """Read one sheet's rows as read_rows does, in a worker process parsing a workbook's sheets in parallel."""
+    return [(row.Scenario, row.TestID) + values for row, values in clean_columns(iter_workbook_sheet(file_path, sheet), STEP_CLEANERS)]
+
+def read_rows(file_path, workers=1):
+    """Read every row as the raw Scenario and TEST ID values the tests are keyed on, followed by its nine cleaned values.
+
+    With workers above 1, a workbook's sheets are parsed in that many processes and their rows joined in sheet order.
+    """
+    sheets = count_sheets(file_path) if workers > 1 else 1
+    if sheets > 1:
+        tasks = [(file_path, sheet) for sheet in range(sheets)]
+        return [row for rows in iter_in_processes(read_sheet_rows, tasks, workers, chunksize=1) for row in rows]
+
+    # Rows from every sheet (or the CSV or Parquet export) are streamed in order, first nine columns only, and
+    # cleaned column by column a chunk of rows at a time
+    return [(row.Scenario, row.TestID) + values for row, values in clean_columns(iter_input_rows(file_path), STEP_CLEANERS)]
+
+def read_excel_to_tests(file_path, cache_dir=None, sheet_workers=1):
+    """Read a workbook's scenarios. Given cache_dir, its rows are kept there and only parsed again once the workbook or this script changes.
+
+    sheet_workers is the number of processes parsing the workbook's sheets, see read_rows.
+    """
+    read = partial(read_rows, workers=sheet_workers)
+    if cache_dir is None:
+        rows = read(file_path)
+    else:
+        rows = cached_rows(file_path, 'standalone', read, generator_version(__file__), 2 + len(STEP_CLEANERS), cache_dir)
+
+    # Scenarios keyed on the raw Scenario value, and their tests on the raw TEST ID, in first-seen order
+    scenarios = {}
+    for row in rows:
+        scenario_id, test_id, values = row[0], row[1], row[2:]
+        scenario = scenarios.get(scenario_id)
+        if scenario is None:
+            scenario = scenarios[scenario_id] = Scenario(scenario_id)
+
+        test = scenario.tests.get(test_id)
+        if test is None:
+            test = Test.from_cleaned(values)
+            scenario.add_test(test_id, test)
+        test.add_step(Step.from_cleaned(values))
+    return list(scenarios.values())
+
+def translate_step_text(tests_by_locale):
+    """Translate the step text of tests into their locales in one concurrent pass.
+
+    Takes {locale: tests} and returns {locale: {source text: translation}} and {locale: texts that
+    could not be translated}, the tests are left as they were read.
+    """
+    return translate_for_locales({locale: [getattr(step, field) for test in tests for step in test.steps for field in LOCALISED_FIELDS]
+                                  for locale, tests in tests_by_locale.items()})
+
+def localised_chunks(jobs, chunk_size=TRANSLATION_CHUNK, failed=None):
+    """Yield the (test, file path, locale) jobs with their tests localised, in lists of about chunk_size texts to translate.
+
+    Each chunk's step text is translated into all of its jobs' locales in one pass. Run through
+    prefetch, the next chunks are translated while the documents of this one are built. The file path of every document
+    with step text that could not be translated is added to the set failed, if given.
+    """
+    # Documents in the workbook's own language have nothing to translate
+    for chunk in chunked(jobs, chunk_size, lambda job: len(job[0].steps) * len(LOCALISED_FIELDS) * (job[2] != SOURCE_LOCALE)):
+        tests_by_locale = {}
+        for test, _, locale in chunk:
+            tests_by_locale.setdefault(locale, []).append(test)
+        translations, not_translated = translate_step_text(tests_by_locale)
+        if failed is not None:
+            for test, file_path, locale in chunk:
+                if not not_translated.get(locale, ()):
+                    continue
+                texts = set(not_translated[locale])
+                if any(getattr(step, field) in texts for step in test.steps for field in LOCALISED_FIELDS):
+                    failed.add(file_path)
+        yield [(localise_test(test, locale, translations.get(locale)), file_path, locale) for test, file_path, locale in chunk]
+
+def localise_test(test, locale, translations=None):
+    """Copy a test with its step text in locale, translations being translate_step_text's result for it.
+
+    The test read from the workbook is shared by every locale and left unchanged.
+    """
+    if locale == SOURCE_LOCALE:
+        # Only the workbook's own text has its long words broken up, translations keep theirs whole
+        localise = break_long_words
+    else:
+        localise = translations.__getitem__
+    localised = localised_copy(test, (), localise)
+    localised.steps = [localised_copy(step, LOCALISED_FIELDS, localise) for step in test.steps]
+    return localised
+
+def document_file_name(test_id, test, translations=None):
+    """Build the output file name for a test, from its translated name when given translations."""
+    name = translations[test.TestName] if translations else test.TestName
+    file_name_part_safe = re.sub(r'[/\\:*?"<>|\r\n]+', " ", name)
+    return f"{file_name_part_safe[:100]}_{test_id}.docx"  # Truncate to ensure the filename doesn't exceed limits
+
+def test_key(test_id, test, locale=SOURCE_LOCALE):
+    """Identify a test's document for locale in the manifest by the locale, scenario and test ID."""
+    return record_key(locale, test.Scenario, test_id)
+
+def test_values(test):
+    """Yield what a test's documents are built from: its details, then the fields of each step."""
+    yield (test.Scenario, test.TestID, test.TestName, test.TestDescription, test.Workstream)
+    for step in test.steps:
+        yield (step.StepName, step.StepDescription, step.ExpectedResults, step.Role)
+
+def test_digests(scenarios, locales=(SOURCE_LOCALE,)):
+    """Hash the rows of every test once, keyed on its test_key for each of locales. Done before translation so the hash only follows the sheet."""
+    digests = {}
+    for scenario in scenarios:
+        for test_id, test in scenario.tests.items():
+            digest = content_digest(test_values(test))
+            for locale in locales:
+                digests[test_key(test_id, test, locale)] = digest
+    return digests
+
+def add_preamble(doc, locale=SOURCE_LOCALE):
+    """Add the page setup, test instructions and business area table every document starts with."""
+    labels = get_labels(locale)
+    doc.styles['Normal'].font.name = 'Calibri (Body)'
+    doc.styles['Normal'].font.size = Pt(12)
+
+    # Set the document to landscape orientation
+    section = doc.sections[-1]
+    section.orientation = WD_ORIENTATION.LANDSCAPE
+    new_width, new_height = section.page_height, section.page_width
+    section.page_width = new_width
+    section.page_height = new_height
+
+    p = doc.add_paragraph()
+    run = p.add_run(f"{labels['instructions_title']}\n{labels['instructions_click']} ")
+    run.bold = True
+    run.font.size = Pt(14)
+
+    # Adding the hyperlink
+    hyperlink_url = 'https://myiglo.sharepoint.com/:w:/s/PhoenixProgramme2021-2024/EQ7d0Uhfs85Pit2Gk8DDnKsBP4Z25YQGJS34ULGxc39yew?e=KQHY5u'
+    hyperlink = doc.part.relate_to(hyperlink_url, 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink', is_external=True)
+
+    # Create the hyperlink element
+    hyperlink_element = OxmlElement('w:hyperlink')
+    hyperlink_element.set(qn('r:id'), hyperlink)
+
+    # Create the run for the hyperlink text
+    r = OxmlElement('w:r')
+    rPr = OxmlElement('w:rPr')
+
+    # Set underline and color to blue
+    underline = OxmlElement('w:u')
+    underline.set(qn('w:val'), 'single')
+    rPr.append(underline)
+
+    color = OxmlElement('w:color')
+    color.set(qn('w:val'), '0000FF')  # Blue color
+    rPr.append(color)
+
+    r.append(rPr)
+    t = OxmlElement('w:t')
+    t.text = labels['instructions_link']
+    r.append(t)
+    hyperlink_element.append(r)
+
+    p._element.append(hyperlink_element)
+
+    # Continue the sentence after the hyperlink
+    run = p.add_run(f" {labels['instructions_read']}")
+    run.bold = True
+    run.font.size = Pt(14)
+
+
+    p = doc.add_paragraph()
+    run = p.add_run(labels['execution_title'])
+    run.bold = True
+    run.font.size = Pt(14)
+    p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+
+    # Initialize table with a single row for headers
+    table1 = doc.add_table(rows=1, cols=5)
+    table1.style = 'Table Grid'
+
+    # Apply header style
+    for cell in table1.rows[0].cells:
+        cell._element.get_or_add_tcPr().append(parse_xml(r'<w:shd {} w:fill="0047AB"/>'.format(nsdecls('w'))))
+
+    # Define header cells text
+    hdr_cells = table1.rows[0].cells
+    hdr_text = labels['tester_table']
+    for i, text in enumerate(hdr_text):
+        hdr_cells[i].text = text
+        hdr_cells[i].paragraphs[0].runs[0].font.color.rgb = RGBColor(255, 255, 255)
+        hdr_cells[i].paragraphs[0].runs[0].bold = True
+
+    # Define areas
+    areas = labels['business_areas']
+
+    # Add rows for each area and fill the first column with area names
+    for area in areas:
+        # Add a new row at the end of the table
+        row = table1.add_row()
+        # Set the text for the first cell in the row to the area name
+        row.cells[0].text = area
+
+def build_step_table(doc, locale=SOURCE_LOCALE):
+    """Add a step table with its labels, merges and alignment in place.
+
+    Returns the table and the cells filled in per step: step number, role, description
+    and expected result. Only called once per locale, add_step_table copies the result for every step.
+    """
+    labels = get_labels(locale)
+
+    # Create the table with 5 rows and 6 columns
+    table2 = doc.add_table(rows=5, cols=6)
+    table2.style = 'Table Grid'
+
+    # First row (Header Row)
+    hdr_cells = table2.rows[0].cells
+
+    # Apply bold formatting to specific headers
+    hdr_cells[0].text = labels['test_step']
+    hdr_cells[0].paragraphs[0].runs[0].bold = True
+
+    hdr_cells[1].text = ''  # The test step number
+
+    hdr_cells[2].text = labels['role']
+    hdr_cells[2].paragraphs[0].runs[0].bold = True
+
+    hdr_cells[3].text = ''  # Empty cell for Role data
+
+    hdr_cells[4].text = labels['test_status']
+    hdr_cells[4].paragraphs[0].runs[0].bold = True
+
+    hdr_cells[5].text = ''  # Empty cell for Test Status data
+
+    # Second row
+    row2_cells = table2.rows[1].cells
+    row2_cells[0].text = labels['description']
+    row2_cells[0].paragraphs[0].runs[0].bold = True
+    row2_cells[1].merge(row2_cells[5])  # Merge the remaining cells to form a single cell
+    row2_cells[1].text = ''
+
+    # Third row
+    row3_cells = table2.rows[2].cells
+    row3_cells[0].text = labels['expected_results']
+    row3_cells[0].paragraphs[0].runs[0].bold = True
+    row3_cells[1].merge(row3_cells[5])  # Merge the remaining cells to form a single cell
+    row3_cells[1].text = ''
+    expected_cell = row3_cells[1]
+
+    # Fourth row
+    row3_cells = table2.rows[3].cells
+    row3_cells[0].text = labels['actual_result']
+    row3_cells[0].paragraphs[0].runs[0].bold = True
+    row3_cells[1].merge(row3_cells[5])  # Merge the remaining cells to form a single cell
+    row3_cells[1].text = ''
+
+    # Fith row
+    row4_cells = table2.rows[4].cells
+    row4_cells[0].text = labels['tester_comments']
+    row4_cells[0].paragraphs[0].runs[0].bold = True
+    row4_cells[1].merge(row4_cells[5])  # Merge the remaining cells to form a single cell
+    row4_cells[1].text = ''
+
+    # Adjust alignment for all cells
+    for row in table2.rows:
+        for cell in row.cells:
+            for paragraph in cell.paragraphs:
+                paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
+
+    return table2, [hdr_cells[1], hdr_cells[3], row2_cells[1], expected_cell]
+
+def build_document(test, locale=SOURCE_LOCALE):
+    """Build the document for one test, ready to be saved."""
+    started = time.perf_counter()
+    labels = get_labels(locale)
+    # The preamble is the same for every test in a locale, so it is built once and copied
+    doc = new_document(add_preamble, (locale,))
+
+    doc.add_page_break()
+
+    if test.steps:
+        p = doc.add_paragraph()
+        run = p.add_run(f"{labels['test_name']}: {test.TestName}\n{labels['test_id']}: {test.TestID} - {test.Workstream}\n\n")
+        run.bold = True
+        run.font.size = Pt(14)
+        p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+        run = p.add_run(f"{labels['test_description']}:\n")
+        run.bold = True
+        run.font.size = Pt(14)
+        p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+        run = p.add_run(f"{test.TestDescription}\n\n")
+        run.font.size = Pt(12)
+        p.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
+        StepNumber = 0
+        for step in test.steps:
+            StepNumber += 1
+            # Copy of a prebuilt table with only the step details filled in
+            add_step_table(doc, build_step_table, str(StepNumber), step.Role, step.StepDescription, step.ExpectedResults, args=(locale,))
+
+            doc.add_paragraph(f"\n{labels['screenshot']}\n\n\n\n\n", style='Normal')
+
+
+    get_metrics().add('document_build', time.perf_counter() - started)
+    return doc
+
+def save_document(doc, file_path, locale=SOURCE_LOCALE, compresslevel=DEFAULT_COMPRESSLEVEL):
+    """Save a built document, returning how long that took. Only its body is compressed afresh, the rest is the preamble's."""
+    started = time.perf_counter()
+    save_docx(doc, file_path, add_preamble, (locale,), compresslevel)
+    seconds = time.perf_counter() - started
+    get_metrics().add('document_save', seconds)
+    return seconds
+
+def build_test_document(test, file_path, locale=SOURCE_LOCALE, compresslevel=DEFAULT_COMPRESSLEVEL):
+    """Build and save the document for one test, returning its DocumentResult.
+
+    Runs in a worker process when create_word_documents_standalone is given workers.
+    """
+    started = time.perf_counter()
+    doc = build_document(test, locale)
+    build_seconds = time.perf_counter() - started
+    return DocumentResult(file_path, len(test.steps), build_seconds, save_document(doc, file_path, locale, compresslevel))
+
+def create_word_documents_standalone(scenarios, folder_path="C:/Users/olive/Desktop/UAT_Test_Evidence", workers=1, digests=None, previous=None,
+                                     locales=(SOURCE_LOCALE,), compresslevel=DEFAULT_COMPRESSLEVEL, pool=None):
+    """Save a document in every one of locales for each test, skipping tests unchanged since the manifest entry previous.
+
+    digests are the test_digests of scenarios, which are shared by every locale. Translating,
+    building and saving overlap: the step text of the next tests is translated on a background
+    thread while documents are built, and each document is saved on an I/O thread while the
+    next is built (or by the worker that built it). The workers are pool, from process_pool, if given.
+    Returns the outputs for this workbook's manifest entry and a DocumentResult for each document
+    built, in the order the documents were named. A document with text that could not be translated
+    is recorded without a digest, so the next run builds it again.
+    """
+    digests = digests or {}
+    for locale in locales:
+        os.makedirs(locale_directory(folder_path, locale, locales), exist_ok=True)
+
+    def is_stale(test_id, test, locale):
+        key = test_key(test_id, test, locale)
+        return not is_current(previous, key, digests.get(key))
+
+    # Only the file names are translated up front, they decide which documents are built
+    names, names_failed = translate_for_locales({locale: [test.TestName for scenario in scenarios for test_id, test in scenario.tests.items()
+                                                          if is_stale(test_id, test, locale)] for locale in locales})
+    # Documents with text that could not be translated, saved for now and built again on the next run
+    failed = set()
+
+    # Name every document up front so the output doesn't depend on which worker finishes first.
+    # A later test with the same file name replaces an earlier one, as when saving one by one.
+    # Each test's documents in every locale follow one another, so a chunk's step text is
+    # translated into all the locales in the same pass.
+    jobs = {}
+    outputs = {}
     for scenario in scenarios:
         for test_id, test in scenario.tests.items():
-            doc = Document()
-            doc.styles['Normal'].font.name = 'Calibri (Body)'
-            doc.styles['Normal'].font.size = Pt(12)
-
-            # Set the document to landscape orientation
-            section = doc.sections[-1]
-            section.orientation = WD_ORIENTATION.LANDSCAPE
-            new_width, new_height = section.page_height, section.page_width
-            section.page_width = new_width
-            section.page_height = new_height
-
-            p = doc.add_paragraph()
-            run = p.add_run("Test Instructions\nPlease click ")
-            run.bold = True
-            run.font.size = Pt(14)
-
-            # Adding the hyperlink
-            hyperlink_url = 'https://myiglo.sharepoint.com/:w:/s/PhoenixProgramme2021-2024/EQ7d0Uhfs85Pit2Gk8DDnKsBP4Z25YQGJS34ULGxc39yew?e=KQHY5u'
-            hyperlink = doc.part.relate_to(hyperlink_url, 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink', is_external=True)
-
-            # Create the hyperlink element
-            hyperlink_element = OxmlElement('w:hyperlink')
-            hyperlink_element.set(qn('r:id'), hyperlink)
-
-            # Create the run for the hyperlink text
-            r = OxmlElement('w:r')
-            rPr = OxmlElement('w:rPr')
-
-            # Set underline and color to blue
-            underline = OxmlElement('w:u')
-            underline.set(qn('w:val'), 'single')
-            rPr.append(underline)
-
-            color = OxmlElement('w:color')
-            color.set(qn('w:val'), '0000FF')  # Blue color
-            rPr.append(color)
-
-            r.append(rPr)
-            t = OxmlElement('w:t')
-            t.text = "UAT Test Instructions.docx"
-            r.append(t)
-            hyperlink_element.append(r)
-
-            p._element.append(hyperlink_element)
-
-            # Continue the sentence after the hyperlink
-            run = p.add_run(" and read the instructions before you start testing!")
-            run.bold = True
-            run.font.size = Pt(14)
-
-
-            p = doc.add_paragraph()
-            run = p.add_run("UAT Test Script Execution")
-            run.bold = True
-            run.font.size = Pt(14)
-            p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-
-            # Initialize table with a single row for headers
-            table1 = doc.add_table(rows=1, cols=5)
-            table1.style = 'Table Grid'
-
-            # Apply header style
-            for cell in table1.rows[0].cells:
-                cell._element.get_or_add_tcPr().append(parse_xml(r'<w:shd {} w:fill="0047AB"/>'.format(nsdecls('w'))))
-
-            # Define header cells text
-            hdr_cells = table1.rows[0].cells
-            hdr_text = ['Business Area', 'Responsible Tester', 'Status', 'Date', 'Country']
-            for i, text in enumerate(hdr_text):
-                hdr_cells[i].text = text
-                hdr_cells[i].paragraphs[0].runs[0].font.color.rgb = RGBColor(255, 255, 255)
-                hdr_cells[i].paragraphs[0].runs[0].bold = True
-
-            # Define areas
-            areas = ['Demand Planning', 'Supply Planning', 'Procurement', 'Warehousing', 'Quality Management', 'Production Planning', 'Plant maintenance', 'Commercial Finance', 'Order to Cash', 'FP&A-S4', 'R2R', 'MDG']
-
-            # Add rows for each area and fill the first column with area names
-            for area in areas:
-                # Add a new row at the end of the table
-                row = table1.add_row()
-                # Set the text for the first cell in the row to the area name
-                row.cells[0].text = area
-            
-            doc.add_page_break()
-
-            if test.steps:
-                first_step = test.steps[0]
-                p = doc.add_paragraph()
-                run = p.add_run(f"Test Name: {first_step.TestName}\nTest ID: {first_step.TestID} - {first_step.Workstream}\n\n")
-                run.bold = True
-                run.font.size = Pt(14)
-                p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-                run = p.add_run("Test Description:\n")
-                run.bold = True
-                run.font.size = Pt(14)
-                p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-                run = p.add_run(f"{first_step.TestDescription}\n\n")
-                run.font.size = Pt(12)
-                p.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
-                StepNumber = 0
-                for step in test.steps:
-                    StepNumber += 1
-                    # Create the table with 5 rows and 6 columns
-                    table2 = doc.add_table(rows=5, cols=6)
-                    table2.style = 'Table Grid'
-
-                    # First row (Header Row)
-                    hdr_cells = table2.rows[0].cells
-
-                    # Apply bold formatting to specific headers
-                    hdr_cells[0].text = 'Test Step'
-                    hdr_cells[0].paragraphs[0].runs[0].bold = True
-
-                    hdr_cells[1].text = str(StepNumber)  # The test step number
-
-                    hdr_cells[2].text = 'Role'
-                    hdr_cells[2].paragraphs[0].runs[0].bold = True
-
-                    hdr_cells[3].text = step.Role  # Empty cell for Role data
-
-                    hdr_cells[4].text = 'Test Status <Pass/Fail>'
-                    hdr_cells[4].paragraphs[0].runs[0].bold = True
-
-                    hdr_cells[5].text = ''  # Empty cell for Test Status data
-
-                    # Second row
-                    row2_cells = table2.rows[1].cells
-                    row2_cells[0].text = 'Description'
-                    row2_cells[0].paragraphs[0].runs[0].bold = True
-                    row2_cells[1].merge(row2_cells[5])  # Merge the remaining cells to form a single cell
-                    row2_cells[1].text = step.StepDescription
-
-                    # Third row
-                    row3_cells = table2.rows[2].cells
-                    row3_cells[0].text = 'Expected'
-                    row3_cells[0].paragraphs[0].runs[0].bold = True
-                    row3_cells[1].merge(row3_cells[5])  # Merge the remaining cells to form a single cell
-                    row3_cells[1].text = step.ExpectedResults
-
-                    # Fourth row
-                    row3_cells = table2.rows[3].cells
-                    row3_cells[0].text = 'Actual Result'
-                    row3_cells[0].paragraphs[0].runs[0].bold = True
-                    row3_cells[1].merge(row3_cells[5])  # Merge the remaining cells to form a single cell
-                    row3_cells[1].text = ''
-
-                    # Fith row
-                    row4_cells = table2.rows[4].cells
-                    row4_cells[0].text = 'Tester Comments'
-                    row4_cells[0].paragraphs[0].runs[0].bold = True
-                    row4_cells[1].merge(row4_cells[5])  # Merge the remaining cells to form a single cell
-                    row4_cells[1].text = ''
-
-                    # Adjust alignment for all cells
-                    for row in table2.rows:
-                        for cell in row.cells:
-                            for paragraph in cell.paragraphs:
-                                paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
-            
-                    doc.add_paragraph("\nPlease attach the test Screenshot Below, make sure to include the system date and time:\n\n\n\n\n", style='Normal')
-        
-            # Save document
-            file_name_part_safe = re.sub(r'[/\\:*?"<>|\r\n]+', " ", first_step.TestName)
-            file_name_safe = f"{file_name_part_safe[:100]}_{test_id}.docx"  # Truncate to ensure the filename doesn't exceed limits
-            file_path = os.path.join(folder_path, file_name_safe)
-            print(f"Document saved to {file_name_safe}")
-            doc.save(file_path)
-
-def process_all_files(excel_files_directory, word_files_directory):
-    for filename in os.listdir(excel_files_directory):
-        file_path = os.path.join(excel_files_directory, filename)
-        if os.path.isfile(file_path) and filename.endswith(('.xlsx', '.xlsm', '.xltx', '.xltm')):
-            # Extract file name without extension for folder naming
-            base_name = os.path.splitext(filename)[0]
-            # Define a new folder path for each Excel file
-            new_folder_path = os.path.join(word_files_directory, base_name)
-            # Create the folder if it doesn't exist and generate documents into it
-            os.makedirs(new_folder_path, exist_ok=True)
-            create_word_documents_standalone(read_excel_to_tests(file_path), new_folder_path)
-
-# Get the current directory for Excel files
-current_directory = os.getcwd()
-
-# Get the parent directory for Word files
-parent_directory = os.path.abspath(os.path.join(current_directory, os.pardir))
-
-process_all_files(current_directory, parent_directory)
-print("\n\n\t\tComplete")
+            for locale in locales:
+                key = test_key(test_id, test, locale)
+                if not is_stale(test_id, test, locale):
+                    # Unchanged since the last run, keep the document already saved for it
+                    file_path = previous['outputs'][key][1]
+                    jobs[file_path] = None
+                else:
+                    file_path = os.path.join(locale_directory(folder_path, locale, locales),
+                                             document_file_name(test_id, test, names.get(locale)))
+                    jobs[file_path] = (test, file_path, locale)
+                    if test.TestName in names_failed.get(locale, ()):
+                        failed.add(file_path)
+                outputs[key] = [digests.get(key), file_path]
+
+    jobs = [job for job in jobs.values() if job is not None]
+    progress = Progress(len(jobs), "documents saved")
+    results = []
+    if workers > 1:
+        # The workers are started before the translation thread, so none is forked while it holds a lock
+        with nullcontext(pool) if pool is not None else process_pool(workers) as pool:
+            localised = chain.from_iterable(prefetch(localised_chunks(jobs, failed=failed)))
+            tasks = ((test, file_path, locale, compresslevel) for test, file_path, locale in localised)
+            for result in iter_in_processes(build_test_document, tasks, workers, pool=pool):
+                results.append(result)
+                progress.update()
+    else:
+        localised = chain.from_iterable(prefetch(localised_chunks(jobs, failed=failed)))
+
+        def save(doc, file_path, steps, build_seconds, locale):
+            results.append(DocumentResult(file_path, steps, build_seconds, save_document(doc, file_path, locale, compresslevel)))
+            progress.update()
+
+        with IOThread() as io_thread:
+            for test, file_path, locale in localised:
+                started = time.perf_counter()
+                doc = build_document(test, locale)
+                io_thread.submit(save, doc, file_path, len(test.steps), time.perf_counter() - started, locale)
+
+    for output in outputs.values():
+        if output[1] in failed:
+            output[0] = None
+    return outputs, results
+
+def describe_results(name, results):
+    """Summarise the DocumentResults of one workbook's documents: how many, their steps, time spent and the slowest."""
+    slowest = max(results, key=lambda result: result.build_seconds + result.save_seconds)
+    return (f"{name}: {len(results)} documents, {sum(result.steps for result in results)} steps, "
+            f"built in {sum(result.build_seconds for result in results):.2f}s and saved in "
+            f"{sum(result.save_seconds for result in results):.2f}s, slowest {os.path.basename(slowest.path)} "
+            f"({slowest.steps} steps, {slowest.build_seconds + slowest.save_seconds:.2f}s)")
+
+def process_file(file_path, word_files_directory, workers=1, previous=None, locales=(SOURCE_LOCALE,), compresslevel=DEFAULT_COMPRESSLEVEL,
+                 shard=(0, 1), cache_dir=None, sheet_workers=1, pool=None):
+    """Generate the documents in every one of locales for one workbook, which is read only once.
+
+    Runs in a worker process when process_all_files is given workbook_workers. previous is the
+    workbook's entry in the last run's manifest, only tests whose rows changed since then are
+    translated and rebuilt. Of a sharded run's (index, count) shard, only the tests whose workbook,
+    scenario and test ID hash to it are built. Given cache_dir, the parsed rows are cached there,
+    and sheet_workers processes parse the workbook's sheets. The documents are built on pool, the
+    run's process_pool of workers processes, if given. Returns the workbook's new manifest entry
+    and its cache hits and misses.
+    """
+    source_digest = file_digest(file_path)
+    if workbook_is_current(previous, source_digest, locales):
+        print(f"{os.path.basename(file_path)} is unchanged since the last run")
+        return previous, 0, 0
+
+    cache = get_translation_cache()
+    hits, misses = cache.hits, cache.misses
+    # Extract file name without extension for folder naming
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    # Define a new folder path for each Excel file
+    new_folder_path = os.path.join(word_files_directory, base_name)
+    # Create the folder if it doesn't exist and generate documents into it
+    os.makedirs(new_folder_path, exist_ok=True)
+    scenarios = read_excel_to_tests(file_path, cache_dir, sheet_workers)
+    # Every shard counts the whole workbook's outputs, so merging the shards can tell if any are missing
+    expected = sum(len(scenario.tests) for scenario in scenarios) * len(locales)
+    # Sharded on the workbook's own file name for the test, so tests saved under the same name, which replace
+    # one another, are built by one shard and the merge sees no two shards writing one document
+    for scenario in scenarios:
+        scenario.tests = {test_id: test for test_id, test in scenario.tests.items()
+                          if in_shard(shard, os.path.basename(file_path), document_file_name(test_id, test))}
+    digests = test_digests(scenarios, locales)
+    outputs, results = create_word_documents_standalone(scenarios, new_folder_path, workers, digests, previous, locales,
+                                                        compresslevel, pool)
+    if results:
+        print(describe_results(os.path.basename(file_path), results))
+
+    # Report this workbook's cache lookups, the run total is added up by process_all_files
+    entry = {'file': complete_digest(source_digest, outputs), 'locales': list(locales), 'outputs': outputs, 'expected': expected}
+    return entry, cache.hits - hits, cache.misses - misses
+
+def process_all_files(excel_files_directory, word_files_directory, workers=1, workbook_workers=1, incremental=True, metrics_file=None,
+                      locales=(SOURCE_LOCALE,), compresslevel=DEFAULT_COMPRESSLEVEL, shard_index=0, shard_count=1, parse_cache=True,
+                      sheet_workers=1, script_path=__file__):
+    started = time.perf_counter()
+    shard = (shard_index, shard_count)
+    cache_dir = DEFAULT_CACHE_DIR if parse_cache else None
+
+    # Labels of a locale without a bundle are translated here once, before any worker needs them
+    for locale in locales:
+        get_labels(locale)
+
+    # The manifest from the last run says which documents are still up to date
+    # Named after the script run, so the EN and SP scripts keep separate manifests
+    manifest_file = manifest_path(word_files_directory, script_path, shard)
+    version = generator_version(__file__)
+    recorded_version, recorded = load_manifest(manifest_file)
+    # After a change to the generator, or when asked to, everything is rebuilt
+    previous = recorded if incremental and recorded_version == version else {}
+
+    # Workbooks processed here share one pool of document workers for the whole run. One in a workbook
+    # worker starts its own, a pool can't be handed to another process.
+    with process_pool(workers if workbook_workers <= 1 else 1) as pool:
+        jobs = []
+        for filename in os.listdir(excel_files_directory):
+            file_path = os.path.join(excel_files_directory, filename)
+            if os.path.isfile(file_path) and filename.endswith(INPUT_EXTENSIONS):
+                jobs.append((file_path, word_files_directory, workers, previous.get(filename), locales, compresslevel, shard, cache_dir,
+                             sheet_workers, pool))
+
+        # A workbook that fails is reported without stopping the others
+        results, failures = run_workbooks(process_file, jobs, workbook_workers)
+
+    # Record what was built and remove documents of tests that are gone
+    update_manifest(manifest_file, version, recorded, {path: entry for path, (entry, _, _) in results.items()}, failures)
+
+    # Workbooks may have been translated in other processes, so total up what each one reported
+    if any(locale != SOURCE_LOCALE for locale in locales):
+        print(format_report(sum(hits for _, hits, _ in results.values()), sum(misses for _, _, misses in results.values())))
+
+    # Where the time went, across every process that took part
+    metrics = get_metrics()
+    elapsed = time.perf_counter() - started
+    print(metrics.report(elapsed))
+    if metrics_file:
+        metrics.write(metrics_file, elapsed)
+    return failures
+
+def main(locales=None, script_path=__file__):
+    """Run the script with the settings below, from the folder holding the workbooks.
+
+    The SP script runs this with locales=['es'] and its own path, which names its manifest.
+    """
+    # Get the current directory for Excel files
+    current_directory = os.getcwd()
+
+    # Get the parent directory for Word files
+    parent_directory = os.path.abspath(os.path.join(current_directory, os.pardir))
+
+    # Number of worker processes used to build documents, 1 builds them one after another
+    document_workers = 1
+
+    # Number of workbooks processed at the same time, each in its own process
+    workbook_workers = 1
+
+    # Number of worker processes parsing the sheets of a workbook at the same time, for workbooks
+    # with many sheets (one per country, say). 1 reads the sheets one after another.
+    sheet_workers = 1
+
+    # Only rebuild documents whose rows changed since the last run, False rebuilds everything
+    incremental = True
+
+    # Also save the run's timings and counts to this file: JSON, or a Prometheus textfile if it ends in .prom
+    metrics_file = None
+
+    # Languages to produce documents in, all from one read of each workbook, e.g. ['en', 'es'].
+    # With more than one, each language's documents go in a subfolder named after it.
+    locales = locales or ['en']
+
+    # Deflate level of the saved documents: 0 stores them uncompressed, the quickest for scratch runs, 9 is the smallest
+    compression_level = 6
+
+    # Split a full run over several machines that see one output folder at the same path: each runs
+    # the same workbooks with its own shard_index, from 0 to shard_count - 1, and builds a separate part of the tests
+    shard_index = 0
+    shard_count = 1
+
+    # Once every shard has finished, run once more with this set to check nothing is missing and
+    # combine the shards' manifests into the one later runs use
+    merge_shards = False
+
+    # Keep each workbook's parsed rows in ~/.test_document_generator/workbooks, so a workbook that
+    # hasn't changed is loaded from there instead of being parsed again. False always parses it.
+    parse_cache = True
+
+    if merge_shards:
+        merge_shard_manifests(current_directory, parent_directory, script_path, shard_count)
+    else:
+        process_all_files(current_directory, parent_directory, document_workers, workbook_workers, incremental, metrics_file, locales,
+                          compression_level, shard_index, shard_count, parse_cache, sheet_workers, script_path)
+    get_translation_cache().close()
+    print("\n\n\t\tComplete")
+
+# Worker processes re-import this script, only start a run from the main process
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import asyncio
+import importlib.util
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Make the shared helpers in the repository root importable
+REPOSITORY_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, REPOSITORY_ROOT)
+import common.translation
+import common.translation_cache
+from common.translation_cache import TranslationCache
+
+# The generator scripts the tests load, their file names aren't importable module names
+SCRIPTS = {
+    'e2e_EN': os.path.join('E2E', 'e2e - EN.py'),
+    'standalone_EN': os.path.join('standalone', 'standalone - EN.py'),
+}
+
+
+def load_script(name):
+    """Import one of SCRIPTS once, registered in sys.modules so worker processes can unpickle its functions."""
+    module = sys.modules.get(name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(REPOSITORY_ROOT, SCRIPTS[name]))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def e2e():
+    return load_script('e2e_EN')
+
+
+@pytest.fixture
+def standalone():
+    return load_script('standalone_EN')
+
+
+class StubTranslator:
+    """Stands in for googletrans.Translator, tagging each text with the target language.
+
+    Texts in translations get that translation instead, and texts in failing raise as a
+    rate-limited request does with raise_exception=True. Every request is kept in requests.
+    """
+
+    translations = {}
+    failing = set()
+    requests = []
+
+    def __init__(self, **options):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def translate(self, text, dest='es'):
+        StubTranslator.requests.append((text, dest))
+        await asyncio.sleep(0)
+        if text in self.failing:
+            raise Exception("Unexpected status code \"429\" from ['translate.google.com']")
+        return SimpleNamespace(text=self.translations.get(text, f"[{dest}] {text}"))
+
+
+@pytest.fixture
+def translator(tmp_path, monkeypatch):
+    """Translate with StubTranslator into a fresh cache, which the scripts also get from get_translation_cache."""
+    cache = TranslationCache(str(tmp_path / 'translations.sqlite3'))
+    monkeypatch.setattr(common.translation, 'Translator', StubTranslator)
+    monkeypatch.setattr(common.translation_cache, '_default_cache', cache)
+    StubTranslator.translations = {}
+    StubTranslator.failing = set()
+    StubTranslator.requests = []
+    yield StubTranslator
+    common.translation.close_client()
+    cache.close()
@@ -0,0 +1,46 @@
+import pytest
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from lxml import etree
+
+from common.docbuild import add_step_table
+from common.locales import get_labels
+
+
+def build_table_cell_by_cell(doc, locale, number, role, description, expected):
+    """The step table as the scripts built it before the prototype: a new table, merged and filled in per step."""
+    labels = get_labels(locale)
+    table = doc.add_table(rows=5, cols=6)
+    table.style = 'Table Grid'
+    cells = table.rows[0].cells
+    for i, text in enumerate([labels['test_step'], number, labels['role'], role, labels['test_status'], '']):
+        cells[i].text = text
+        if i % 2 == 0:
+            cells[i].paragraphs[0].runs[0].bold = True
+    for row, label, text in [(1, 'description', description), (2, 'expected', expected), (3, 'actual_result', ''),
+                             (4, 'tester_comments', '')]:
+        cells = table.rows[row].cells
+        cells[0].text = labels[label]
+        cells[0].paragraphs[0].runs[0].bold = True
+        cells[1].merge(cells[5])
+        cells[1].text = text
+    for row in table.rows:
+        for cell in row.cells:
+            for paragraph in cell.paragraphs:
+                paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
+    return table._tbl
+
+
+@pytest.mark.parametrize('locale', ['en', 'es'])
+@pytest.mark.parametrize('values', [
+    ('1', 'Buyer', 'Open the order', 'It opens'),
+    ('12', '', 'Open the order\nthen\tclose it', ''),
+    ('3', 'Buyer & <Planner>', '  leading and trailing spaces  ', 'ñ ü € 漢字'),
+])
+def test_copied_step_table_matches_one_built_cell_by_cell(e2e, locale, values):
+    copied = add_step_table(Document(), e2e.build_step_table, *values, args=(locale,))
+    # Copied twice, the prototype is left as it was
+    copied = add_step_table(Document(), e2e.build_step_table, *values, args=(locale,))
+    built = build_table_cell_by_cell(Document(), locale, *values)
+
+    assert etree.tostring(copied, method='c14n') == etree.tostring(built, method='c14n')
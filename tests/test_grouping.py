@@ -0,0 +1,48 @@
+import csv
+import os
+
+from docx import Document
+
+from common.ingest import COLUMNS
+
+ROWS = [
+    ('Scenario 1', 'TC-001', 'Open an order', 'Check the order', 'Step 1', 'Open the order', 'It opens', 'Buyer', 'Supply'),
+    ('Scenario 1', 'TC-002', 'Open the order', 'Check the order', 'Step 1', 'Open the order', 'It opens', 'Buyer', 'Supply'),
+    ('Scenario 1', 'TC-001', 'Open an order', 'Check the order', 'Step 2', 'Close the order', 'It closes', 'Buyer', 'Supply'),
+]
+
+
+def write_workbook(path):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f).writerows([COLUMNS] + ROWS)
+
+
+def test_e2e_tests_with_the_same_translation_stay_apart(tmp_path, e2e, translator):
+    # Both test names translate to one Spanish name, the tests are still grouped on their own keys
+    translator.translations = {'Open an order': 'Abrir el pedido', 'Open the order': 'Abrir el pedido'}
+    write_workbook(tmp_path / 'suite.csv')
+
+    tests = e2e.read_excel_to_tests(str(tmp_path / 'suite.csv'))
+    (path,) = e2e.create_word_documents_standalone(tests, str(tmp_path / 'out'), 'suite', locale='es')
+
+    doc = Document(path)
+    headings = [paragraph.text for paragraph in doc.paragraphs if paragraph.style.name == 'Heading 1']
+    assert headings == ['Abrir el pedido', 'Abrir el pedido']
+    # The tester table, then two steps for TC-001 and one for TC-002
+    assert len(doc.tables) == 4
+    assert [test.TestID for test in tests] == ['TC-001', 'TC-002']
+    assert [len(test.steps) for test in tests] == [2, 1]
+
+
+def test_standalone_tests_with_the_same_translation_stay_apart(tmp_path, standalone, translator):
+    translator.translations = {'Open an order': 'Abrir el pedido', 'Open the order': 'Abrir el pedido'}
+    excel_dir, word_dir = tmp_path / 'in', tmp_path / 'out'
+    excel_dir.mkdir()
+    write_workbook(excel_dir / 'suite.csv')
+
+    standalone.process_all_files(str(excel_dir), str(word_dir), locales=['es'], parse_cache=False)
+
+    assert sorted(os.listdir(word_dir / 'suite')) == ['Abrir el pedido_TC-001.docx', 'Abrir el pedido_TC-002.docx']
+    # The tester table and one table per step
+    assert len(Document(str(word_dir / 'suite' / 'Abrir el pedido_TC-001.docx')).tables) == 3
+    assert len(Document(str(word_dir / 'suite' / 'Abrir el pedido_TC-002.docx')).tables) == 2
@@ -0,0 +1,102 @@
+import csv
+
+import pytest
+from openpyxl import Workbook
+
+from common.ingest import COLUMNS, Row, count_sheets, iter_input_rows
+
+# An extra column ahead of the nine, so they are only found by their header names
+HEADER = ('Notes',) + COLUMNS
+ROWS = [
+    ('', 'Scenario 1', 'TC-001', 'Open an order', 'Check the order', 'Step 1', 'Open the order', 'It opens', 'Buyer', 'Supply'),
+    ('', '', '', '', '', '', '', '', '', ''),
+    ('Retest', 'Scenario 1', 'TC-001', 'Open an order', 'Check the order', 'Step 2', 'Close the order', '', 'Buyer', 'Supply'),
+]
+EXPECTED = [
+    Row('Scenario 1', 'TC-001', 'Open an order', 'Check the order', 'Step 1', 'Open the order', 'It opens', 'Buyer', 'Supply'),
+    Row('Scenario 1', 'TC-001', 'Open an order', 'Check the order', 'Step 2', 'Close the order', None, 'Buyer', 'Supply'),
+]
+
+
+def blank_to_none(row):
+    return [value if value != '' else None for value in row]
+
+
+def write_xlsx(path):
+    workbook = Workbook()
+    workbook.active.append(HEADER)
+    for row in ROWS:
+        workbook.active.append(blank_to_none(row))
+    workbook.save(path)
+
+
+def write_csv(path):
+    # Excel's CSV export starts with a byte order mark
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        csv.writer(f).writerows([HEADER] + ROWS)
+
+
+def write_parquet(path):
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+    columns = list(zip(*(blank_to_none(row) for row in ROWS)))
+    pq.write_table(pa.table({name: pa.array(column, pa.string()) for name, column in zip(HEADER, columns)}), path)
+
+
+@pytest.mark.parametrize('extension, write', [('.xlsx', write_xlsx), ('.csv', write_csv), ('.parquet', write_parquet)])
+def test_every_input_format_reads_the_same_rows(tmp_path, extension, write):
+    path = str(tmp_path / f'suite{extension}')
+    write(path)
+
+    assert list(iter_input_rows(path, first_sheet_only=True, use_header=True)) == EXPECTED
+    assert count_sheets(path) == 1
+
+
+def test_csv_columns_are_taken_in_order_without_the_header(tmp_path):
+    path = str(tmp_path / 'suite.csv')
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f).writerows([COLUMNS] + [row[1:] for row in ROWS])
+
+    assert list(iter_input_rows(path)) == EXPECTED
+
+
+def test_missing_columns_are_named(tmp_path):
+    path = str(tmp_path / 'suite.csv')
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f).writerow(COLUMNS[:-2])
+
+    with pytest.raises(ValueError, match="missing columns: Role, Workstream"):
+        list(iter_input_rows(path, use_header=True))
+
+
+def test_unknown_extension_is_refused(tmp_path):
+    with pytest.raises(ValueError, match="is not a file the generators read"):
+        iter_input_rows(str(tmp_path / 'suite.txt'))
+
+
+def scenario_values(scenarios):
+    return [(scenario.ScenarioName, [
+        (test_id, test.Scenario, test.TestName, test.TestDescription, test.Workstream,
+         [(step.StepName, step.StepDescription, step.ExpectedResults, step.Role) for step in test.steps])
+        for test_id, test in scenario.tests.items()]) for scenario in scenarios]
+
+
+@pytest.mark.parametrize('sheet_workers', [2, 3])
+def test_sheets_parsed_in_parallel_read_the_same_tests_in_order(tmp_path, standalone, sheet_workers):
+    workbook = Workbook()
+    for sheet in range(4):
+        worksheet = workbook.active if sheet == 0 else workbook.create_sheet(f'Sheet {sheet}')
+        worksheet.append(COLUMNS)
+        for row in range(sheet * 3 + 1):
+            # TC-001 carries on from one sheet to the next, the other tests start on each sheet
+            test_id = 'TC-001' if row % 2 == 0 else f'TC-{sheet}{row:02}'
+            worksheet.append((f'Scenario {1 + row % 3}', test_id, f'Test {test_id}', 'Check\tit', f'Step {sheet}.{row}',
+                              f'Open  order {sheet}_x000D_\n{row}', None if row == 1 else 'It opens', 'Buyer', 'Supply'))
+        worksheet.append((None,) * len(COLUMNS))
+    path = str(tmp_path / 'suite.xlsx')
+    workbook.save(path)
+
+    sequential = scenario_values(standalone.read_excel_to_tests(path))
+    assert len(sequential) == 3
+    assert sum(len(steps) for _, tests in sequential for *_, steps in tests) == 1 + 4 + 7 + 10
+    assert scenario_values(standalone.read_excel_to_tests(path, sheet_workers=sheet_workers)) == sequential
@@ -0,0 +1,116 @@
+import json
+import re
+
+import pytest
+
+from common.instrumentation import Metrics, Progress, _prometheus_text, call_measured, get_metrics
+
+# One sample line of the Prometheus text format: name, optional labels, value
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-zA-Z_][a-zA-Z0-9_]*="[^"]*"\})? \S+$')
+
+
+def recorded_metrics():
+    metrics = Metrics()
+    metrics.add('row_parsing', 1.5, 300)
+    metrics.add('row_parsing', 0.5, 100)
+    metrics.add('document_save', 2.0, 4)
+    metrics.count('translation_failures')
+    metrics.count('translation_characters', 120)
+    return metrics
+
+
+def test_stages_and_counters_add_up():
+    metrics = recorded_metrics()
+    with metrics.stage('translation', 5):
+        pass
+    assert list(metrics.timed(iter([1, 2, 3]), 'workbook_load')) == [1, 2, 3]
+
+    assert metrics.stages['row_parsing'] == [2.0, 400]
+    assert metrics.stages['translation'][1] == 5
+    # The last call, which finds the iterable empty, counts no item
+    assert metrics.stages['workbook_load'][1] == 3
+    assert metrics.counters == {'translation_failures': 1, 'translation_characters': 120}
+
+
+def test_snapshot_from_another_process_merges_into_the_totals():
+    metrics = recorded_metrics()
+    snapshot = json.loads(json.dumps(recorded_metrics().snapshot()))
+    metrics.merge(snapshot)
+
+    assert metrics.stages['row_parsing'] == [4.0, 800]
+    assert metrics.counters['translation_characters'] == 240
+    metrics.reset()
+    assert metrics.snapshot() == {'stages': {}, 'counters': {}}
+
+
+def test_summary_and_report_give_the_throughput():
+    metrics = recorded_metrics()
+    summary = metrics.summary(8.0)
+    assert summary['rows'] == 400
+    assert summary['documents'] == 4
+    assert summary['rows_per_second'] == 50.0
+    assert summary['documents_per_second'] == 0.5
+    assert metrics.summary(0.0)['rows_per_second'] == 0.0
+
+    report = metrics.report(8.0).splitlines()
+    assert report[0] == "Run took 8.0s: 400 rows (50.0/s), 4 documents (0.50/s)"
+    # Slowest stage first, then the counters by name
+    assert report[1].split() == ['row_parsing', '2.00s', '400', 'items']
+    assert report[3].split() == ['translation_characters', '120']
+
+
+def test_written_as_json_or_prometheus_text(tmp_path):
+    metrics = recorded_metrics()
+    metrics.write(str(tmp_path / 'metrics.json'), 8.0)
+    assert json.loads((tmp_path / 'metrics.json').read_text(encoding='utf-8')) == metrics.summary(8.0)
+
+    metrics.write(str(tmp_path / 'metrics.prom'), 8.0)
+    text = (tmp_path / 'metrics.prom').read_text(encoding='utf-8')
+    assert text == _prometheus_text(metrics.summary(8.0))
+    assert text.endswith("\n")
+
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith('#'):
+            assert re.match(r'^# (HELP|TYPE) test_document_generator_\w+ ', line)
+            continue
+        assert SAMPLE.match(line), line
+        name, value = line.rsplit(' ', 1)
+        samples[name] = float(value)
+    assert samples == {
+        'test_document_generator_run_seconds': 8.0,
+        'test_document_generator_rows_per_second': 50.0,
+        'test_document_generator_documents_per_second': 0.5,
+        'test_document_generator_stage_seconds{stage="document_save"}': 2.0,
+        'test_document_generator_stage_seconds{stage="row_parsing"}': 2.0,
+        'test_document_generator_stage_items{stage="document_save"}': 4,
+        'test_document_generator_stage_items{stage="row_parsing"}': 400,
+        'test_document_generator_translation_characters': 120,
+        'test_document_generator_translation_failures': 1,
+    }
+    # Every metric is declared once, ahead of its samples
+    types = re.findall(r'^# TYPE (\S+) gauge$', text, re.MULTILINE)
+    assert len(types) == len(set(types)) == 7
+
+
+def recording(seconds):
+    get_metrics().add('document_build', seconds)
+    return 'built'
+
+
+def test_call_measured_returns_only_what_the_call_recorded():
+    get_metrics().add('document_build', 10.0)
+    result, snapshot = call_measured(recording, 0.25)
+    assert result == 'built'
+    assert snapshot == {'stages': {'document_build': [0.25, 1]}, 'counters': {}}
+    get_metrics().reset()
+
+
+@pytest.mark.parametrize('interval, lines', [(0.0, 3), (3600.0, 1)])
+def test_progress_prints_at_most_once_per_interval_and_at_the_end(capsys, interval, lines):
+    progress = Progress(3, 'documents saved', interval)
+    for _ in range(3):
+        progress.update()
+    out = capsys.readouterr().out.splitlines()
+    assert len(out) == lines
+    assert out[-1].startswith('3/3 documents saved (')
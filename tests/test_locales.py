@@ -0,0 +1,133 @@
+import csv
+
+import pytest
+from docx import Document
+
+import common.locales
+import common.translation
+from common.ingest import COLUMNS
+from common.locales import LABELS, SOURCE_LOCALE, get_labels, locale_directory
+
+
+def label_texts(labels):
+    return [text for value in labels.values() for text in (value if isinstance(value, list) else [value])]
+
+
+def test_every_bundle_has_the_labels_of_the_source_one():
+    source = LABELS[SOURCE_LOCALE]
+    for locale, labels in LABELS.items():
+        assert labels.keys() == source.keys(), locale
+        assert [len(value) for value in labels.values() if isinstance(value, list)] == [
+            len(value) for value in source.values() if isinstance(value, list)], locale
+    assert get_labels('es') is LABELS['es']
+
+
+def test_locale_without_a_bundle_is_machine_translated_once(monkeypatch, translator):
+    monkeypatch.setattr(common.locales, 'LABELS', dict(LABELS))
+    translator.translations = {'Test Step': 'Étape de test'}
+
+    labels = get_labels('fr')
+    assert labels.keys() == LABELS[SOURCE_LOCALE].keys()
+    assert labels['test_step'] == 'Étape de test'
+    assert labels['volume'] == '[fr] Volume'
+    assert labels['business_areas'] == [f'[fr] {area}' for area in LABELS[SOURCE_LOCALE]['business_areas']]
+    # Each distinct text is sent once, and only on first use
+    assert sorted(translator.requests) == sorted((text, 'fr') for text in set(label_texts(LABELS[SOURCE_LOCALE])))
+    requests = len(translator.requests)
+    assert get_labels('fr') is labels
+    assert len(translator.requests) == requests
+
+
+def step_table_labels(doc):
+    return [row.cells[0].text for row in doc.tables[-1].rows]
+
+
+@pytest.mark.parametrize('locale, expected', [('en', 'Expected'), ('es', 'Resultado esperado')])
+def test_e2e_step_table_labels(e2e, locale, expected):
+    test = e2e.Test.from_cleaned(('Scenario 1', 'TC-001', 'Open an order', '', 'Step 1', 'Open the order', '', 'Buyer', ''))
+    test.add_step(e2e.Step.from_cleaned(('Scenario 1', 'TC-001', 'Open an order', '', 'Step 1', 'Open the order', '', 'Buyer', '')))
+    assert step_table_labels(e2e.build_document([test], locale))[2] == expected
+
+
+@pytest.mark.parametrize('locale, expected', [('en', 'Expected'), ('es', 'Resultados esperados')])
+def test_standalone_step_table_keeps_its_own_labels(standalone, locale, expected):
+    values = ('Scenario 1', 'TC-001', 'Open an order', '', 'Step 1', 'Open the order', '', 'Buyer', '')
+    test = standalone.Test.from_cleaned(values)
+    test.add_step(standalone.Step.from_cleaned(values))
+    assert step_table_labels(standalone.build_document(test, locale))[2] == expected
+
+
+def test_locale_directory_only_splits_several_locales():
+    assert locale_directory('out', 'es', ['es']) == 'out'
+    assert locale_directory('out', 'es', ['en', 'es']).replace('\\', '/') == 'out/es'
+
+
+def test_e2e_spanish_document_translates_only_names_and_descriptions(tmp_path, e2e, translator):
+    values = ('Scenario 1', 'TC-001', 'Open an order', 'Check the order', 'Step 1', 'Open the order', 'It opens', 'Buyer',
+              'Supply')
+    test = e2e.Test.from_cleaned(values)
+    test.add_step(e2e.Step.from_cleaned(values))
+    (path,) = e2e.create_word_documents_standalone([test], str(tmp_path), 'suite', locale='es')
+
+    doc = Document(path)
+    headings = [paragraph.text for paragraph in doc.paragraphs if paragraph.style.name == 'Heading 1']
+    assert headings == ['[es] Open an order']
+    text = '\n'.join(paragraph.text for paragraph in doc.paragraphs)
+    assert 'Identificación de la prueba: TC-001 - Supply' in text
+    assert '[es] Check the order' in text
+    assert [cell.text for cell in doc.tables[-1].columns[1].cells[:3]] == ['1', 'Open the order', 'It opens']
+    assert {text for text, _ in translator.requests} == {'Open an order', 'Check the order'}
+
+
+def record_translation_calls(monkeypatch):
+    calls = []
+    translate_to_locales = common.translation.translate_to_locales
+
+    def recording(texts_by_dest, *args):
+        calls.append({dest: list(texts) for dest, texts in texts_by_dest.items()})
+        return translate_to_locales(texts_by_dest, *args)
+
+    monkeypatch.setattr(common.translation, 'translate_to_locales', recording)
+    return calls
+
+
+def write_workbook(directory, rows):
+    directory.mkdir()
+    with open(directory / 'suite.csv', 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f).writerows([COLUMNS] + rows)
+
+
+ROWS = [('Scenario 1', f'TC-{number:03}', f'Test {number}', f'Check {number}', 'Step 1', f'Open order {number}', 'It opens',
+         'Buyer', 'Supply') for number in range(3)]
+
+
+def test_e2e_translates_each_chunk_into_every_locale_at_once(tmp_path, monkeypatch, e2e, translator):
+    monkeypatch.setitem(LABELS, 'fr', LABELS['es'])
+    write_workbook(tmp_path / 'in', ROWS)
+    calls = record_translation_calls(monkeypatch)
+    e2e.process_all_files(str(tmp_path / 'in'), str(tmp_path / 'out'), locales=['en', 'es', 'fr'], parse_cache=False)
+
+    assert calls == [{'es': texts, 'fr': texts} for texts in [[value for row in ROWS for value in (row[2], row[3])]]]
+    for locale in ('es', 'fr'):
+        doc = Document(str(tmp_path / 'out' / locale / 'suite.docx'))
+        assert [paragraph.text for paragraph in doc.paragraphs if paragraph.style.name == 'Heading 1'] == [
+            f'[{locale}] Test {number}' for number in range(3)]
+    assert len(translator.requests) == 12
+
+
+def test_standalone_translates_each_chunk_into_every_locale_at_once(tmp_path, monkeypatch, standalone, translator):
+    monkeypatch.setitem(LABELS, 'fr', LABELS['es'])
+    # More step text than one chunk holds
+    rows = [('Scenario 1', f'TC-{number:03}', f'Test {number}', '', 'Step 1', f'Open order {number}', 'It opens', 'Buyer',
+             'Supply') for number in range(40)]
+    write_workbook(tmp_path / 'in', rows)
+    calls = record_translation_calls(monkeypatch)
+    standalone.process_all_files(str(tmp_path / 'in'), str(tmp_path / 'out'), locales=['en', 'es', 'fr'], parse_cache=False)
+
+    # The file names first, then the step text a chunk at a time, every one in both languages
+    assert len(calls) > 2
+    assert all(sorted(call) == ['es', 'fr'] for call in calls)
+    for locale in ('es', 'fr'):
+        assert [text for call in calls[1:] for text in call[locale]] == [
+            value for row in rows for value in (row[4], row[5], row[6])]
+    assert (tmp_path / 'out' / 'suite' / 'fr' / '[fr] Test 39_TC-039.docx').is_file()
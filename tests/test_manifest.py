@@ -0,0 +1,67 @@
+from common.manifest import (content_digest, generator_version, is_current, load_manifest, record_key, update_manifest,
+                             workbook_is_current)
+
+
+def test_saved_manifest_reports_what_is_current(tmp_path):
+    document = tmp_path / 'TC-001.docx'
+    document.write_bytes(b'')
+    digest = content_digest([('Scenario 1', 'TC-001'), ('Step 1', 'Open the order')])
+    key = record_key('Scenario 1', 'TC-001', 'en')
+    entry = {'file': 'abc', 'locales': ['en'], 'outputs': {key: [digest, str(document)]}, 'expected': 1}
+    path = str(tmp_path / 'manifest.json')
+    update_manifest(path, 'v1', {}, {str(tmp_path / 'suite.xlsx'): entry}, [])
+
+    version, recorded = load_manifest(path)
+    assert version == 'v1'
+    entry = recorded['suite.xlsx']
+    assert is_current(entry, key, digest)
+    assert not is_current(entry, key, content_digest([('Scenario 1', 'TC-001'), ('Step 1', 'Close the order')]))
+    assert workbook_is_current(entry, 'abc', ['en'])
+    assert not workbook_is_current(entry, 'abc', ['en', 'es'])
+
+    document.unlink()
+    assert not is_current(entry, key, digest)
+    assert not workbook_is_current(entry, 'abc', ['en'])
+
+
+def test_missing_manifest_loads_as_empty(tmp_path):
+    assert load_manifest(str(tmp_path / 'manifest.json')) == (None, {})
+
+
+def test_outputs_nothing_produces_are_removed(tmp_path):
+    kept, dropped = tmp_path / 'kept.docx', tmp_path / 'dropped.docx'
+    kept.write_bytes(b'')
+    dropped.write_bytes(b'')
+    recorded = {'suite.xlsx': {'file': 'abc', 'locales': ['en'], 'expected': 2,
+                               'outputs': {'kept': ['1', str(kept)], 'dropped': ['2', str(dropped)]}}}
+    entry = {'file': 'def', 'locales': ['en'], 'outputs': {'kept': ['1', str(kept)]}, 'expected': 1}
+    update_manifest(str(tmp_path / 'manifest.json'), 'v1', recorded, {str(tmp_path / 'suite.xlsx'): entry}, [])
+
+    assert kept.is_file()
+    assert not dropped.is_file()
+
+
+def test_failed_workbook_keeps_its_outputs_for_a_rebuild(tmp_path):
+    document = tmp_path / 'TC-001.docx'
+    document.write_bytes(b'')
+    recorded = {'suite.xlsx': {'file': 'abc', 'locales': ['en'], 'outputs': {'key': ['1', str(document)]}, 'expected': 1}}
+    path = str(tmp_path / 'manifest.json')
+    update_manifest(path, 'v1', recorded, {}, [str(tmp_path / 'suite.xlsx')])
+
+    _, saved = load_manifest(path)
+    assert document.is_file()
+    assert saved['suite.xlsx']['outputs'] == {'key': [None, str(document)]}
+    assert not is_current(saved['suite.xlsx'], 'key', '1')
+    assert not workbook_is_current(saved['suite.xlsx'], 'abc', ['en'])
+
+
+def test_generator_version_ignores_the_settings_in_main(tmp_path):
+    script = tmp_path / 'script.py'
+    script.write_text("def build():\n    return 1\n\ndef main():\n    workers = 1\n", encoding='utf-8')
+    version = generator_version(str(script))
+
+    script.write_text("def build():\n    return 1\n\ndef main():\n    workers = 8\n", encoding='utf-8')
+    assert generator_version(str(script)) == version
+
+    script.write_text("def build():\n    return 2\n\ndef main():\n    workers = 8\n", encoding='utf-8')
+    assert generator_version(str(script)) != version
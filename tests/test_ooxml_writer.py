@@ -0,0 +1,149 @@
+import copy
+import os
+import zipfile
+import zlib
+
+import pytest
+from docx import Document
+from docx.parts.styles import StylesPart
+from lxml import etree
+
+from common.docbuild import new_document
+from common.ooxml_writer import (FragmentTemplate, StreamingDocxWriter, _crc32_combine, deflate_fragment, save_docx,
+                                 write_stitched_docx)
+
+
+def add_preamble(doc, title):
+    doc.add_heading(title, level=1)
+
+
+def restyled_preamble(doc, title):
+    doc.styles['Normal'].font.name = 'Courier New'
+    doc.add_heading(title, level=1)
+
+
+def test_save_docx_keeps_a_style_changed_in_the_preamble(tmp_path):
+    doc = new_document(restyled_preamble, ('Preamble',))
+    path = str(tmp_path / 'restyled.docx')
+    save_docx(doc, path, restyled_preamble, ('Preamble',))
+
+    with zipfile.ZipFile(path) as package:
+        assert b'Courier New' in package.read('word/styles.xml')
+
+
+def test_save_docx_keeps_a_replaced_style_part(tmp_path):
+    doc = new_document(add_preamble, ('Preamble',))
+    styles_part = doc.part._styles_part
+    styles_part._element = copy.deepcopy(styles_part._element)
+    doc.styles['Normal'].font.name = 'Courier New'
+    path = str(tmp_path / 'replaced.docx')
+    save_docx(doc, path, add_preamble, ('Preamble',))
+
+    with zipfile.ZipFile(path) as package:
+        assert b'Courier New' in package.read('word/styles.xml')
+
+
+def test_save_docx_does_not_serialise_unchanged_parts(tmp_path, monkeypatch):
+    doc = new_document(add_preamble, ('Preamble',))
+    doc.add_paragraph('Body text', style='Normal')
+
+    def serialised(part):
+        raise AssertionError(f"{part.partname} was serialised")
+
+    monkeypatch.setattr(StylesPart, 'blob', property(serialised))
+    save_docx(doc, str(tmp_path / 'unchanged.docx'), add_preamble, ('Preamble',))
+
+
+def test_save_docx_copies_unchanged_parts(tmp_path):
+    doc = new_document(add_preamble, ('Preamble',))
+    doc.add_paragraph('Body text')
+    path = str(tmp_path / 'unchanged.docx')
+    save_docx(doc, path, add_preamble, ('Preamble',))
+
+    with zipfile.ZipFile(path) as package:
+        assert package.testzip() is None
+        assert b'Body text' in package.read('word/document.xml')
+        # Written by the package writer, whose entries carry a fixed date
+        assert package.getinfo('word/styles.xml').date_time == (1980, 1, 1, 0, 0, 0)
+
+
+def add_step(doc, step):
+    doc.add_heading(step.Name, level=2)
+    doc.add_paragraph(step.Description)
+
+
+def step_fragments(count):
+    template = FragmentTemplate(add_step, ('Name', 'Description'), add_preamble, ('Preamble',))
+    return [template.render(Name=f'Step {number}', Description=f'Open the order\t{number} & close it <again>')
+            for number in range(count)]
+
+
+def test_crc32_combine_matches_the_joined_bytes():
+    pieces = [b'', b'a', b'<w:p>' * 1000, bytes(70000), os.urandom(4099), b'\xff' * 3]
+    crc = 0
+    for piece in pieces:
+        crc = _crc32_combine(crc, zlib.crc32(piece), len(piece))
+    assert crc == zlib.crc32(b''.join(pieces))
+
+
+def test_stitched_document_matches_the_streamed_one(tmp_path):
+    fragments = step_fragments(30)
+    streamed, stitched = str(tmp_path / 'streamed.docx'), str(tmp_path / 'stitched.docx')
+    with StreamingDocxWriter(streamed, add_preamble, args=('Preamble',)) as writer:
+        for xml in fragments:
+            writer.write(xml)
+    # Uneven pieces, as workers hand back chunks of different sizes
+    pieces = (deflate_fragment(''.join(fragments[start:end])) for start, end in [(0, 1), (1, 1), (1, 12), (12, 30)])
+    write_stitched_docx(stitched, add_preamble, pieces, args=('Preamble',))
+
+    with zipfile.ZipFile(streamed) as streamed_package, zipfile.ZipFile(stitched) as stitched_package:
+        assert stitched_package.testzip() is None
+        assert stitched_package.read('word/document.xml') == streamed_package.read('word/document.xml')
+        assert sorted(stitched_package.namelist()) == sorted(streamed_package.namelist())
+
+    doc = Document(stitched)
+    assert [paragraph.text for paragraph in doc.paragraphs if paragraph.style.name == 'Heading 2'] == [
+        f'Step {number}' for number in range(30)]
+    assert doc.paragraphs[-1].text == 'Open the order\t29 & close it <again>'
+
+
+def test_stitched_document_can_be_stored_uncompressed(tmp_path):
+    path = str(tmp_path / 'stored.docx')
+    write_stitched_docx(path, add_preamble, [deflate_fragment(xml, 0) for xml in step_fragments(3)], args=('Preamble',),
+                        compresslevel=0)
+
+    with zipfile.ZipFile(path) as package:
+        assert package.testzip() is None
+        assert package.getinfo('word/document.xml').compress_type == zipfile.ZIP_STORED
+    assert Document(path).paragraphs[-1].text == 'Open the order\t2 & close it <again>'
+
+
+EDGE_CASE_VALUES = ['', ' ', '  leading and trailing  ', 'Open\tthe order', 'First line\nsecond line\r\nthird',
+                    'Buyer & <Planner> "quoted" \'apostrophe\'', 'ñ ü € 漢字 😀', 'Ends with a break\n']
+
+
+def edge_case_tests(e2e):
+    tests = []
+    for number, value in enumerate(EDGE_CASE_VALUES):
+        test = e2e.Test.from_cleaned(('Scenario 1', f'TC-{number:03}', value, value, 'Step', value, value, value, value))
+        test.add_step(e2e.Step.from_cleaned(('Scenario 1', f'TC-{number:03}', value, value, 'Step 1', value, value, value, value)))
+        test.add_step(e2e.Step.from_cleaned(('Scenario 1', f'TC-{number:03}', value, value, 'Step 2', 'Open the order', '', '', value)))
+        tests.append(test)
+    # A test without steps is left out by both writers
+    tests.append(e2e.Test.from_cleaned(('Scenario 1', 'TC-999', 'Empty', '', '', '', '', '', '')))
+    return tests
+
+
+def canonical_document_xml(path):
+    with zipfile.ZipFile(path) as package:
+        return etree.tostring(etree.fromstring(package.read('word/document.xml')), method='c14n')
+
+
+@pytest.mark.parametrize('locale', ['en', 'es'])
+def test_streamed_document_xml_matches_python_docx(tmp_path, e2e, locale):
+    tests = edge_case_tests(e2e)
+    built, streamed = str(tmp_path / 'built.docx'), str(tmp_path / 'streamed.docx')
+    e2e.build_document(tests, locale).save(built)
+    e2e.write_streaming_document(tests, streamed, locale)
+
+    assert canonical_document_xml(streamed) == canonical_document_xml(built)
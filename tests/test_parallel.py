@@ -0,0 +1,60 @@
+import csv
+
+import pytest
+
+from common.ingest import COLUMNS
+from common.parallel import DocumentResult, run_workbooks
+
+
+def write_workbook(path, tests):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for number in range(tests):
+            for step in range(number + 1):
+                writer.writerow(('Scenario 1', f'TC-{number:03}', f'Test {number}', 'Check the order', f'Step {step}',
+                                 'Open the order', 'It opens', 'Buyer', 'Supply'))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_every_document_reports_its_result(tmp_path, standalone, workers):
+    write_workbook(tmp_path / 'suite.csv', 3)
+    scenarios = standalone.read_excel_to_tests(str(tmp_path / 'suite.csv'))
+
+    outputs, results = standalone.create_word_documents_standalone(scenarios, str(tmp_path / 'out'), workers)
+
+    assert all(type(result) is DocumentResult for result in results)
+    assert [result.path for result in results] == [path for _, path in outputs.values()]
+    assert [result.steps for result in results] == [1, 2, 3]
+    assert all(result.build_seconds > 0 and result.save_seconds > 0 for result in results)
+
+
+def test_process_file_summarises_its_documents(tmp_path, standalone, capsys):
+    write_workbook(tmp_path / 'suite.csv', 3)
+
+    standalone.process_file(str(tmp_path / 'suite.csv'), str(tmp_path / 'out'))
+
+    assert "suite.csv: 3 documents, 6 steps, built in" in capsys.readouterr().out
+
+
+def count_lines(file_path):
+    with open(file_path, encoding='utf-8') as f:
+        if f.read(3) == 'bad':
+            raise ValueError(f"{file_path} is corrupt")
+        f.seek(0)
+        return sum(1 for _ in f)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_a_failing_workbook_does_not_stop_the_others(tmp_path, workers, capsys):
+    paths = []
+    for name, text in [('small.csv', 'a\n'), ('bad.csv', 'bad\n' * 50), ('large.csv', 'a\nb\nc\n')]:
+        (tmp_path / name).write_text(text, encoding='utf-8')
+        paths.append(str(tmp_path / name))
+
+    results, failures = run_workbooks(count_lines, [(path,) for path in paths], workers)
+
+    assert results == {paths[0]: 1, paths[2]: 3}
+    assert list(failures) == [paths[1]]
+    assert isinstance(failures[paths[1]], ValueError)
+    assert "1 of 3 workbooks failed: bad.csv" in capsys.readouterr().out
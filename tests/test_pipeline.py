@@ -0,0 +1,26 @@
+import threading
+
+import pytest
+
+from common.pipeline import IOThread
+
+
+def test_io_thread_skips_calls_after_a_failure():
+    ran = []
+    release = threading.Event()
+
+    def fail():
+        release.wait()
+        raise ValueError("disk full")
+
+    io_thread = IOThread()
+    io_thread.submit(fail)
+    io_thread.submit(ran.append, 1)
+    release.set()
+    # Queued behind the failing call before it raised, and submitted after
+    with pytest.raises(ValueError):
+        while True:
+            io_thread.submit(ran.append, 2)
+    with pytest.raises(ValueError):
+        io_thread.close()
+    assert ran == []
@@ -0,0 +1,106 @@
+import csv
+import http.client
+import io
+import json
+import threading
+import time
+import zipfile
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from common.ingest import COLUMNS
+from service import service
+
+ROWS = [
+    ('Scenario 1', 'TC-001', 'Open an order', 'Check the order', 'Step 1', 'Open the order', 'It opens', 'Buyer', 'Supply'),
+    ('Scenario 1', 'TC-002', 'Ship an order', 'Check the delivery', 'Step 1', 'Ship the order', 'It ships', 'Buyer', 'Supply'),
+]
+
+
+@pytest.fixture
+def server(tmp_path, translator):
+    """A running service on a free port with one warm worker, as (host, port)."""
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), service.JobHandler)
+    httpd.service = service.GenerationService(str(tmp_path / 'jobs'), workers=1)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address
+    httpd.shutdown()
+    httpd.server_close()
+    httpd.service.close()
+
+
+def request(server, method, path, body=None):
+    """Send one request, returning the status and the JSON reply, or the raw bytes of anything else."""
+    connection = http.client.HTTPConnection(*server, timeout=30)
+    try:
+        connection.request(method, path, body)
+        response = connection.getresponse()
+        data = response.read()
+    finally:
+        connection.close()
+    if response.getheader('Content-Type', '').startswith('application/json'):
+        return response.status, json.loads(data)
+    return response.status, data
+
+
+def workbook_bytes():
+    text = io.StringIO()
+    csv.writer(text).writerows([COLUMNS] + ROWS)
+    return text.getvalue().encode('utf-8')
+
+
+@pytest.mark.parametrize('query, message', [
+    ('layout=word&file=suite.csv', "layout must be one of e2e, standalone"),
+    ('layout=standalone&locales=,&file=suite.csv', "locales must name at least one language"),
+    ('layout=standalone&file=suite.txt', "file must be a workbook"),
+])
+def test_bad_uploads_are_refused(server, query, message):
+    status, reply = request(server, 'POST', f'/jobs?{query}', workbook_bytes())
+    assert status == 400
+    assert reply['error'].startswith(message)
+
+
+def test_empty_upload_is_refused(server):
+    status, reply = request(server, 'POST', '/jobs?file=suite.csv', b'')
+    assert status == 400
+    assert reply['error'] == "Send the workbook as the request body"
+
+
+def test_upload_over_the_limit_is_refused(server, monkeypatch):
+    monkeypatch.setattr(service, 'MAX_UPLOAD_BYTES', 16)
+    status, reply = request(server, 'POST', '/jobs?file=suite.csv', bytes(17))
+    assert status == 413
+    assert reply['error'].startswith("Uploads are limited to")
+    # Nothing was queued
+    assert request(server, 'GET', '/jobs') == (200, [])
+
+
+def test_unknown_endpoints_and_jobs(server):
+    assert request(server, 'POST', '/documents', b'x')[0] == 404
+    assert request(server, 'GET', '/jobs/0123456789ab') == (404, {'error': "No job 0123456789ab"})
+    assert request(server, 'GET', '/jobs/0123456789ab/documents.zip')[0] == 404
+    assert request(server, 'GET', '/status')[0] == 404
+
+
+def test_uploaded_workbook_is_built_and_downloaded(server):
+    status, job = request(server, 'POST', '/jobs?layout=standalone&locales=en&file=suite.csv', workbook_bytes())
+    assert status == 202
+    assert job['status'] in ('queued', 'running', 'done')
+    assert (job['file'], job['layout'], job['locales']) == ('suite.csv', 'standalone', ['en'])
+
+    deadline = time.monotonic() + 60
+    while job['status'] in ('queued', 'running'):
+        assert time.monotonic() < deadline, "the job did not finish"
+        time.sleep(0.1)
+        status, job = request(server, 'GET', f"/jobs/{job['id']}")
+    assert job['status'] == 'done', job['error']
+    assert job['documents'] == 2
+    assert job['metrics']['stages']['document_save'][1] == 2
+
+    status, data = request(server, 'GET', f"/jobs/{job['id']}/documents.zip")
+    assert status == 200
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert sorted(archive.namelist()) == ['suite/Open an order_TC-001.docx', 'suite/Ship an order_TC-002.docx']
+    assert [listed['id'] for listed in request(server, 'GET', '/jobs')[1]] == [job['id']]
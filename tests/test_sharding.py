@@ -0,0 +1,108 @@
+import csv
+import os
+
+from common.ingest import COLUMNS
+from common.manifest import file_digest, load_manifest, manifest_path, update_manifest
+from common.sharding import in_shard, merge_shard_manifests, shard_of
+
+SCRIPT_PATH = os.path.join('E2E', 'e2e - EN.py')
+
+
+def write_shard(word_dir, index, count, entries, recorded=None, failures=()):
+    update_manifest(manifest_path(word_dir, SCRIPT_PATH, (index, count)), 'v1', recorded or {}, entries, failures)
+
+
+def make_run(tmp_path, names):
+    excel_dir, word_dir = tmp_path / 'in', tmp_path / 'out'
+    excel_dir.mkdir()
+    word_dir.mkdir()
+    workbook = excel_dir / 'suite.csv'
+    workbook.write_text('Scenario\n', encoding='utf-8')
+    documents = []
+    for name in names:
+        document = word_dir / name
+        document.write_bytes(b'')
+        documents.append(str(document))
+    return str(excel_dir), str(word_dir), str(workbook), documents
+
+
+def test_every_test_is_in_exactly_one_shard():
+    tests = [('suite.xlsx', 'Scenario 1', f'TC-{number:03}') for number in range(200)]
+    for values in tests:
+        assert [index for index in range(4) if in_shard((index, 4), *values)] == [shard_of(values, 4)]
+        assert in_shard((0, 1), *values)
+    # Spread over the shards, and the same on every machine
+    assert {shard_of(values, 4) for values in tests} == {0, 1, 2, 3}
+    assert shard_of(('suite.xlsx', 'Scenario 1', 'TC-001'), 4) == shard_of(['suite.xlsx', 'Scenario 1', 'TC-001'], 4)
+
+
+def test_merge_writes_the_combined_manifest(tmp_path):
+    excel_dir, word_dir, workbook, (english, spanish) = make_run(tmp_path, ['en.docx', 'es.docx'])
+    digest = file_digest(workbook)
+    entry = {'file': digest, 'locales': ['en', 'es'], 'expected': 2}
+    write_shard(word_dir, 0, 2, {workbook: dict(entry, outputs={'en': ['1', english]})})
+    write_shard(word_dir, 1, 2, {workbook: dict(entry, outputs={'es': ['2', spanish]})})
+
+    assert merge_shard_manifests(excel_dir, word_dir, SCRIPT_PATH, 2) == []
+
+    version, workbooks = load_manifest(manifest_path(word_dir, SCRIPT_PATH))
+    assert version == 'v1'
+    assert workbooks == {'suite.csv': dict(entry, outputs={'en': ['1', english], 'es': ['2', spanish]})}
+
+
+def test_merge_reports_missing_shards_and_outputs(tmp_path):
+    excel_dir, word_dir, workbook, (english,) = make_run(tmp_path, ['en.docx'])
+    entry = {'file': file_digest(workbook), 'locales': ['en'], 'expected': 3}
+    write_shard(word_dir, 0, 3, {workbook: dict(entry, outputs={'en': ['1', english], 'gone': ['2', english + '.old']})})
+
+    problems = merge_shard_manifests(excel_dir, word_dir, SCRIPT_PATH, 3)
+
+    assert problems == [
+        f"Shard 2 of 3 has not finished, {os.path.basename(manifest_path(word_dir, SCRIPT_PATH, (1, 3)))} is missing",
+        f"Shard 3 of 3 has not finished, {os.path.basename(manifest_path(word_dir, SCRIPT_PATH, (2, 3)))} is missing",
+        f"1 documents of suite.csv are missing, e.g. {english}.old",
+        "suite.csv should have 3 outputs but the shards recorded 2",
+    ]
+    assert not os.path.isfile(manifest_path(word_dir, SCRIPT_PATH))
+
+
+def test_merge_reports_a_shard_that_failed_on_a_workbook(tmp_path):
+    excel_dir, word_dir = tmp_path / 'in', tmp_path / 'out'
+    excel_dir.mkdir()
+    word_dir.mkdir()
+    workbook = excel_dir / 'suite.csv'
+    workbook.write_text('Scenario\n', encoding='utf-8')
+    english, spanish = word_dir / 'en.docx', word_dir / 'es.docx'
+    english.write_bytes(b'')
+    spanish.write_bytes(b'')
+    digest = file_digest(str(workbook))
+
+    # Shard 1 built the workbook once, then failed on it after it changed
+    built = {'file': digest, 'locales': ['en'], 'outputs': {'en': ['old', str(english)]}, 'expected': 2}
+    write_shard(str(word_dir), 0, 2, {}, {'suite.csv': built}, [str(workbook)])
+    write_shard(str(word_dir), 1, 2, {str(workbook): dict(built, outputs={'es': ['new', str(spanish)]})})
+
+    problems = merge_shard_manifests(str(excel_dir), str(word_dir), SCRIPT_PATH, 2)
+
+    assert "Shard 1 failed on suite.csv or built it before it last changed" in problems
+    assert not os.path.isfile(manifest_path(str(word_dir), SCRIPT_PATH))
+
+
+def test_tests_saved_under_one_name_are_built_by_one_shard(tmp_path, standalone):
+    # Two scenarios whose test of the same name and ID the old scenario and test ID key put on different shards
+    second = next(f'Scenario {number}' for number in range(2, 100)
+                  if shard_of(('suite.csv', 'Scenario 1', 'TC-001'), 4) != shard_of(('suite.csv', f'Scenario {number}', 'TC-001'), 4))
+    excel_dir, word_dir = tmp_path / 'in', tmp_path / 'out'
+    excel_dir.mkdir()
+    word_dir.mkdir()
+    with open(excel_dir / 'suite.csv', 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for scenario in ('Scenario 1', second):
+            writer.writerow((scenario, 'TC-001', 'Open an order', 'Check the order', 'Step 1', 'Open the order', 'It opens',
+                             'Buyer', 'Supply'))
+
+    for index in range(4):
+        standalone.process_all_files(str(excel_dir), str(word_dir), shard_index=index, shard_count=4, parse_cache=False)
+
+    assert merge_shard_manifests(str(excel_dir), str(word_dir), standalone.__file__, 4) == []
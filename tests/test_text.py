@@ -0,0 +1,41 @@
+from openpyxl import Workbook
+
+from common.ingest import COLUMNS
+from common.text import break_long_words, clean_columns, clean_text
+
+
+def test_blank_cells_are_empty_text():
+    assert clean_text(None) == ''
+    assert clean_text(float('nan')) == ''
+    assert clean_text(0) == '0'
+
+
+def test_blank_expected_result_cell():
+    row = ('Scenario 1', 'TC-001', 'Open an order', 'Check the order', 'Step 1', 'Open the order_x000D_\nscreen', None,
+           'Buyer', 'Supply')
+    ((_, cleaned),) = list(clean_columns([row], (clean_text,) * 9))
+    assert cleaned[6] == ''
+    assert cleaned[5] == 'Open the order\nscreen'
+
+
+def test_clean_columns_matches_clean_text():
+    # Repeated text takes the remembered path, mostly new or non-text values are mapped directly
+    rows = [('Scenario', f'TC-{number % 3}', number, None, float(number), 'x' * 25, 'same', 1 if number % 2 else 1.0, True)
+            for number in range(50)]
+    cleaners = (clean_text,) * 8 + (lambda value: break_long_words(clean_text(value)),)
+    for chunk_size in (1, 7, 50):
+        cleaned = [values for _, values in clean_columns(rows, cleaners, chunk_size)]
+        assert cleaned == [tuple(cleaner(value) for cleaner, value in zip(cleaners, row)) for row in rows]
+
+
+def test_blank_expected_result_reaches_the_step_as_empty_text(tmp_path, e2e):
+    workbook = Workbook()
+    workbook.active.append(COLUMNS)
+    workbook.active.append(('Scenario 1', 'TC-001', 'Open an order', 'Check the order', 'Step 1', 'Open the order', None,
+                            'Buyer', 'Supply'))
+    path = str(tmp_path / 'suite.xlsx')
+    workbook.save(path)
+
+    (test,) = e2e.read_excel_to_tests(path)
+    assert test.steps[0].ExpectedResults == ''
+    assert test.steps[0].StepDescription == 'Open the order'
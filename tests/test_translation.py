@@ -0,0 +1,94 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import common.translation
+from common.translation_cache import TranslationCache
+
+
+class FlakyTranslator:
+    """Raises like googletrans with raise_exception=True for every text in failing."""
+
+    failing = set()
+    options = None
+    clients = 0
+    in_flight = 0
+    most_in_flight = 0
+
+    def __init__(self, **options):
+        FlakyTranslator.options = options
+        FlakyTranslator.clients += 1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def translate(self, text, dest='es'):
+        FlakyTranslator.in_flight += 1
+        FlakyTranslator.most_in_flight = max(FlakyTranslator.most_in_flight, FlakyTranslator.in_flight)
+        await asyncio.sleep(0.001)
+        FlakyTranslator.in_flight -= 1
+        if text in self.failing:
+            raise Exception("Unexpected status code \"429\" from ['translate.google.com']")
+        return SimpleNamespace(text=f"[{dest}] {text}")
+
+
+@pytest.fixture(autouse=True)
+def close_client():
+    yield
+    common.translation.close_client()
+
+
+def test_failed_requests_are_not_cached(tmp_path, monkeypatch):
+    cache = TranslationCache(str(tmp_path / 'translations.sqlite3'))
+    monkeypatch.setattr(common.translation, 'Translator', FlakyTranslator)
+    monkeypatch.setattr(common.translation, 'get_translation_cache', lambda: cache)
+
+    FlakyTranslator.failing = {'close the order'}
+    first, failed = common.translation.translate_to_locales({'es': ['open the order', 'close the order']})
+    assert FlakyTranslator.options['raise_exception'] is True
+    assert first['es'] == {'open the order': '[es] open the order', 'close the order': 'close the order'}
+    assert failed == {'es': ['close the order']}
+    assert cache.get('close the order', 'es', common.translation.BACKEND) is None
+
+    FlakyTranslator.failing = set()
+    second, failed = common.translation.translate_to_locales({'es': ['open the order', 'close the order']})
+    assert second['es']['close the order'] == '[es] close the order'
+    assert failed == {}
+    cache.close()
+
+
+def test_one_request_per_string_within_the_limit(tmp_path, monkeypatch):
+    cache = TranslationCache(str(tmp_path / 'translations.sqlite3'))
+    monkeypatch.setattr(common.translation, 'Translator', FlakyTranslator)
+    monkeypatch.setattr(common.translation, 'get_translation_cache', lambda: cache)
+    FlakyTranslator.failing = set()
+    FlakyTranslator.most_in_flight = 0
+
+    texts = [f'step {number}' for number in range(20)]
+    translated, _ = common.translation.translate_to_locales({'es': texts, 'fr': texts}, concurrency=3)
+
+    assert translated == {dest: {text: f'[{dest}] {text}' for text in texts} for dest in ('es', 'fr')}
+    assert FlakyTranslator.most_in_flight == 3
+    cache.close()
+
+
+def test_one_client_and_loop_for_every_call(tmp_path, monkeypatch):
+    cache = TranslationCache(str(tmp_path / 'translations.sqlite3'))
+    monkeypatch.setattr(common.translation, 'Translator', FlakyTranslator)
+    monkeypatch.setattr(common.translation, 'get_translation_cache', lambda: cache)
+    FlakyTranslator.failing = set()
+    FlakyTranslator.clients = 0
+
+    for chunk in range(3):
+        common.translation.translate_to_locales({'es': [f'chunk {chunk}'], 'fr': [f'chunk {chunk}']})
+    loop = common.translation._loop
+
+    assert FlakyTranslator.clients == 1
+    assert not loop.is_closed()
+    common.translation.close_client()
+    assert loop.is_closed()
+    cache.close()
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from common.translation_cache import TranslationCache
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs os.fork")
+def test_forked_process_opens_its_own_connection(tmp_path):
+    cache = TranslationCache(str(tmp_path / 'translations.sqlite3'))
+    cache.put('open', 'fr', 'google', 'ouvrir')
+    cache.flush()
+    parent_conn = cache._conn
+
+    pid = os.fork()
+    if pid == 0:
+        ok = cache._connect() is not parent_conn and cache.get('open', 'fr', 'google') == 'ouvrir'
+        cache.put('close', 'fr', 'google', 'fermer')
+        cache.close()
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert cache._conn is parent_conn
+    assert cache.get('close', 'fr', 'google') == 'fermer'
+    cache.close()
+
+
+def test_flushing_cache_hits_does_not_check_the_size(tmp_path):
+    cache = TranslationCache(str(tmp_path / 'translations.sqlite3'))
+    cache.put('open', 'es', 'google', 'abrir')
+    cache.flush()
+
+    statements = []
+    cache._connect().set_trace_callback(statements.append)
+    assert cache.get('open', 'es', 'google') == 'abrir'
+    cache.flush()
+
+    assert any(statement.startswith('UPDATE translations SET last_used') for statement in statements)
+    assert not any('SUM(' in statement or 'cache_size' in statement for statement in statements)
+    cache.close()
+
+
+def test_running_total_follows_updates_and_evictions(tmp_path):
+    cache = TranslationCache(str(tmp_path / 'translations.sqlite3'), max_bytes=100)
+    cache.put('open', 'es', 'google', 'abrir')
+    cache.flush()
+    cache.put('open', 'es', 'google', 'abrir la pantalla')
+    for number in range(10):
+        cache.put(f'text {number}', 'es', 'google', f'texto {number}')
+    cache.flush()
+
+    conn = cache._connect()
+    total = conn.execute("SELECT total FROM cache_size").fetchone()[0]
+    assert total == conn.execute("SELECT SUM(size) FROM translations").fetchone()[0]
+    assert total <= 100
+    cache.close()
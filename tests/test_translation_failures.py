@@ -0,0 +1,67 @@
+import csv
+
+from docx import Document
+
+from common.ingest import COLUMNS
+
+ROWS = [
+    ('Scenario 1', 'TC-001', 'Open an order', 'Check the order', 'Step 1', 'Open the order', 'It opens', 'Buyer', 'Supply'),
+    ('Scenario 1', 'TC-001', 'Open an order', 'Check the order', 'Step 2', 'Close the order', 'It closes', 'Buyer', 'Supply'),
+    ('Scenario 1', 'TC-002', 'Ship an order', 'Check the delivery', 'Step 1', 'Ship the order', 'It ships', 'Buyer', 'Supply'),
+]
+
+
+def write_workbook(tmp_path):
+    excel_dir = tmp_path / 'in'
+    excel_dir.mkdir()
+    with open(excel_dir / 'suite.csv', 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f).writerows([COLUMNS] + ROWS)
+    return excel_dir
+
+
+def document_text(path):
+    doc = Document(str(path))
+    cells = [cell.text for table in doc.tables for row in table.rows for cell in row.cells]
+    return '\n'.join([paragraph.text for paragraph in doc.paragraphs] + cells)
+
+
+def test_e2e_document_left_untranslated_is_built_again(tmp_path, e2e, translator, capsys):
+    excel_dir, word_dir = write_workbook(tmp_path), tmp_path / 'out'
+    translator.failing = {'Open an order'}
+    e2e.process_all_files(str(excel_dir), str(word_dir), locales=['es'], parse_cache=False)
+    assert 'Open an order' in document_text(word_dir / 'suite.docx')
+
+    translator.failing = set()
+    capsys.readouterr()
+    e2e.process_all_files(str(excel_dir), str(word_dir), locales=['es'], parse_cache=False)
+
+    assert 'unchanged since the last run' not in capsys.readouterr().out
+    text = document_text(word_dir / 'suite.docx')
+    assert '[es] Open an order' in text
+    assert 'Open an order' not in text.replace('[es] Open an order', '')
+
+    # Translated in full, the third run has nothing to do
+    e2e.process_all_files(str(excel_dir), str(word_dir), locales=['es'], parse_cache=False)
+    assert 'suite.csv is unchanged since the last run' in capsys.readouterr().out
+
+
+def test_standalone_only_documents_left_untranslated_are_built_again(tmp_path, standalone, translator, capsys):
+    excel_dir, word_dir = write_workbook(tmp_path), tmp_path / 'out'
+    translator.failing = {'Close the order', 'Ship an order'}
+    standalone.process_all_files(str(excel_dir), str(word_dir), locales=['es'], parse_cache=False)
+    # The step text stays in English, as does the file name of the test whose name failed
+    assert 'Close the order' in document_text(word_dir / 'suite' / '[es] Open an order_TC-001.docx')
+    assert (word_dir / 'suite' / 'Ship an order_TC-002.docx').is_file()
+
+    translator.failing = set()
+    capsys.readouterr()
+    standalone.process_all_files(str(excel_dir), str(word_dir), locales=['es'], parse_cache=False)
+
+    assert 'suite.csv: 2 documents' in capsys.readouterr().out
+    assert '[es] Close the order' in document_text(word_dir / 'suite' / '[es] Open an order_TC-001.docx')
+    assert sorted(path.name for path in (word_dir / 'suite').iterdir()) == [
+        '[es] Open an order_TC-001.docx', '[es] Ship an order_TC-002.docx']
+
+    translator.failing = {'Close the order'}
+    standalone.process_all_files(str(excel_dir), str(word_dir), locales=['es'], parse_cache=False)
+    assert 'suite.csv is unchanged since the last run' in capsys.readouterr().out
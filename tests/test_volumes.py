@@ -0,0 +1,57 @@
+import os
+
+from docx import Document
+
+
+def make_test(e2e, number, steps):
+    values = ('Scenario 1', f'TC-{number:03}', f'Test {number}', 'Check the order', 'Step', 'Open the order', 'It opens',
+              'Buyer', 'Supply')
+    test = e2e.Test.from_cleaned(values)
+    for _ in range(steps):
+        test.add_step(e2e.Step.from_cleaned(values))
+    return test
+
+
+def volume_ids(e2e, tests, volume_limits):
+    return [([test.TestID for test in volume], more) for volume, more in e2e.split_volumes(tests, volume_limits)]
+
+
+def test_volumes_close_before_the_test_that_would_go_over_a_limit(e2e):
+    tests = [make_test(e2e, number, steps) for number, steps in enumerate([2, 3, 0, 1, 4, 1], 1)]
+
+    assert volume_ids(e2e, tests, {'steps': 5, 'tests': None}) == [
+        (['TC-001', 'TC-002'], True), (['TC-004', 'TC-005'], True), (['TC-006'], False)]
+    assert volume_ids(e2e, tests, {'tests': 2}) == [
+        (['TC-001', 'TC-002'], True), (['TC-004', 'TC-005'], True), (['TC-006'], False)]
+    # A test over the limit on its own still gets a volume, it is never split
+    assert volume_ids(e2e, tests, {'steps': 3}) == [
+        (['TC-001'], True), (['TC-002'], True), (['TC-004'], True), (['TC-005'], True), (['TC-006'], False)]
+
+
+def test_without_limits_every_test_is_one_volume(e2e):
+    tests = [make_test(e2e, number, 1) for number in range(3)]
+    ((volume, more),) = e2e.split_volumes(tests, {'tests': None, 'steps': 0})
+    assert volume is tests
+    assert not more
+
+
+def test_megabytes_limit_follows_the_estimated_size(e2e):
+    tests = [make_test(e2e, number, 100) for number in range(4)]
+    size = e2e.estimated_megabytes(tests[0])
+    assert 0.2 < size < 0.4
+    assert [len(volume) for volume, _ in e2e.split_volumes(tests, {'megabytes': size * 2.5})] == [2, 2]
+
+
+def test_split_document_is_saved_as_volumes_with_an_index(tmp_path, e2e):
+    tests = [make_test(e2e, number, 2) for number in range(1, 6)]
+    paths = e2e.create_word_documents_standalone(tests, str(tmp_path), 'suite', volume_limits={'tests': 2})
+
+    assert [os.path.basename(path) for path in paths] == [
+        'suite.docx', 'suite - 001.docx', 'suite - 002.docx', 'suite - 003.docx']
+    index = Document(paths[0])
+    links = [rel.target_ref for rel in index.part.rels.values() if rel.is_external]
+    assert links == ['suite%20-%20001.docx', 'suite%20-%20002.docx', 'suite%20-%20003.docx']
+    assert 'TC-005 - TC-005 (1 tests, 2 steps)' in index.paragraphs[-1].text
+
+    headings = [paragraph.text for paragraph in Document(paths[2]).paragraphs if paragraph.style.name == 'Heading 1']
+    assert headings == ['Test 3', 'Test 4']
@@ -0,0 +1,70 @@
+import datetime
+import os
+
+from common.workbook_cache import cache_path, cached_rows, decode_rows, encode_rows
+
+
+class CountingReader:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+
+    def __call__(self, file_path):
+        self.calls += 1
+        return list(self.rows)
+
+
+def test_encoded_rows_keep_their_values_and_types():
+    rows = [('Scenario 1', 'TC-001', 1, 1.0, True, None, 'Ünïcode'),
+            ('Scenario 1', 'TC-002', 2, 2.5, False, 'text', 'Ünïcode')]
+    lengths, body = encode_rows(rows, 7)
+    decoded = decode_rows(lengths, body)
+
+    assert decoded == rows
+    assert [[type(value) for value in row] for row in decoded] == [[type(value) for value in row] for row in rows]
+    assert decode_rows(*encode_rows([], 7)) == []
+
+
+def test_rows_that_cannot_be_stored_are_not_cached(tmp_path):
+    assert encode_rows([('Scenario 1', datetime.date(2024, 1, 1))], 2) is None
+
+    workbook = tmp_path / 'suite.csv'
+    workbook.write_text('Scenario\n', encoding='utf-8')
+    read = CountingReader([('Scenario 1', datetime.date(2024, 1, 1))])
+    cached_rows(str(workbook), 'e2e', read, 'v1', 2, str(tmp_path / 'cache'))
+
+    assert not os.path.exists(cache_path(str(workbook), 'e2e', str(tmp_path / 'cache')))
+
+
+def test_workbook_is_parsed_again_only_when_it_changes(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    workbook = tmp_path / 'suite.csv'
+    workbook.write_text('Scenario\n', encoding='utf-8')
+    read = CountingReader([('Scenario 1', 'TC-001'), ('Scenario 1', 'TC-002')])
+
+    first = cached_rows(str(workbook), 'e2e', read, 'v1', 2, cache_dir)
+    assert cached_rows(str(workbook), 'e2e', read, 'v1', 2, cache_dir) == first
+    assert read.calls == 1
+
+    # Saved again unchanged: the bytes are compared and the rows still come from the cache
+    stat = os.stat(workbook)
+    os.utime(workbook, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cached_rows(str(workbook), 'e2e', read, 'v1', 2, cache_dir) == first
+    assert read.calls == 1
+
+    # A new parser version, or a different workbook, parses it again
+    cached_rows(str(workbook), 'e2e', read, 'v2', 2, cache_dir)
+    assert read.calls == 2
+    workbook.write_text('Scenario,TEST ID\n', encoding='utf-8')
+    cached_rows(str(workbook), 'e2e', read, 'v2', 2, cache_dir)
+    assert read.calls == 3
+
+
+def test_readers_keep_separate_caches(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    workbook = tmp_path / 'suite.csv'
+    workbook.write_text('Scenario\n', encoding='utf-8')
+
+    cached_rows(str(workbook), 'e2e', CountingReader([('e2e',)]), 'v1', 1, cache_dir)
+    assert cached_rows(str(workbook), 'standalone', CountingReader([('standalone',)]), 'v1', 1, cache_dir) == [('standalone',)]
+    assert cached_rows(str(workbook), 'e2e', CountingReader([('parsed again',)]), 'v1', 1, cache_dir) == [('e2e',)]